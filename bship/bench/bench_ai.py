@@ -0,0 +1,71 @@
+"""
+Speed and strength of the probability density shooter (engine.ai):
+moves per second on 10x10 and 100x100 boards, and the average number
+of shots it takes to sink a fleet, against bombing tiles at random.
+
+Run from the bship directory:
+
+    python -m bench.bench_ai
+"""
+import numpy as np
+
+import board.batch as bba
+import engine.ai as eai
+from bench.timing import best_of, report
+
+NUM_GAMES = 200
+
+def play(batch, index, shooter):
+	"""
+	Sink the fleet on one board of the batch.
+	Returns the number of shots it took.
+	"""
+	shots = 0
+	while not batch.is_destroyed()[index]:
+		x, y = shooter.choose()
+		result = batch.shoot([x], [y], [index])[0]
+		shooter.observe(x, y, result)
+		shots += 1
+	return shots
+
+class RandomShooter():
+	"""
+	Bombs the tiles in random order.
+	"""
+
+	def __init__(self, w, h, rng):
+		self.order = list(rng.permutation(w * h))
+		self.w = w
+
+	def choose(self):
+		y, x = divmod(int(self.order.pop()), self.w)
+		return (x, y)
+
+	def observe(self, x, y, result):
+		pass
+
+def main():
+	for w, h, number in ((10, 10, 200), (100, 100, 5)):
+		batch = bba.BoardBatch(1, w, h, seed=0)
+		batch.place_fleet()
+		shooter = eai.Shooter(w, h, seed=0)
+		report("choose, {}x{}".format(w, h), best_of(shooter.choose, 5, number), "move")
+		# Into the game, with some ships sunk and some hit.
+		for i in range(w * h // 5):
+			x, y = shooter.choose()
+			shooter.observe(x, y, batch.shoot([x], [y], [0])[0])
+		report("choose (mid-game), {}x{}".format(w, h), best_of(shooter.choose, 5, number), "move")
+
+	batch = bba.BoardBatch(NUM_GAMES, 10, 10, seed=1)
+	batch.place_fleet()
+	rng = np.random.RandomState(1)
+	shots = [play(batch, i, eai.Shooter(10, 10, seed=i)) for i in range(NUM_GAMES)]
+	print("{:<40} {:>12.1f} shots".format("density shooter, 10x10", np.mean(shots)))
+
+	batch = bba.BoardBatch(NUM_GAMES, 10, 10, seed=1)
+	batch.place_fleet()
+	shots = [play(batch, i, RandomShooter(10, 10, rng)) for i in range(NUM_GAMES)]
+	print("{:<40} {:>12.1f} shots".format("random shooter, 10x10", np.mean(shots)))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,86 @@
+"""
+Compare the list-of-Tile GameBoard with the bitmask BitGameBoard.
+
+The bitboard wins at placing ships (the fit and overlap checks, and the
+boundary around a ship, are a few whole-board operations), at shots
+(resolved through a cell index on both, without building tiles) and at
+the raw hit test. Looking single cells up as tiles, the way the GUI
+does, stays faster on the byte grid: a bit test can't beat indexing
+a bytearray.
+
+Run from the bship directory:
+
+    python -m bench.bench_bitboard
+"""
+import board.board as bb
+import board.ship as bs
+import board.tile as bt
+
+from bench.timing import best_of, report
+
+SIZES = [(10, 10), (100, 100)]
+
+def fleet_positions(w, h):
+	"""
+	Non-overlapping horizontal positions for as many ships as fit on the board.
+	"""
+	positions = []
+	index = 0
+	for y in range(0, h, 2):
+		for x in range(0, w - 5 + 1, 6):
+			positions.append((index % len(bs.Ship.FLEET), x, y))
+			index += 1
+	return positions
+
+def place_fleet(board_class, w, h, positions):
+	board = board_class(w, h)
+	for index, x, y in positions:
+		board.place_ship(bs.Ship(index), x, y, bb.GameBoard.O_HORIZONTAL)
+	return board
+
+def probe(board):
+	"""
+	Look up every cell, the way a hit test would.
+	"""
+	hits = 0
+	for y in range(board.h):
+		for x in range(board.w):
+			tile = board.get_our_tile(x, y)
+			if not tile.is_free() and tile.tile != bt.Tile.T_OCCUPIED:
+				hits += 1
+	return hits
+
+def shoot_all(board_class, w, h, positions):
+	"""
+	Place the fleet, and bomb every cell.
+	"""
+	board = place_fleet(board_class, w, h, positions)
+	for y in range(h):
+		for x in range(w):
+			board.shoot(x, y)
+
+def main():
+	for w, h in SIZES:
+		positions = fleet_positions(w, h)
+		repeat = 5 if w * h <= 100 else 1
+		for board_class in (bb.GameBoard, bb.BitGameBoard):
+			name = "{} {}x{}".format(board_class.__name__, w, h)
+			t_init = best_of(lambda: board_class(w, h), repeat)
+			t_place = best_of(lambda: place_fleet(board_class, w, h, positions), repeat)
+			t_shoot = best_of(lambda: shoot_all(board_class, w, h, positions), repeat)
+			board = place_fleet(board_class, w, h, positions)
+			report(name + " init", t_init)
+			report(name + " place fleet", t_place)
+			report(name + " shoot all cells", t_shoot - t_place)
+			report(name + " probe all cells", best_of(lambda: probe(board), repeat))
+
+		# Raw bitmask hit test, without building tile objects.
+		bits = place_fleet(bb.BitGameBoard, w, h, positions).bits
+		def hit_test():
+			for y in range(h):
+				for x in range(w):
+					bits.is_hit(x, y)
+		report("BitBoard {}x{} is_hit all cells".format(w, h), best_of(hit_test, repeat))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,63 @@
+"""
+Throughput of the headless game engine, in games and moves per second.
+Random placement, random shots, two players on a 10x10 board.
+
+Run from the bship directory:
+
+    python -m bench.bench_engine
+"""
+import random
+import sys
+import timeit
+
+import engine.game as eg
+
+NUM_GAMES = 2000
+
+def play(rng, w = 10, h = 10):
+	"""
+	Play a single random game and return the number of moves.
+	"""
+	game = eg.Game(2, w, h)
+	moves = 0
+
+	# Place the fleets at random legal positions.
+	for seat in range(len(game.players)):
+		while game.players[seat].is_placing_ships():
+			x = rng.randrange(w)
+			y = rng.randrange(h)
+			orientation = rng.randrange(2)
+			if game.can_place(seat, x, y, orientation):
+				game.place(seat, x, y, orientation)
+				moves += 1
+
+	# Fire at the tiles of each player in random order.
+	cells = [(x, y) for y in range(h) for x in range(w)]
+	targets = []
+	for seat in range(len(game.players)):
+		order = list(cells)
+		rng.shuffle(order)
+		targets.append(order)
+
+	while not game.is_over():
+		x, y = targets[game.target()].pop()
+		game.shoot(x, y)
+		moves += 1
+	return moves
+
+def main():
+	rng = random.Random(0)
+	timer = timeit.default_timer
+
+	start = timer()
+	moves = 0
+	for i in range(NUM_GAMES):
+		moves += play(rng)
+	elapsed = timer() - start
+
+	print("{} games, {} moves in {:.2f} s".format(NUM_GAMES, moves, elapsed))
+	print("{:.0f} games/s, {:.0f} moves/s".format(NUM_GAMES / elapsed, moves / elapsed))
+	print("pygame loaded: {}".format("pygame" in sys.modules))
+
+if __name__ == '__main__':
+	main()
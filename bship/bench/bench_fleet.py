@@ -0,0 +1,55 @@
+"""
+Random fleets per second on a 10x10 board: placing ships at random
+and retrying whenever BitBoard.place_ship turns one down, against
+the FleetSampler, one fleet at a time and in bulk (and the bulk
+fleets placed on a BoardBatch).
+
+Run from the bship directory:
+
+    python -m bench.bench_fleet
+"""
+import random
+
+import numpy as np
+
+import board.batch as bba
+import board.bitboard as bbit
+import board.fleet as bfl
+import board.ship as bs
+from bench.timing import best_of, report
+
+NUM_FLEETS = 10000
+
+def retried(rng, w = 10, h = 10):
+	"""
+	Place a fleet the way a bot would have to through the board API.
+	"""
+	board = bbit.BitBoard(w, h)
+	for index in sorted(bs.Ship.FLEET):
+		ship = bs.Ship(index)
+		while True:
+			try:
+				board.place_ship(ship, rng.randrange(w), rng.randrange(h), rng.randrange(2))
+				break
+			except ValueError:
+				pass
+	return board
+
+def main():
+	rng = random.Random(0)
+	report("retry on ValueError", best_of(lambda: retried(rng), 5, 200), "fleet")
+
+	sampler = bfl.FleetSampler(10, 10, np.random.RandomState(0))
+	report("FleetSampler.sample", best_of(sampler.sample, 5, 2000), "fleet")
+	t = best_of(lambda: sampler.sample_many(NUM_FLEETS), 3)
+	report("FleetSampler.sample_many", t / NUM_FLEETS, "fleet")
+	print("{:<40} {:>12.0f} fleets/s".format("FleetSampler.sample_many", NUM_FLEETS / t))
+
+	batch = bba.BoardBatch(NUM_FLEETS, 10, 10, seed=0)
+	t = best_of(lambda: batch.place_fleets(sampler.sample_many(NUM_FLEETS)), 3)
+	report("sample_many + BoardBatch.place_fleets", t / NUM_FLEETS, "fleet")
+	t = best_of(batch.place_fleet, 3)
+	report("BoardBatch.place_fleet", t / NUM_FLEETS, "fleet")
+
+if __name__ == '__main__':
+	main()
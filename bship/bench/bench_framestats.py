@@ -0,0 +1,38 @@
+"""
+Cost of timing a frame stage with the frame stats off and on,
+against not timing it at all, and of summarising a full window.
+
+Run from the bship directory:
+
+    python -m bench.bench_framestats
+"""
+import framestats as bfs
+from bench.timing import best_of, report
+
+NUM = 100000
+
+def main():
+	def bare():
+		for i in range(NUM):
+			pass
+	base = best_of(bare, 5)
+	report("no span", base / NUM, "stage")
+
+	for enabled in (False, True):
+		stats = bfs.FrameStats(enabled)
+		def spans():
+			for i in range(NUM):
+				with stats.span("stage"):
+					pass
+		report("span ({})".format("on" if enabled else "off"),
+				(best_of(spans, 5) - base) / NUM, "stage")
+
+	stats = bfs.FrameStats(True)
+	for name in ("main_calls", "scheduler", "board", "gui.update", "gui.refresh", "events", "display"):
+		for i in range(bfs.FrameStats.WINDOW):
+			with stats.span(name):
+				pass
+	report("summary of 7 stages", best_of(stats.lines, 5, 10))
+
+if __name__ == '__main__':
+	main()
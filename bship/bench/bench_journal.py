@@ -0,0 +1,72 @@
+"""
+Game journal: records written per second, the file size per record,
+and reading a turn of a game at random through the index footer,
+against opening a journal without one (which scans every record).
+
+Run from the bship directory:
+
+    python -m bench.bench_journal
+"""
+import os
+import random
+import tempfile
+import timeit
+
+import journal as bj
+from bench.timing import best_of, report
+
+NUM_GAMES = 2000
+NUM_TURNS = 60
+
+timer = timeit.default_timer
+
+def write(path, rng):
+	"""
+	Record interleaved games: joins, placements, then turns and shots.
+	Returns the number of records.
+	"""
+	writer = bj.JournalWriter(path)
+	games = [writer.new_game() for i in range(NUM_GAMES)]
+	for game in games:
+		for seat in range(2):
+			writer.join(game, seat, None, 10, 10, 2)
+			for index in range(5):
+				writer.place(game, seat, index, rng.randrange(10), rng.randrange(10), rng.randrange(2))
+	for turn in range(NUM_TURNS):
+		for game in games:
+			writer.turn(game, turn % 2, turn)
+			writer.shot(game, turn % 2, turn, 1 - turn % 2, rng.randrange(10), rng.randrange(10), 0)
+	num_records = writer.num_records
+	writer.close()
+	return num_records
+
+def main():
+	rng = random.Random(0)
+	fd, path = tempfile.mkstemp(suffix=".journal")
+	os.close(fd)
+	os.remove(path)
+	try:
+		start = timer()
+		num_records = write(path, rng)
+		elapsed = timer() - start
+		report("write", elapsed / num_records, "record")
+		print("{:<40} {:>12.1f} B/record".format("file size", os.path.getsize(path) / float(num_records)))
+
+		reader = bj.JournalReader(path)
+		def seek():
+			game = rng.randrange(NUM_GAMES)
+			for record in reader.records(game, rng.randrange(NUM_TURNS)):
+				break
+		report("open (footer)", best_of(lambda: bj.JournalReader(path).close(), 5), "open")
+		report("seek to a turn", best_of(seek, 5, 1000), "seek")
+		reader.close()
+
+		# Strip the footer, as if the writer never closed the journal.
+		with open(path, "r+b") as f:
+			f.truncate(bj.HEADER.size + num_records * bj.RECORD.size)
+		report("open (no footer, scanned)", best_of(lambda: bj.JournalReader(path).close(), 1), "open")
+	finally:
+		os.remove(path)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,134 @@
+"""
+End-to-end ACK latency between a client and a host: the client sends
+an ACK, the host answers with another one, and the time until the
+answer is handled on the client is measured.
+
+* polled - both poll the connection once per frame at 30 fps,
+  the way the render loop used to.
+* transport - both run the connection on a Transport thread.
+
+Run from the bship directory (add --rabbitmq to use a broker on localhost
+instead of the in-process LocalBroker):
+
+    python -m bench.bench_latency
+"""
+import random
+import sys
+import threading
+import time
+import timeit
+import uuid
+
+import events as be
+import localbroker as lb
+import outbox as bo
+import protocol as bp
+import transport as btr
+
+FRAME = 1.0 / 30.0
+NUM_REQUESTS = 100
+
+timer = timeit.default_timer
+
+class Endpoint():
+	"""
+	One side of the exchange, with its own room queue.
+	"""
+
+	def __init__(self, on_message):
+		self.uuid = str(uuid.uuid4())
+		self.outbox = bo.Outbox()
+		self.on_message = on_message
+
+	def setup(self, channel):
+		channel.queue_declare(queue=self.uuid, auto_delete=True)
+		channel.basic_consume(self.callback, queue=self.uuid, no_ack=True)
+
+	def callback(self, ch, method, properties, body):
+		self.on_message(self, bp.Message.decode(body))
+
+	def ack(self, uuid, state):
+		self.outbox.post("", uuid, {
+				"id": bp.M_ACK,
+				"server_uuid": self.uuid,
+				"client_uuid": uuid,
+				"message": "",
+				"state": state})
+
+def polled(connect, endpoint, stop):
+	"""
+	Service the connection once per frame.
+	"""
+	connection = connect()
+	channel = connection.channel()
+	endpoint.setup(channel)
+	while not stop.is_set():
+		start = timer()
+		endpoint.outbox.flush(channel)
+		connection.process_data_events(time_limit=0)
+		time.sleep(max(0.0, FRAME - (timer() - start)))
+	connection.close()
+
+def measure(mode, connect):
+	answered = threading.Event()
+
+	def host_cb(endpoint, msg):
+		endpoint.ack(msg.server_uuid, be.S_GAME_SHOOTING)
+
+	def client_cb(endpoint, msg):
+		answered.set()
+
+	host = Endpoint(host_cb)
+	client = Endpoint(client_cb)
+
+	stop = threading.Event()
+	if mode == "polled":
+		threads = [threading.Thread(target=polled, args=(connect, e, stop)) for e in (host, client)]
+		for t in threads:
+			t.daemon = True
+			t.start()
+		# Let both declare their queues.
+		time.sleep(2 * FRAME)
+	else:
+		transports = [btr.Transport(connect, e.setup, e.outbox) for e in (host, client)]
+		for t in transports:
+			t.start()
+
+	rng = random.Random(0)
+	latencies = []
+	for i in range(NUM_REQUESTS):
+		# Don't line up with the frames.
+		time.sleep(rng.uniform(0, FRAME))
+		answered.clear()
+		start = timer()
+		client.ack(host.uuid, be.S_GAME_WAITING)
+		answered.wait(5.0)
+		latencies.append(timer() - start)
+
+	stop.set()
+	if mode == "polled":
+		for t in threads:
+			t.join()
+	else:
+		for t in transports:
+			t.stop()
+
+	latencies.sort()
+	print("{:<10} mean {:7.2f} ms  p50 {:7.2f} ms  p95 {:7.2f} ms".format(mode,
+			1000 * sum(latencies) / len(latencies),
+			1000 * latencies[len(latencies) // 2],
+			1000 * latencies[int(len(latencies) * 0.95)]))
+
+def main():
+	if "--rabbitmq" in sys.argv:
+		import pika
+		connect = lambda: pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+	else:
+		broker = lb.LocalBroker()
+		connect = broker.connect
+
+	measure("polled", connect)
+	measure("transport", connect)
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,99 @@
+"""
+Lobby frame time with 10,000 announced servers, each announcing once
+a second at 30 frames per second: an OrderedDict of announces, whose
+rows are all rebuilt each frame, against the LobbyDirectory, whose
+diff only touches the rows that changed. A few servers change their
+number of players, or go quiet and expire, in between.
+
+Building a row's text stands in for updating its widget (OcempGUI
+isn't needed to run this).
+
+Run from the bship directory:
+
+    python -m bench.bench_lobby
+"""
+import random
+import time
+import uuid
+from collections import OrderedDict
+
+import lobby as bl
+import protocol as bp
+from bench.timing import best_of, report
+
+NUM_SERVERS = 10000
+FPS = 30
+# Share of the announces with a change in the number of players.
+CHANGED = 0.01
+
+def announces(rnd, servers, num):
+	"""
+	The next num announces, as they arrive in the lobby.
+	"""
+	msgs = []
+	for i in range(num):
+		server = rnd.choice(servers)
+		if rnd.random() < CHANGED:
+			server["num_players"] = (rnd.randint(0, 4), 4)
+		msgs.append(bp.Message(dict(server)))
+	return msgs
+
+def main():
+	rnd = random.Random(0)
+	servers = [{
+			"id": bp.M_ANNOUNCE,
+			"uuid": str(uuid.uuid4()),
+			"boardsize": (10, 10),
+			"num_players": (1, 4),
+			"name": "Game {}".format(i),
+			"timestamp": time.time()} for i in range(NUM_SERVERS)]
+	per_frame = NUM_SERVERS // FPS
+	frames = [announces(rnd, servers, per_frame) for i in range(FPS)]
+	state = {"frame": 0}
+
+	# The way the lobby used to be kept.
+	server_list = OrderedDict()
+	for server in servers:
+		server_list[server["uuid"]] = bp.Message(dict(server))
+	rows = {}
+
+	def ordered_frame():
+		state["frame"] += 1
+		for msg in frames[state["frame"] % FPS]:
+			server_list[msg.uuid] = msg
+		for key, val in server_list.iteritems():
+			rows[key] = bl.describe(val)
+
+	report("OrderedDict, {} servers".format(NUM_SERVERS), best_of(ordered_frame, 5, FPS), "frame")
+
+	directory = bl.LobbyDirectory()
+	for server in servers:
+		directory.announce(bp.Message(dict(server)))
+	directory.take_diff()
+
+	def directory_frame():
+		state["frame"] += 1
+		for msg in frames[state["frame"] % FPS]:
+			directory.announce(msg)
+		directory.tick()
+		added, updated, removed = directory.take_diff()
+		for server in added:
+			rows[server.uuid] = bl.describe(server)
+		for server in updated:
+			rows[server.uuid] = bl.describe(server)
+		for key in removed:
+			rows.pop(key, None)
+
+	report("directory, {} servers".format(NUM_SERVERS), best_of(directory_frame, 5, FPS), "frame")
+
+	# Let the directory expire every server.
+	directory.ttl = 0
+	for server in servers:
+		directory.announce(bp.Message(dict(server)))
+	time.sleep(2 * directory.scheduler.resolution)
+	directory.tick()
+	added, updated, removed = directory.take_diff()
+	print("{:<40} {:>12}".format("expired", len(removed)))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,69 @@
+"""
+Size and encode/decode speed of the binary wire format,
+against pickled dicts (the way messages used to be sent).
+
+Run from the bship directory:
+
+    python -m bench.bench_protocol
+"""
+import pickle
+import uuid
+
+import events as be
+import protocol as bp
+
+from bench.timing import best_of, report
+
+def samples():
+	"""
+	One message of every kind.
+	"""
+	server = str(uuid.uuid4())
+	client = str(uuid.uuid4())
+	return [
+			("announce", {
+				"id": bp.M_ANNOUNCE,
+				"uuid": server,
+				"boardsize": (10, 10),
+				"num_players": (1, 2),
+				"name": "Ship Wreckyard"}),
+			("joining", {
+				"id": bp.M_JOINING,
+				"server_uuid": server,
+				"client_uuid": client,
+				"name": "Ship Wreckyard",
+				"nickname": "Anon"}),
+			("heartbeat", {
+				"id": bp.M_HEARTBEAT,
+				"server_uuid": server,
+				"client_uuid": client}),
+			("ack", {
+				"id": bp.M_ACK,
+				"server_uuid": server,
+				"client_uuid": client,
+				"message": "Server: Welcome",
+				"state": be.S_GAME}),
+			("nack", {
+				"id": bp.M_NACK,
+				"server_uuid": server,
+				"client_uuid": client,
+				"message": "Server: Nickname collision",
+				"state": be.S_LOBBY}),
+			]
+
+def main():
+	for name, message in samples():
+		# Pickled messages carried a timestamp as well.
+		message["timestamp"] = 0.0
+		pickled = pickle.dumps(message)
+		encoded = bp.Message.encode(dict(message))
+		print("{:<40} {:>6} B pickle {:>6} B binary".format(
+				name + " size", len(pickled), len(encoded)))
+
+		report(name + " pickle.dumps", best_of(lambda: pickle.dumps(message), 5, 2000))
+		report(name + " encode", best_of(lambda: bp.Message.encode(message), 5, 2000))
+		report(name + " pickle.loads", best_of(lambda: bp.Message(pickle.loads(pickled)), 5, 2000))
+		report(name + " decode", best_of(lambda: bp.Message.decode(encoded), 5, 2000))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,76 @@
+"""
+Frame time of drawing a board grid: a rectangle per tile and
+anti-aliased grid lines every frame, against the tile atlas (whose
+tiles carry their grid lines). Then a full frame of both grids seen
+through an 800x600 window's camera, which only draws the tiles in
+sight, as the board grows.
+
+Run from the bship directory:
+
+    python -m bench.bench_render
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import board.board as bb
+import board.ship as bs
+import board.tile as bt
+import render.board_view as brv
+import render.camera as brc
+from render.atlas import TileAtlas
+
+from bench.timing import best_of, report
+
+SIZES = [(10, 10), (50, 50), (200, 200)]
+CAMERA_SIZES = [(10, 10), (200, 200), (1000, 1000)]
+# The viewport of the board in an 800x600 window.
+VIEWPORT = (768, 568)
+
+def draw_tiles(board, surface, tiles, pos):
+	"""
+	Draw the tiles the way it used to be done: one rectangle per tile,
+	then the grid lines on top.
+	"""
+	tsize = brv.BoardView.TILE_SIZE
+	for y in range(board.h):
+		for x in range(board.w):
+			TileAtlas.draw_tile(surface, bt.Tile.from_code(tiles[y * board.w + x]),
+					(pos[0] + x * tsize, pos[1] + y * tsize), tsize)
+	TileAtlas.draw_grid(surface, TileAtlas.C_GRID, pos,
+			(board.w * tsize, board.h * tsize), board.w, board.h)
+
+def main():
+	pygame.init()
+	tsize = brv.BoardView.TILE_SIZE
+
+	for w, h in SIZES:
+		board = bb.GameBoard(w, h)
+		for index in sorted(bs.Ship.FLEET):
+			board.place_ship(bs.Ship(index), 0, 2 * index, bb.GameBoard.O_HORIZONTAL)
+		view = brv.BoardView(board)
+		surface = pygame.Surface((w * tsize, h * tsize))
+		repeat = 5 if w <= 50 else 3
+
+		name = "{}x{}".format(w, h)
+		report("draw.rect render_tiles " + name,
+				best_of(lambda: draw_tiles(board, surface, board.our_tiles, (0, 0)), repeat),
+				"frame")
+		report("atlas render_tiles " + name,
+				best_of(lambda: view.render_tiles(surface, board.our_tiles, (0, 0)), repeat),
+				"frame")
+
+	for w, h in CAMERA_SIZES:
+		board = bb.GameBoard(w, h)
+		view = brv.BoardView(board, brc.Camera(VIEWPORT[0], VIEWPORT[1], brv.BoardView.TILE_SIZE))
+		def frame():
+			# Move the camera, so everything in sight is drawn again.
+			view.camera.moved = True
+			view.render()
+		report("camera render {}x{}".format(w, h), best_of(frame, 5), "frame")
+
+	pygame.quit()
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,65 @@
+"""
+Cost of checking the deadlines of many players once per tick,
+with the timing wheel scheduler against scanning every player's last heartbeat.
+
+Each player sends a heartbeat a second and the server ticks ten times
+a second, so a tenth of the players push their deadline back between
+ticks, and a few of them time out.
+
+Run from the bship directory:
+
+    python -m bench.bench_scheduler
+"""
+import random
+
+import scheduler as bsc
+from bench.timing import best_of, report
+
+TIMEOUT = 5.0
+TICK = 0.1
+# Share of the players, who stall.
+STALLED = 0.001
+
+def expired(key):
+	pass
+
+def main():
+	rnd = random.Random(0)
+	for num_players in (1000, 10000, 100000):
+		scheduler = bsc.Scheduler()
+		last_seen = {}
+		for key in range(num_players):
+			scheduler.schedule(key, rnd.uniform(0, TIMEOUT), expired, key)
+			last_seen[key] = 0.0
+
+		# Players, whose heartbeats arrive between two ticks (the stalled ones never do).
+		per_tick = int(num_players * TICK)
+		beats = [[key for key in rnd.sample(range(num_players), per_tick) if rnd.random() >= STALLED]
+				for i in range(10)]
+		state = {"tick": 0, "now": 0.0}
+
+		def wheel_tick():
+			state["tick"] += 1
+			state["now"] += TICK
+			for key in beats[state["tick"] % len(beats)]:
+				scheduler.schedule(key, TIMEOUT, expired, key)
+			scheduler.tick()
+
+		def scan_tick():
+			state["tick"] += 1
+			state["now"] += TICK
+			now = state["now"]
+			for key in beats[state["tick"] % len(beats)]:
+				last_seen[key] = now
+			# The way timeouts would be checked without a scheduler.
+			for key, seen in last_seen.items():
+				if now - seen > TIMEOUT:
+					expired(key)
+
+		report("wheel (tick alone), {} players".format(num_players),
+				best_of(scheduler.tick, 5, 10), "tick")
+		report("wheel, {} players".format(num_players), best_of(wheel_tick, 5, 10), "tick")
+		report("scan, {} players".format(num_players), best_of(scan_tick, 5, 10), "tick")
+
+if __name__ == '__main__':
+	main()
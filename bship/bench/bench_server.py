@@ -0,0 +1,148 @@
+"""
+Concurrent games per core of the headless server.
+
+The cost of a game is what the server spends on it each second:
+announcing its room once, handling a turn every TURN_PERIOD seconds
+(a player's ACK in, the next player's "your turn" out), a heartbeat
+from each player every HEARTBEAT_PERIOD seconds, and its share of the
+server's ticks (the deadlines and the board sync, every Server.TICK).
+They are measured on one core, through a LocalBroker connection,
+and the games one core can keep up with follow from them.
+The measurement is then repeated in a worker process per core,
+the way the server shards its rooms.
+
+Run from the bship directory:
+
+    python -m bench.bench_server
+"""
+import multiprocessing
+import timeit
+import uuid
+
+import localbroker as lb
+import protocol as bp
+import states as bst
+from server import Server
+from bench.timing import best_of, report
+
+NUM_ROOMS = 1000
+PLAYERS = 2
+# A turn every this many seconds, in each game.
+TURN_PERIOD = 1.0
+# A heartbeat from each player every this many seconds
+# (Client.HEARTBEAT_PERIOD).
+HEARTBEAT_PERIOD = 1.0
+
+timer = timeit.default_timer
+
+def hosted(num_rooms):
+	"""
+	A server with num_rooms full rooms, connected to a local broker,
+	and the turn ACKs its players would send (one round per room).
+	"""
+	broker = lb.LocalBroker()
+	server = Server()
+	for i in range(num_rooms):
+		server.add_room("Game {}".format(i + 1), (10, 10), PLAYERS)
+	channel = broker.connect()
+	server.init_queues(channel)
+
+	turns = []
+	for room in server.rooms.values():
+		for p in range(PLAYERS):
+			player = str(uuid.uuid4())
+			room.join(player, "Player {}".format(p))
+			turns.append((room.uuid, player))
+	server.outbox.flush(channel)
+	return server, channel, turns
+
+def turn_messages(turns):
+	"""
+	Encode the turn ACKs, as they arrive at the server.
+	"""
+	messages = []
+	for room_uuid, player in turns:
+		body = bp.Message.encode({
+				"id": bp.M_ACK,
+				"server_uuid": player,
+				"client_uuid": room_uuid,
+				"message": "Waiting for my turn",
+				"state": bst.S_GAME_WAITING})
+		messages.append((lb.Method(routing_key=room_uuid), body))
+	return messages
+
+def heartbeat_messages(turns):
+	"""
+	Encode a heartbeat from every player, as they arrive at the server.
+	"""
+	messages = []
+	for room_uuid, player in turns:
+		body = bp.Message.encode({
+				"id": bp.M_HEARTBEAT,
+				"server_uuid": room_uuid,
+				"client_uuid": player})
+		messages.append((lb.Method(routing_key=room_uuid), body))
+	return messages
+
+def handle(server, channel, messages):
+	"""
+	Handle the messages, and publish the replies.
+	Returns the seconds spent per message.
+	"""
+	start = timer()
+	for method, body in messages:
+		server.mq_room_cb(channel, method, None, body)
+	server.outbox.flush(channel)
+	return (timer() - start) / len(messages)
+
+def measure(num_rooms):
+	"""
+	Measure the seconds spent per announce, per turn, per heartbeat,
+	and per room on each tick.
+	"""
+	server, channel, turns = hosted(num_rooms)
+
+	def announce():
+		server.announce()
+		server.outbox.flush(channel)
+	t_announce = best_of(announce) / num_rooms
+
+	# Encoded just before handling, so none of them are stale.
+	t_turn = min(handle(server, channel, turn_messages(turns)) for r in range(5))
+	t_heartbeat = min(handle(server, channel, heartbeat_messages(turns)) for r in range(5))
+
+	def tick():
+		server.tick()
+		server.outbox.flush(channel)
+	t_tick = best_of(tick, 5, 10) / num_rooms
+	return t_announce, t_turn, t_heartbeat, t_tick
+
+def games_per_core(t_announce, t_turn, t_heartbeat, t_tick):
+	return 1.0 / (t_announce + t_turn / TURN_PERIOD
+			+ PLAYERS * t_heartbeat / HEARTBEAT_PERIOD + t_tick / Server.TICK)
+
+def worker(num_rooms):
+	return games_per_core(*measure(num_rooms))
+
+def main():
+	times = measure(NUM_ROOMS)
+	t_announce, t_turn, t_heartbeat, t_tick = times
+	report("announce, per room", t_announce)
+	report("turn, per room", t_turn)
+	report("heartbeat, per player", t_heartbeat)
+	report("tick, per room", t_tick)
+	print("{:<40} {:>12.0f} games (one turn per {}s)".format(
+			"games per core", games_per_core(*times), TURN_PERIOD))
+
+	num_workers = multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(num_workers)
+	try:
+		total = sum(pool.map(worker, [NUM_ROOMS] * num_workers))
+	finally:
+		pool.close()
+		pool.join()
+	print("{:<40} {:>12.0f} games".format(
+			"games, {} worker processes".format(num_workers), total))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,72 @@
+"""
+Cold start of the entry points: the time to import the client, the
+headless server and the protocol alone in a fresh interpreter (beyond
+the interpreter's own startup), and the heavy dependencies each of
+them pulls in. Fails (exit status 1) if any of them goes over its
+budget, or imports a dependency it should only load on first use.
+
+Python 2 has no -X importtime, so each entry point is timed as a
+whole; run it under Python 3's -X importtime for a breakdown by module.
+
+Run from the bship directory:
+
+    python -m bench.bench_startup
+"""
+import os
+import subprocess
+import sys
+import timeit
+
+# Entry points, and what they import.
+ENTRY_POINTS = [
+		("protocol", "import protocol"),
+		("headless", "import server, engine.game"),
+		("client", "import client"),
+		]
+# Seconds each entry point may take to import.
+BUDGETS = {
+		"protocol": 0.03,
+		"headless": 0.06,
+		"client": 0.08,
+		}
+# Dependencies, which are only to be imported on first use.
+HEAVY = ("pygame", "ocempgui", "pika", "numpy")
+REPEAT = 7
+
+BSHIP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(code):
+	"""
+	Run code in a fresh interpreter.
+	Returns the wall time and what it printed.
+	"""
+	start = timeit.default_timer()
+	out = subprocess.check_output([sys.executable, "-c", code], cwd=BSHIP)
+	return timeit.default_timer() - start, out
+
+def best(code):
+	"""
+	Get the best time of running code in a fresh interpreter.
+	"""
+	return min(run(code)[0] for r in range(REPEAT))
+
+def main():
+	bare = best("pass")
+	print("{:<40} {:>12.1f} ms".format("interpreter", bare * 1e3))
+
+	failed = False
+	for name, code in ENTRY_POINTS:
+		seconds = best(code) - bare
+		elapsed, out = run(code + "\nimport sys\nprint(' '.join(m for m in {!r} if m in sys.modules))".format(HEAVY))
+		loaded = out.split()
+		over = seconds > BUDGETS[name]
+		print("{:<40} {:>12.1f} ms (budget {:.0f} ms){}".format(
+				name, seconds * 1e3, BUDGETS[name] * 1e3, " OVER" if over else ""))
+		if loaded:
+			print("{:<40} {:>12}".format("  loaded", ", ".join(loaded)))
+		if over or loaded:
+			failed = True
+	return 1 if failed else 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Board synchronisation: bytes on the wire per turn, sending the whole
+board every turn against a snapshot on join and deltas of the changed
+cells after it, and the time to make and apply them.
+
+Run from the bship directory:
+
+    python -m bench.bench_sync
+"""
+import random
+import uuid
+
+import protocol as bp
+import sync as bsy
+import board.tile as bt
+
+from bench.timing import best_of, report
+
+SIZES = ((10, 10), (100, 100), (1000, 1000))
+# Shots per turn, and turns played.
+SHOTS = 1
+NUM_TURNS = 50
+
+def main():
+	rng = random.Random(0)
+	sender = str(uuid.uuid4())
+	recipient = str(uuid.uuid4())
+	codes = (ord(bt.Tile.T_WATER), ord(bt.Tile.T_BOMBED))
+	for w, h in SIZES:
+		name = "{}x{}".format(w, h)
+		tiles = bytearray(bt.Tile.T_VOID) * (w * h)
+		publisher = bsy.BoardPublisher(sender, bsy.B_THEIRS, tiles, w, h)
+		replica = bsy.BoardReplica(sender, bsy.B_THEIRS)
+		snapshot = bp.Message.encode(publisher.snapshot(recipient))
+		replica.apply(bp.Message.decode(snapshot))
+
+		full = 0
+		deltas = 0
+		for turn in range(NUM_TURNS):
+			shots = [rng.randrange(w * h) for i in range(SHOTS)]
+			for cell in shots:
+				# Always a change, so there's a delta to time afterwards.
+				tiles[cell] = codes[tiles[cell] == codes[0]]
+			full += len(bp.Message.encode(publisher.snapshot(recipient)))
+			if publisher.update(shots):
+				delta = bp.Message.encode(publisher.delta(recipient))
+				deltas += len(delta)
+				replica.apply(bp.Message.decode(delta))
+		assert replica.tiles == tiles
+
+		print("{:<40} {:>12.1f} B/turn".format(name + " snapshot every turn", full / float(NUM_TURNS)))
+		print("{:<40} {:>12.1f} B/turn (+{} B on join)".format(name + " deltas", deltas / float(NUM_TURNS), len(snapshot)))
+		report(name + " encode snapshot", best_of(lambda: bp.Message.encode(publisher.snapshot(recipient)), 3, 10))
+		report(name + " decode snapshot", best_of(lambda: bp.Message.decode(snapshot), 3, 10))
+		report(name + " encode delta", best_of(lambda: bp.Message.encode(publisher.delta(recipient)), 3, 1000))
+		report(name + " diff (whole board, no change)", best_of(lambda: publisher.update(), 3, 1))
+
+		# A shot a frame: looking at every cell, against only the dirty one.
+		shot = {"cell": 0}
+		def change():
+			cell = shot["cell"] = rng.randrange(w * h)
+			tiles[cell] = codes[tiles[cell] == codes[0]]
+		def scan():
+			change()
+			publisher.update(range(w * h))
+		def dirty():
+			change()
+			publisher.update([shot["cell"]])
+		report(name + " diff (whole board, one change)", best_of(scan, 3, 1))
+		report(name + " diff (dirty cells, one change)", best_of(dirty, 3, 100))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,59 @@
+"""
+Memory and construction time of a 1000x1000 GameBoard, with flyweight
+tiles and byte grids, against the old nested lists of Tile objects.
+
+Run from the bship directory:
+
+    python -m bench.bench_tile
+"""
+import sys
+
+import board.board as bb
+import board.tile as bt
+
+from bench.timing import best_of, report
+
+W = 1000
+H = 1000
+
+class DictTile():
+	"""
+	A tile the way it used to be: one object with its own __dict__ per cell.
+	"""
+	def __init__(self, tile=' '):
+		self.tile = tile
+
+def nested_grids(w, h):
+	"""
+	Our and their waters as nested lists of per-cell objects.
+	"""
+	our_tiles = [[DictTile(bt.Tile.T_WATER) for x in range(w)] for y in range(h)]
+	their_tiles = [[DictTile() for x in range(w)] for y in range(h)]
+	return our_tiles, their_tiles
+
+def nested_size(grid):
+	"""
+	Bytes taken by a nested list grid, including the cell objects.
+	"""
+	size = sys.getsizeof(grid)
+	for row in grid:
+		size += sys.getsizeof(row)
+		for cell in row:
+			size += sys.getsizeof(cell) + sys.getsizeof(cell.__dict__)
+	return size
+
+def main():
+	name = "{}x{}".format(W, H)
+
+	report("nested DictTile grids " + name, best_of(lambda: nested_grids(W, H), 3))
+	report("GameBoard " + name, best_of(lambda: bb.GameBoard(W, H), 3))
+
+	our_tiles, their_tiles = nested_grids(W, H)
+	nested = nested_size(our_tiles) + nested_size(their_tiles)
+	board = bb.GameBoard(W, H)
+	flat = sys.getsizeof(board.our_tiles) + sys.getsizeof(board.their_tiles)
+	print("{:<40} {:>12.1f} MiB".format("nested DictTile grids " + name, nested / 2.0 ** 20))
+	print("{:<40} {:>12.1f} MiB".format("GameBoard " + name, flat / 2.0 ** 20))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,264 @@
+"""
+The hot paths of the board, the wire format and the client, timed
+over a range of board sizes. The results are saved as JSON, and
+compared against a stored baseline: the suite fails (exit status 1)
+if any of them got slower by more than the threshold.
+
+Runs headless, on SDL's dummy video driver. The lobby list is only
+timed if OcempGUI is installed.
+
+Run from the bship directory:
+
+    python -m bench.suite
+    python -m bench.suite --out results.json --threshold 0.25
+    python -m bench.suite --save-baseline
+
+The baseline depends on the machine, save one before comparing. The
+stored one is the median of three runs on a single machine (Python 2.7,
+SDL's dummy driver), where the runs were up to about 20% apart: within
+the threshold there, but timings on other machines differ by far more.
+Other load on the machine makes for an occasional outlier: rerun the
+suite before taking a single regression at face value.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import sys
+import time
+import uuid
+
+import pygame
+
+import board.board as bb
+import board.ship as bs
+import render.board_view as brv
+import protocol as bp
+import lobby as bl
+import player as bpl
+import states as bst
+
+from bench.timing import best_of, report
+
+SIZES = [(10, 10), (50, 50), (100, 100)]
+# Servers in the lobby list.
+NUM_SERVERS = 1000
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Slowdown against the baseline (a share of it), which counts as a regression.
+THRESHOLD = 0.25
+
+def fleet_board(w, h):
+	"""
+	Get a board with the whole fleet on it.
+	"""
+	board = bb.GameBoard(w, h)
+	for index in sorted(bs.Ship.FLEET):
+		board.place_ship(bs.Ship(index), 0, 2 * index, bb.GameBoard.O_HORIZONTAL)
+	return board
+
+def board_cases(w, h):
+	"""
+	Time the board and its view on a board of the given size.
+	Returns (name, seconds per call) pairs.
+	"""
+	name = "{}x{}".format(w, h)
+	repeat = 5 if w * h <= 2500 else 3
+	results = []
+
+	results.append(("GameBoard.__init__ " + name,
+			best_of(lambda: bb.GameBoard(w, h), repeat, 200)))
+
+	def place_fleet():
+		board = bb.GameBoard(w, h)
+		for index in sorted(bs.Ship.FLEET):
+			board.place_ship(bs.Ship(index), 0, 2 * index, bb.GameBoard.O_HORIZONTAL)
+	fleet = best_of(place_fleet, 2 * repeat, 5)
+	results.append(("GameBoard.place_ship " + name, fleet / len(bs.Ship.FLEET)))
+
+	board = fleet_board(w, h)
+	view = brv.BoardView(board)
+	tsize = brv.BoardView.TILE_SIZE
+	surface = pygame.Surface((w * tsize, h * tsize))
+	results.append(("BoardView.render_tiles " + name,
+			best_of(lambda: view.render_tiles(surface, board.our_tiles, (0, 0)), repeat)))
+
+	def first_frame():
+		view.layer = None
+		view.render()
+	results.append(("BoardView.render (full) " + name, best_of(first_frame, repeat)))
+
+	# A shot a frame, the way a game goes.
+	shots = {"next": 0}
+	def frame():
+		cell = shots["next"] % (w * h)
+		shots["next"] += 1
+		board.mark_shot(cell % w, cell // w, bb.GameBoard.R_MISS)
+		view.render()
+	view.render()
+	results.append(("BoardView.render (shot) " + name, best_of(frame, repeat, 100)))
+
+	player = bpl.Player()
+	player.start_placing_ships()
+	mouse = [(x * tsize, y * tsize) for y in range(0, h, max(1, h // 10)) for x in range(0, w, max(1, w // 10))]
+	def sweep_cursor():
+		for pos in mouse:
+			view.update_cursor(player, pos)
+	results.append(("BoardView.update_cursor " + name,
+			best_of(sweep_cursor, repeat, 10) / len(mouse)))
+
+	their = view.their_pos()
+	aim = [(their[0] + x, y) for x, y in mouse]
+	def sweep_crosshair():
+		for pos in aim:
+			view.update_crosshair(pos)
+	results.append(("BoardView.update_crosshair " + name,
+			best_of(sweep_crosshair, repeat, 10) / len(aim)))
+	return results
+
+def protocol_cases():
+	"""
+	Time encoding and decoding the most frequent messages.
+	"""
+	server = str(uuid.uuid4())
+	client = str(uuid.uuid4())
+	messages = [
+			("announce", {
+				"id": bp.M_ANNOUNCE,
+				"uuid": server,
+				"boardsize": (10, 10),
+				"num_players": (1, 2),
+				"name": "Ship Wreckyard"}),
+			("ack", {
+				"id": bp.M_ACK,
+				"server_uuid": server,
+				"client_uuid": client,
+				"message": "Server: Your turn",
+				"state": bst.S_GAME_SHOOTING}),
+			]
+	results = []
+	for name, message in messages:
+		encoded = bp.Message.encode(message)
+		results.append(("Message.encode " + name,
+				best_of(lambda: bp.Message.encode(message), 5, 2000)))
+		results.append(("Message.decode " + name,
+				best_of(lambda: bp.Message.decode(encoded), 5, 2000)))
+	return results
+
+def player_cases():
+	"""
+	Time going through the fleet, ship by ship.
+	"""
+	def whole_fleet():
+		player = bpl.Player()
+		player.start_placing_ships()
+		while player.next_ship() is not None:
+			pass
+	return [("Player.next_ship", best_of(whole_fleet, 5, 100) / len(bs.Ship.FLEET))]
+
+def lobby_cases():
+	"""
+	Time a lobby frame, with a few servers changing in between.
+	Returns nothing without OcempGUI.
+	"""
+	try:
+		import ocempgui.widgets as ow
+		from gui.gui import GUI
+	except ImportError:
+		print("{:<40} {:>12}".format("GUI.process_serverlist", "skipped (no OcempGUI)"))
+		return []
+
+	renderer = ow.Renderer()
+	renderer.create_screen(800, 600)
+	gui = GUI(renderer)
+	gui.show_lobby()
+
+	directory = bl.LobbyDirectory(ttl=3600.0)
+	servers = [{
+			"id": bp.M_ANNOUNCE,
+			"uuid": str(uuid.uuid4()),
+			"boardsize": (10, 10),
+			"num_players": (1, 4),
+			"name": "Game {}".format(i),
+			"timestamp": time.time()} for i in range(NUM_SERVERS)]
+	for server in servers:
+		directory.announce(bp.Message(dict(server)))
+	gui.process_serverlist(directory)
+
+	state = {"frame": 0}
+	def frame():
+		# One server in a hundred changes every frame.
+		state["frame"] += 1
+		for server in servers[state["frame"] % 100::100]:
+			server["num_players"] = (state["frame"] % 4 + 1, 4)
+			directory.announce(bp.Message(dict(server)))
+		gui.process_serverlist(directory)
+	return [("GUI.process_serverlist {} servers".format(NUM_SERVERS), best_of(frame, 5, 10))]
+
+def run():
+	"""
+	Run every benchmark.
+	Returns a dict of seconds per call, by benchmark name.
+	"""
+	pygame.init()
+	results = []
+	try:
+		for w, h in SIZES:
+			results.extend(board_cases(w, h))
+		results.extend(protocol_cases())
+		results.extend(player_cases())
+		results.extend(lobby_cases())
+	finally:
+		pygame.quit()
+	for name, seconds in results:
+		report(name, seconds)
+	return dict(results)
+
+def compare(results, baseline, threshold):
+	"""
+	Get the benchmarks slower than the baseline by more than the threshold,
+	as (name, seconds, baseline seconds) tuples.
+	Benchmarks missing from either side are left out.
+	"""
+	slower = []
+	for name in sorted(results):
+		if name in baseline and results[name] > baseline[name] * (1.0 + threshold):
+			slower.append((name, results[name], baseline[name]))
+	return slower
+
+def main():
+	parser = argparse.ArgumentParser(description="Battleship benchmark suite")
+	parser.add_argument("--out", default=None, help="save the results to a JSON file")
+	parser.add_argument("--baseline", default=BASELINE, help="the JSON file of the baseline results")
+	parser.add_argument("--threshold", type=float, default=THRESHOLD,
+			help="slowdown (a share of the baseline), which counts as a regression")
+	parser.add_argument("--save-baseline", action="store_true", help="save the results as the baseline")
+	args = parser.parse_args()
+
+	results = run()
+	if args.out is not None:
+		with open(args.out, "w") as f:
+			json.dump(results, f, indent=1, sort_keys=True, separators=(",", ": "))
+	if args.save_baseline:
+		with open(args.baseline, "w") as f:
+			json.dump(results, f, indent=1, sort_keys=True, separators=(",", ": "))
+		print("Saved the baseline to {}".format(args.baseline))
+		return 0
+
+	if not os.path.exists(args.baseline):
+		print("No baseline at {}, save one with --save-baseline".format(args.baseline))
+		return 0
+	with open(args.baseline) as f:
+		baseline = json.load(f)
+	slower = compare(results, baseline, args.threshold)
+	for name, seconds, before in slower:
+		print("REGRESSION {:<40} {:>12.3f} us/call, was {:.3f} us/call (+{:.0f}%)".format(
+				name, seconds * 1e6, before * 1e6, 100.0 * (seconds / before - 1.0)))
+	if slower:
+		return 1
+	print("No regressions beyond {:.0f}% of the baseline".format(100.0 * args.threshold))
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,23 @@
+import timeit
+
+def best_of(func, repeat = 5, number = 1):
+	"""
+	Run a function number times in a row, repeat times over,
+	and return the best time per call in seconds.
+	"""
+	timer = timeit.default_timer
+	best = None
+	for r in range(repeat):
+		start = timer()
+		for n in range(number):
+			func()
+		elapsed = (timer() - start) / number
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+def report(name, seconds, unit = "call"):
+	"""
+	Print a single benchmark result.
+	"""
+	print("{:<40} {:>12.3f} us/{}".format(name, seconds * 1e6, unit))
@@ -0,0 +1,263 @@
+import numpy as np
+
+import tile as bt
+import ship as bs
+import board as bb
+import bitboard as bbit
+
+# Tile codes as array values.
+C_VOID = ord(bt.Tile.T_VOID)
+C_WATER = ord(bt.Tile.T_WATER)
+C_OCCUPIED = ord(bt.Tile.T_OCCUPIED)
+C_BOMBED = ord(bt.Tile.T_BOMBED)
+
+class BoardBatch():
+	"""
+	A batch of game boards, stored as stacked arrays (games x h x w),
+	so that placement and shots are applied to all of them at once.
+	Tiles use the same codes as bt.Tile.
+
+	Board indices passed to a single call must be unique.
+	"""
+
+	O_HORIZONTAL = 0
+	O_VERTICAL = 1
+
+	# Shot results (same as BitBoard), plus one for invalid shots.
+	R_INVALID = -1
+	R_MISS = bbit.BitBoard.R_MISS
+	R_HIT = bbit.BitBoard.R_HIT
+	R_SUNK = bbit.BitBoard.R_SUNK
+
+	def __init__(self, n, w = 10, h = 10, seed = None):
+		self.n = n
+		self.w = w
+		self.h = h
+		self.num_ships = len(bs.Ship.FLEET)
+		self.rng = np.random.RandomState(seed)
+
+		# Our waters of every board.
+		self.tiles = np.empty((n, h, w), dtype=np.uint8)
+		# What the opponent sees of every board.
+		self.views = np.empty((n, h, w), dtype=np.uint8)
+		# Index of the ship on each tile, or -1.
+		self.ship_ids = np.empty((n, h, w), dtype=np.int16)
+		# Bombed tiles.
+		self.bombed = np.empty((n, h, w), dtype=bool)
+		# Position and orientation of each ship, or -1 if not placed.
+		self.anchors = np.empty((n, self.num_ships, 3), dtype=np.int32)
+		# Segments of each ship left to bomb.
+		self.remaining = np.empty((n, self.num_ships), dtype=np.int32)
+
+		self.reset()
+
+	def reset(self, boards = None):
+		"""
+		Clear the given boards (all of them by default).
+		"""
+		if boards is None:
+			boards = slice(None)
+		self.tiles[boards] = C_WATER
+		self.views[boards] = C_VOID
+		self.ship_ids[boards] = -1
+		self.bombed[boards] = False
+		self.anchors[boards] = -1
+		self.remaining[boards] = 0
+
+	@staticmethod
+	def dilate(mask):
+		"""
+		Grow a stack of masks by one tile in all eight directions.
+		"""
+		m, h, w = mask.shape
+		padded = np.zeros((m, h + 2, w + 2), dtype=bool)
+		padded[:, 1:-1, 1:-1] = mask
+		out = np.zeros_like(mask)
+		for dy in range(3):
+			for dx in range(3):
+				out |= padded[:, dy:dy + h, dx:dx + w]
+		return out
+
+	def legal_anchors(self, size, boards = None):
+		"""
+		Get a (boards x 2 x h x w) mask of every position and orientation
+		a ship of the given size can be placed at.
+		"""
+		if boards is None:
+			boards = np.arange(self.n)
+		free = (self.tiles[boards] == C_WATER)
+		m, h, w = free.shape
+
+		legal = np.zeros((m, 2, h, w), dtype=bool)
+		# Count free tiles in a sliding window along each axis.
+		if size <= w:
+			c = np.zeros((m, h, w + 1), dtype=np.int32)
+			np.cumsum(free, axis=2, dtype=np.int32, out=c[:, :, 1:])
+			legal[:, BoardBatch.O_HORIZONTAL, :, :w - size + 1] = \
+					(c[:, :, size:] - c[:, :, :w - size + 1]) == size
+		if size <= h:
+			c = np.zeros((m, h + 1, w), dtype=np.int32)
+			np.cumsum(free, axis=1, dtype=np.int32, out=c[:, 1:, :])
+			legal[:, BoardBatch.O_VERTICAL, :h - size + 1, :] = \
+					(c[:, size:, :] - c[:, :h - size + 1, :]) == size
+		return legal
+
+	def place(self, boards, index, xs, ys, orientations):
+		"""
+		Place ship number index on each of the given boards.
+		Returns a mask of the boards where the ship was placed,
+		the rest are left untouched.
+		"""
+		boards = np.asarray(boards)
+		xs = np.asarray(xs)
+		ys = np.asarray(ys)
+		orientations = np.asarray(orientations)
+		size = bs.Ship.FLEET[index][0]
+
+		# Tiles of the ship on each board.
+		steps = np.arange(size)
+		dx = (orientations == BoardBatch.O_HORIZONTAL)
+		dy = (orientations == BoardBatch.O_VERTICAL)
+		cx = xs[:, None] + steps * dx[:, None]
+		cy = ys[:, None] + steps * dy[:, None]
+
+		# Check if there's enough space first.
+		ok = ((cx >= 0) & (cx < self.w) & (cy >= 0) & (cy < self.h)).all(axis=1)
+		ok &= (self.anchors[boards, index, 0] < 0)
+		cx = np.clip(cx, 0, self.w - 1)
+		cy = np.clip(cy, 0, self.h - 1)
+		ok &= (self.tiles[boards[:, None], cy, cx] == C_WATER).all(axis=1)
+
+		b = boards[ok]
+		cx = cx[ok]
+		cy = cy[ok]
+
+		# Mark the tiles occupied by the ship.
+		self.tiles[b[:, None], cy, cx] = ord(bs.Ship(index).tile().tile)
+		self.ship_ids[b[:, None], cy, cx] = index
+		self.anchors[b, index, 0] = xs[ok]
+		self.anchors[b, index, 1] = ys[ok]
+		self.anchors[b, index, 2] = orientations[ok]
+		self.remaining[b, index] = size
+
+		# Create a tile boundary around the ship.
+		mask = np.zeros((len(b), self.h, self.w), dtype=bool)
+		mask[np.arange(len(b))[:, None], cy, cx] = True
+		halo = BoardBatch.dilate(mask) & (self.tiles[b] == C_WATER)
+		tiles = self.tiles[b]
+		tiles[halo] = C_OCCUPIED
+		self.tiles[b] = tiles
+
+		return ok
+
+	def place_fleet(self, boards = None, tries = 100):
+		"""
+		Place the whole fleet at random on the given boards (all by default).
+		Every ship is drawn uniformly from its legal positions.
+		"""
+		if boards is None:
+			boards = np.arange(self.n)
+		boards = np.asarray(boards)
+		self.reset(boards)
+
+		while len(boards) > 0:
+			if tries <= 0:
+				raise ValueError("The fleet doesn't fit on the board!")
+			tries -= 1
+			failed = np.zeros(len(boards), dtype=bool)
+			for index in sorted(bs.Ship.FLEET):
+				legal = self.legal_anchors(bs.Ship.FLEET[index][0], boards)
+				legal = legal.reshape(len(boards), -1) & ~failed[:, None]
+				# Pick a random legal anchor on each board.
+				scores = self.rng.random_sample(legal.shape)
+				scores[~legal] = -1.0
+				choice = scores.argmax(axis=1)
+				orient, ys, xs = np.unravel_index(choice, (2, self.h, self.w))
+
+				found = legal.any(axis=1)
+				failed |= ~found
+				self.place(boards[found], index, xs[found], ys[found], orient[found])
+
+			# Start over on the boards that ran out of space.
+			boards = boards[failed]
+			self.reset(boards)
+
+	def place_fleets(self, anchors, boards = None):
+		"""
+		Place whole fleets on the given boards (all by default), from an
+		(boards x ships x 3) array of the (x, y, orientation) of each ship
+		(e.g. drawn by fleet.FleetSampler.sample_many).
+		Returns a mask of the boards where the whole fleet was placed.
+		"""
+		if boards is None:
+			boards = np.arange(self.n)
+		boards = np.asarray(boards)
+		self.reset(boards)
+
+		ok = np.ones(len(boards), dtype=bool)
+		for index in sorted(bs.Ship.FLEET):
+			ok &= self.place(boards, index,
+					anchors[:, index, 0], anchors[:, index, 1], anchors[:, index, 2])
+		return ok
+
+	def shoot(self, xs, ys, boards = None):
+		"""
+		Bomb one tile on each of the given boards (all by default).
+		Returns an array of R_* results.
+		"""
+		if boards is None:
+			boards = np.arange(self.n)
+		boards = np.asarray(boards)
+		xs = np.asarray(xs)
+		ys = np.asarray(ys)
+
+		result = np.full(len(boards), BoardBatch.R_INVALID, dtype=np.int8)
+		# Skip shots outside the board and at already bombed tiles.
+		valid = (xs >= 0) & (xs < self.w) & (ys >= 0) & (ys < self.h)
+		cx = np.clip(xs, 0, self.w - 1)
+		cy = np.clip(ys, 0, self.h - 1)
+		valid &= ~self.bombed[boards, cy, cx]
+
+		b = boards[valid]
+		cx = cx[valid]
+		cy = cy[valid]
+		self.bombed[b, cy, cx] = True
+
+		ship = self.ship_ids[b, cy, cx]
+		hit = (ship >= 0)
+		self.views[b, cy, cx] = np.where(hit, C_BOMBED, C_WATER)
+
+		res = np.where(hit, BoardBatch.R_HIT, BoardBatch.R_MISS)
+		self.remaining[b[hit], ship[hit]] -= 1
+		sunk = (self.remaining[b[hit], ship[hit]] == 0)
+		res[hit] = np.where(sunk, BoardBatch.R_SUNK, BoardBatch.R_HIT)
+		result[valid] = res
+		return result
+
+	def is_destroyed(self):
+		"""
+		Get a mask of the boards, whose whole fleet has been sunk.
+		"""
+		placed = (self.anchors[:, :, 0] >= 0).any(axis=1)
+		return placed & (self.remaining.sum(axis=1) == 0)
+
+	def to_gameboard(self, i, opponent = None):
+		"""
+		Pull a single board out into a regular GameBoard, with its
+		ships and the shots taken at it so far.
+		Foreign waters are taken from the opponent board, if given.
+		"""
+		gb = bb.GameBoard(self.w, self.h)
+		# Placed the usual way, so that the board keeps track of its ships.
+		for index in range(self.num_ships):
+			x, y, orientation = self.anchors[i, index]
+			if x >= 0:
+				gb.place_ship(bs.Ship(index), int(x), int(y), int(orientation))
+		# Then the shots taken so far, which count down the hits left.
+		ys, xs = self.bombed[i].nonzero()
+		for x, y in zip(xs, ys):
+			gb.shoot(int(x), int(y))
+		if opponent is not None:
+			# Both use the same codes, row by row.
+			gb.their_tiles[:] = self.views[opponent].tobytes()
+		return gb
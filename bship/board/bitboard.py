@@ -0,0 +1,161 @@
+class BitBoard():
+	"""
+	A game board, which keeps its layers as packed integer bitmasks.
+	Cell (x, y) maps to bit (y * w + x) of every layer.
+	"""
+
+	O_HORIZONTAL = 0
+	O_VERTICAL = 1
+
+	# Shot results.
+	R_MISS = 0
+	R_HIT = 1
+	R_SUNK = 2
+
+	def __init__(self, w = 10, h = 10):
+		self.w = w
+		self.h = h
+
+		# Every cell of the board.
+		self.m_board = (1 << (w * h)) - 1
+		# The leftmost column (one bit per row).
+		self.m_column = self.m_board // ((1 << w) - 1)
+		# Masks for keeping horizontal shifts from
+		# wrapping around into the neighbouring row.
+		self.m_not_left = self.m_board & ~self.m_column
+		self.m_not_right = self.m_board & ~(self.m_column << (w - 1))
+
+		# Cells taken by ships and the boundaries around them.
+		self.occupied = 0
+		# Boundaries around the ships.
+		self.halo = 0
+		# Ship segments.
+		self.ship = 0
+		# Bombed cells.
+		self.bombed = 0
+
+		# List of our ships and the cells of each of them.
+		self.ships = []
+		self.ship_masks = []
+		# Index of the ship (in self.ships) on each cell, so that looking
+		# a cell up doesn't go through every ship's mask.
+		self.ship_cells = {}
+		# Number of segments left to bomb, for each ship.
+		self.hits_left = []
+		# Number of ships still afloat.
+		self.num_afloat = 0
+
+	def bit(self, x, y):
+		"""
+		Get the bit of a single cell.
+		"""
+		return 1 << (y * self.w + x)
+
+	def cells(self, mask):
+		"""
+		Get the cells (bit indices) set in a mask, in order.
+		"""
+		# Scanning the binary digits is done in C, unlike testing every bit.
+		digits = bin(mask)[:1:-1]
+		cell = digits.find("1")
+		while cell >= 0:
+			yield cell
+			cell = digits.find("1", cell + 1)
+
+	def ship_mask(self, size, x, y, orientation):
+		"""
+		Get the cells of a ship, or None if it doesn't fit on the board.
+		"""
+		if x < 0 or y < 0:
+			return None
+		if orientation == BitBoard.O_HORIZONTAL:
+			if x + size > self.w or y >= self.h:
+				return None
+			run = (1 << size) - 1
+		else:
+			if x >= self.w or y + size > self.h:
+				return None
+			run = self.m_column & ((1 << (size * self.w)) - 1)
+		return run << (y * self.w + x)
+
+	def dilate(self, mask):
+		"""
+		Grow a mask by one cell in all eight directions.
+		"""
+		row = (mask
+				| ((mask << 1) & self.m_not_left)
+				| ((mask >> 1) & self.m_not_right))
+		return (row | (row << self.w) | (row >> self.w)) & self.m_board
+
+	def can_place(self, size, x, y, orientation):
+		"""
+		Check whether a ship of the given size fits at the given position.
+		"""
+		mask = self.ship_mask(size, x, y, orientation)
+		return mask is not None and not (mask & self.occupied)
+
+	def place_ship(self, ship, x, y, orientation):
+		"""
+		Place a ship on the board.
+		"""
+		mask = self.ship_mask(ship.size, x, y, orientation)
+		if mask is None:
+			raise ValueError("The ship doesn't fit on the board!")
+		if mask & self.occupied:
+			raise ValueError("You already have a ship there!")
+
+		# Enlist the ship in the navy.
+		ship.place(x, y, orientation)
+		self.ships.append(ship)
+		self.ship_masks.append(mask)
+		self.hits_left.append(ship.size)
+		self.num_afloat += 1
+		step = 1 if orientation == BitBoard.O_HORIZONTAL else self.w
+		start = y * self.w + x
+		for cell in range(start, start + ship.size * step, step):
+			self.ship_cells[cell] = len(self.ships) - 1
+
+		# Mark the ship and the boundary around it.
+		area = self.dilate(mask)
+		self.occupied |= area
+		self.halo |= area & ~mask
+		self.ship |= mask
+
+	def ship_at(self, x, y):
+		"""
+		Get the index of the ship at the given cell (in self.ships),
+		or None if there's no ship there.
+		"""
+		return self.ship_cells.get(y * self.w + x)
+
+	def is_hit(self, x, y):
+		"""
+		Check whether a shot at the given cell would hit a ship.
+		"""
+		return bool(self.ship & self.bit(x, y))
+
+	def shoot(self, x, y):
+		"""
+		Bomb a cell and report the result.
+		"""
+		if x < 0 or x >= self.w or y < 0 or y >= self.h:
+			raise ValueError("Shot outside the board!")
+		bit = self.bit(x, y)
+		if self.bombed & bit:
+			raise ValueError("That tile is already bombed!")
+		self.bombed |= bit
+
+		index = self.ship_cells.get(y * self.w + x)
+		if index is None:
+			return BitBoard.R_MISS
+		self.hits_left[index] -= 1
+		if self.hits_left[index] > 0:
+			return BitBoard.R_HIT
+		self.num_afloat -= 1
+		return BitBoard.R_SUNK
+
+	def is_destroyed(self):
+		"""
+		Check whether every ship has been sunk.
+		"""
+		return len(self.ships) > 0 and self.num_afloat == 0
@@ -1,7 +1,8 @@
 import logging
-import pygame
+import logs as blg
 import tile as bt
 import ship as bs
+import bitboard as bbit
 
 class GameBoard():
 	"""
@@ -13,41 +14,61 @@ class GameBoard():
 	O_HORIZONTAL = 0
 	O_VERTICAL = 1
 
+	# Shot results.
+	R_MISS = bbit.BitBoard.R_MISS
+	R_HIT = bbit.BitBoard.R_HIT
+	R_SUNK = bbit.BitBoard.R_SUNK
+
 	def __init__(self, w = 10, h = 10):
 		self.log = logging.getLogger("BShip.Board")
 
 		self.w = w
 		self.h = h
-		# Create a 2D array of our own waters.
-		self.our_tiles = [[bt.Tile(bt.Tile.T_WATER) for x in range(w)] for y in range(h)]
-		# Create a 2D array of foreign waters.
-		self.their_tiles = [[bt.Tile() for x in range(w)] for y in range(h)]
+		# Our own waters, as tile codes (row by row).
+		self.our_tiles = bytearray([bt.Tile(bt.Tile.T_WATER).code()]) * (w * h)
+		# Foreign waters, as tile codes (row by row).
+		self.their_tiles = bytearray([bt.Tile().code()]) * (w * h)
 		# List of our ships.
 		self.ships = []
+		# Index of the ship (in self.ships) on each of our tiles (row by row).
+		self.ship_cells = {}
+		# Number of segments left to bomb, for each of our ships.
+		self.hits_left = []
+		# Number of our ships still afloat.
+		self.num_afloat = 0
+		# Tiles changed since they were last drawn (row by row indices).
+		self.dirty_ours = set()
+		self.dirty_theirs = set()
 
 		# Cursor parameters.
 		self.cur_pos = (0, 0)
 		self.cur_orient = GameBoard.O_HORIZONTAL
 
+	def dump_text(self):
+		"""
+		Get the gameboard as text.
+		"""
+		lines = ["Our waters ... foreign waters:"]
+		our_tiles = self.our_tiles
+		their_tiles = self.their_tiles
+		for y in range(self.h):
+			row = slice(y * self.w, (y + 1) * self.w)
+			lines.append(" ".join(chr(c) for c in our_tiles[row]) + " \t " +
+					" ".join(chr(c) for c in their_tiles[row]))
+		return "\n".join(lines)
+
 	def dump(self):
 		"""
 		Print the gameboard.
 		"""
-		print("Our waters ... foreign waters:")
-		for y in range(self.h):
-			for x in range(self.w):
-				print(self.our_tiles[x][y]),
-			print("\t"),
-			for x in range(self.w):
-				print(str(self.their_tiles[x][y])),
-			print("")
+		print(self.dump_text())
 	
 	def get_our_tile(self, x, y):
 		"""
 		Get our tile by coordinates.
 		"""
 		if x >= 0 and x < self.w and y >= 0 and y < self.h:
-			return self.our_tiles[x][y]
+			return bt.Tile.from_code(self.our_tiles[y * self.w + x])
 		return None
 
 	def set_our_tile(self, x, y, value):
@@ -55,7 +76,24 @@ class GameBoard():
 		Set our tile at specific coordinates.
 		"""
 		if x >= 0 and x < self.w and y >= 0 and y < self.h:
-			self.our_tiles[x][y] = value
+			self.our_tiles[y * self.w + x] = value.code()
+			self.dirty_ours.add(y * self.w + x)
+
+	def get_their_tile(self, x, y):
+		"""
+		Get a tile of foreign waters by coordinates.
+		"""
+		if x >= 0 and x < self.w and y >= 0 and y < self.h:
+			return bt.Tile.from_code(self.their_tiles[y * self.w + x])
+		return None
+
+	def set_their_tile(self, x, y, value):
+		"""
+		Set a tile of foreign waters at specific coordinates.
+		"""
+		if x >= 0 and x < self.w and y >= 0 and y < self.h:
+			self.their_tiles[y * self.w + x] = value.code()
+			self.dirty_theirs.add(y * self.w + x)
 	
 	def place_ship(self, ship, x, y, orientation):
 		"""
@@ -66,13 +104,17 @@ class GameBoard():
 		# Check if there's enough space first.
 		for i in range(ship.size):
 			tile = self.get_our_tile(x + i * dx, y + i * dy)
+			if tile is None:
+				raise ValueError("The ship doesn't fit on the board!")
 			if not tile.is_free():
 				raise ValueError("You already have a ship there!")
 
-		self.dump()
 		# Enlist the ship in the navy.
 		ship.place(x, y, orientation)
 		self.ships.append(ship)
+		self.hits_left.append(ship.size)
+		self.num_afloat += 1
+		ship_index = len(self.ships) - 1
 		# Mark the tiles occupied by the ship.
 		for i in range(ship.size):
 			cx = x + i * dx
@@ -149,15 +191,72 @@ class GameBoard():
 
 			# Create the ship tile by tile.
 			self.set_our_tile(cx, cy, ship.tile())
+			self.ship_cells[cy * self.w + cx] = ship_index
 
-		self.dump()
+		# Only put the dump together, if anyone's listening.
+		if self.log.isEnabledFor(blg.DUMP):
+			self.log.log(blg.DUMP, "Placed %s\n%s", ship.name, self.dump_text())
 	
+	def shoot(self, x, y):
+		"""
+		Take a shot at our waters.
+		Returns one of the R_* results.
+		"""
+		if x < 0 or x >= self.w or y < 0 or y >= self.h:
+			raise ValueError("Shot outside the board!")
+		cell = y * self.w + x
+		if self.our_tiles[cell] == bt.Tile(bt.Tile.T_BOMBED).code():
+			raise ValueError("That tile is already bombed!")
+		self.our_tiles[cell] = bt.Tile(bt.Tile.T_BOMBED).code()
+		self.dirty_ours.add(cell)
+
+		ship_index = self.ship_cells.get(cell)
+		if ship_index is None:
+			return GameBoard.R_MISS
+		self.hits_left[ship_index] -= 1
+		if self.hits_left[ship_index] > 0:
+			return GameBoard.R_HIT
+		self.num_afloat -= 1
+		return GameBoard.R_SUNK
+
+	def is_destroyed(self):
+		"""
+		Check whether our whole fleet has been sunk.
+		"""
+		return len(self.ships) > 0 and self.num_afloat == 0
+
+	def take_dirty(self):
+		"""
+		Get the tiles of both waters changed since the last call,
+		and start tracking anew.
+		"""
+		dirty = (self.dirty_ours, self.dirty_theirs)
+		self.dirty_ours = set()
+		self.dirty_theirs = set()
+		return dirty
+
+	def mark_shot(self, x, y, result):
+		"""
+		Mark the result of our shot on foreign waters.
+		"""
+		if result == GameBoard.R_MISS:
+			self.set_their_tile(x, y, bt.Tile(bt.Tile.T_WATER))
+		else:
+			self.set_their_tile(x, y, bt.Tile(bt.Tile.T_BOMBED))
+
+	def crosshair_target(self):
+		"""
+		Get the tile of foreign waters under the crosshair, or None.
+		"""
+		if self.cur_pos == None:
+			return None
+		return (self.cur_pos[0] - (self.w + 1), self.cur_pos[1])
+
 	def clicked(self, player, pos):
 		"""
 		Event handler for gameboard clicks.
 		"""
 		try:
-			print "Clicked"
 			if player.is_placing_ships():
 				self.place_ship(player.current_ship(), 
 						self.cur_pos[0], self.cur_pos[1], self.cur_orient)
@@ -175,61 +274,11 @@ class GameBoard():
 		else:
 			self.cur_orient = GameBoard.O_HORIZONTAL
 
-	def render_grid(self, surface, color, pos, size):
+	def update_cursor(self, player, cpos):
 		"""
-		Render a gameboard grid with the specified
-		position, size, and color.
-		"""
-		ax, ay = pos
-		sx, sy = size
-		bx = ax + sx
-		by = ay + sy
-
-		tsx = sx / self.w
-		tsy = sy / self.h
-
-		# Draw vertical lines.
-		for x in range(ax, bx, tsx):
-			pygame.draw.aaline(
-					surface, color, 
-					(x, ay), (x, by), 1)
-		# Draw horizontal lines.
-		for y in range(ay, by, tsy):
-			pygame.draw.aaline(
-					surface, color, 
-					(ax, y), (bx, y), 1)
-		# Draw a rect around it.
-		pygame.draw.rect(surface, color, (ax, ay, sx, sy), 1)
-
-	def render_tiles(self, surface, tiles, pos):
-		"""
-		Render board tiles.
-		"""
-		# TODO:: Make it scalable.
-
-		tsize = bt.Tile.SIZE
-
-		# Render tiles.
-		for y in range(self.h):
-			for x in range(self.w):
-				tile = tiles[x][y]
-				tile.render(surface, 
-						(pos[0] + x * tsize, 
-							pos[1] + y * tsize))
-		# Render the grid on top.
-		color = (0, 51, 102, 0)
-		self.render_grid(
-				surface, color, 
-				pos, (self.w * tsize, self.h * tsize))
-
-	def update_cursor(self, player, pos):
+		Update the position of the ship to be placed,
+		given the tile under the mouse cursor.
 		"""
-		Update cursor position and the size of the highlight rectangle
-		that follows the cursor.
-		"""
-		tsize = bt.Tile.SIZE
-		cpos = (pos[0] / tsize, pos[1] / tsize)
-
 		ship = player.current_ship()
 
 		self.cur_pos = None
@@ -237,7 +286,7 @@ class GameBoard():
 		# Horizontal placement?
 		if self.cur_orient == bs.Ship.O_HORIZONTAL:
 			# Shift mouse to the center of the ship.
-			cpos = (cpos[0] - ship.size / 2, cpos[1])
+			cpos = (cpos[0] - ship.size // 2, cpos[1])
 			# Clamp to board edge.
 			if cpos[0] < 0:
 				cpos = (0, cpos[1])
@@ -249,7 +298,7 @@ class GameBoard():
 		# Vertical placement?
 		elif self.cur_orient == bs.Ship.O_VERTICAL:
 			# Shift mouse to the center of the ship.
-			cpos = (cpos[0], cpos[1] - ship.size / 2)
+			cpos = (cpos[0], cpos[1] - ship.size // 2)
 			# Clamp to board edge.
 			if cpos[1] < 0:
 				cpos = (cpos[0], 0)
@@ -259,28 +308,16 @@ class GameBoard():
 			if cpos[0] >= 0 and cpos[0] < self.w and cpos[1] >= 0:
 				self.cur_pos = cpos
 
-	def render_cursor(self, surface, player):
-		"""
-		Render a highlight rectangle around the imaginary ship to be placed.
-		"""
-		color = (255, 255, 255, 0)
-		ship = player.current_ship()
-
+		# Move the imaginary ship to the cursor.
 		if self.cur_pos != None:
-			if self.cur_orient == bs.Ship.O_HORIZONTAL:
-				ship.place(self.cur_pos[0], self.cur_pos[1], bs.Ship.O_HORIZONTAL)
-			elif self.cur_orient == bs.Ship.O_VERTICAL:
-				ship.place(self.cur_pos[0], self.cur_pos[1], bs.Ship.O_VERTICAL)
-
-		# In the end, just draw a rectangle.
-		pygame.draw.rect(
-				surface, color,
-				ship.rect(), 1)
-	
-	def update_crosshair(self, pos):
-		tsize = bt.Tile.SIZE
-		cpos = (pos[0] / tsize, pos[1] / tsize)
+			ship.place(self.cur_pos[0], self.cur_pos[1], self.cur_orient)
 
+	def update_crosshair(self, cpos):
+		"""
+		Update the position of the crosshair over foreign waters,
+		given the tile under the mouse cursor.
+		Foreign waters start one tile to the right of ours.
+		"""
 		self.cur_pos = None
 
 		if cpos[0] < self.w + 1:
@@ -289,41 +326,132 @@ class GameBoard():
 			cpos = (2 * self.w, cpos[1])
 		if cpos[1] < 0:
 			cpos = (cpos[0], 0)
-		elif cpos[1] > self.h:
+		elif cpos[1] >= self.h:
 			cpos = (cpos[0], self.h - 1)
 		self.cur_pos = cpos
 
-	def render_crosshair(self, surface):
-		color = (255, 20, 0, 0)
+class BitGameBoard(GameBoard):
+	"""
+	A game board, which keeps our waters as bitmasks (see BitBoard).
+	It has the same interface as GameBoard, so the GUI can use either.
+	"""
+
+	def __init__(self, w = 10, h = 10):
+		self.log = logging.getLogger("BShip.Board")
 
-		if self.cur_pos != None:
-			rect = (self.cur_pos[0], self.cur_pos[1], bt.Tile.SIZE, bt.Tile.SIZE)
-			pygame.draw.rect(
-					surface, color,
-					rect, 1)
+		self.w = w
+		self.h = h
+		# Bitmask layers of our own waters.
+		self.bits = bbit.BitBoard(w, h)
+		# Foreign waters, as tile codes (row by row).
+		self.their_tiles = bytearray([bt.Tile().code()]) * (w * h)
+		# List of our ships (shared with the bitboard).
+		self.ships = self.bits.ships
+		# Tiles changed since they were last drawn (row by row indices).
+		self.dirty_ours = set()
+		self.dirty_theirs = set()
 
+		# Cursor parameters.
+		self.cur_pos = (0, 0)
+		self.cur_orient = GameBoard.O_HORIZONTAL
 
-	def render(self):
+	@property
+	def our_tiles(self):
 		"""
-		Render the gameboard, which consists
-		of two grids (ours, theirs).
+		Our waters as tile codes (row by row), built from the bitmasks.
 		"""
+		bits = self.bits
+		tiles = bytearray([bt.Tile(bt.Tile.T_WATER).code()]) * (self.w * self.h)
+		occupied = bt.Tile(bt.Tile.T_OCCUPIED).code()
+		for cell in bits.cells(bits.halo):
+			tiles[cell] = occupied
+		for cell, index in bits.ship_cells.items():
+			tiles[cell] = self.ships[index].tile().code()
+		bombed = bt.Tile(bt.Tile.T_BOMBED).code()
+		for cell in bits.cells(bits.bombed):
+			tiles[cell] = bombed
+		return tiles
 
-		# TODO:: Make it scalable.
+	def get_our_tile(self, x, y):
+		"""
+		Get our tile by coordinates.
+		"""
+		if x < 0 or x >= self.w or y < 0 or y >= self.h:
+			return None
+
+		bits = self.bits
+		cell = y * self.w + x
+		bit = 1 << cell
+		if bits.bombed & bit:
+			return bt.Tile(bt.Tile.T_BOMBED)
+		index = bits.ship_cells.get(cell)
+		if index is not None:
+			return self.ships[index].tile()
+		if bits.halo & bit:
+			return bt.Tile(bt.Tile.T_OCCUPIED)
+		return bt.Tile(bt.Tile.T_WATER)
 
-		tsize = bt.Tile.SIZE
+	def set_our_tile(self, x, y, value):
+		"""
+		Set our tile at specific coordinates.
+		"""
+		if x < 0 or x >= self.w or y < 0 or y >= self.h:
+			return
+		cell = y * self.w + x
+		self.dirty_ours.add(cell)
+
+		bits = self.bits
+		bit = 1 << cell
+		# Clear the cell on every layer first.
+		bits.occupied &= ~bit
+		bits.halo &= ~bit
+		bits.ship &= ~bit
+		bits.bombed &= ~bit
+		index = bits.ship_cells.pop(cell, None)
+		if index is not None:
+			bits.ship_masks[index] &= ~bit
+
+		if value.tile == bt.Tile.T_WATER or value.tile == bt.Tile.T_VOID:
+			return
+		elif value.tile == bt.Tile.T_BOMBED:
+			bits.bombed |= bit
+		elif value.tile == bt.Tile.T_OCCUPIED:
+			bits.occupied |= bit
+			bits.halo |= bit
+		else:
+			# A ship segment, which belongs to the ship with the same letter.
+			for i in range(len(self.ships)):
+				if self.ships[i].tile().tile == value.tile:
+					bits.ship_masks[i] |= bit
+					bits.ship_cells[cell] = i
+					bits.occupied |= bit
+					bits.ship |= bit
+					break
 
-		# Create a surface to render to
-		# (the size of the board).
-		surface = pygame.Surface(
-				(2 * (self.w + 1) * tsize, self.h * tsize))
+	def place_ship(self, ship, x, y, orientation):
+		"""
+		Place a ship on the gameboard.
+		"""
+		self.bits.place_ship(ship, x, y, orientation)
 
-		self.render_tiles(surface, 
-				self.our_tiles, 
-				(0, 0))
+		# The ship and the boundary around it have changed.
+		dx = (orientation == GameBoard.O_HORIZONTAL)
+		dy = (orientation == GameBoard.O_VERTICAL)
+		for cy in range(max(y - 1, 0), min(y + ship.size * dy + 1 + dx, self.h)):
+			for cx in range(max(x - 1, 0), min(x + ship.size * dx + 1 + dy, self.w)):
+				self.dirty_ours.add(cy * self.w + cx)
 
-		self.render_tiles(surface,
-				self.their_tiles,
-				((self.w + 1) * tsize, 0))
+	def shoot(self, x, y):
+		"""
+		Bomb our tile at specific coordinates.
+		Returns one of the R_* results.
+		"""
+		result = self.bits.shoot(x, y)
+		self.dirty_ours.add(y * self.w + x)
+		return result
 
-		return surface
+	def is_destroyed(self):
+		"""
+		Check whether our whole fleet has been sunk.
+		"""
+		return self.bits.is_destroyed()
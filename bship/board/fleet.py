@@ -0,0 +1,161 @@
+import numpy as np
+
+import ship as bs
+import bitboard as bbit
+import batch as bba
+
+class FleetSampler():
+	"""
+	Draws random legal fleets of bs.Ship.FLEET.
+
+	Every position of every ship size (anchor and orientation) is tabled
+	once per board size, along with the cells the ship covers and the
+	cells it takes out of play (itself and the boundary around it). Each
+	ship is then drawn uniformly from the positions the ships before it
+	left legal, which are found by masking the table with the cells taken
+	so far, so placements are never tried and turned down.
+
+	Fleets are drawn in bulk, a batch of boards at a time, and single
+	fleets are handed out from those. Large boards use bitmasks instead.
+
+	A fleet can still paint itself into a corner, in which case it's drawn
+	again. The largest ships go first, which makes that rare on 10x10.
+	"""
+
+	O_HORIZONTAL = bbit.BitBoard.O_HORIZONTAL
+	O_VERTICAL = bbit.BitBoard.O_VERTICAL
+
+	# Boards up to this many cells get fleets drawn in bulk (the arrays
+	# grow with the square of the number of cells), and single fleets
+	# are handed out from blocks of this many.
+	MAX_BULK = 400
+	BLOCK = 1024
+
+	def __init__(self, w = 10, h = 10, rng = None):
+		"""
+		rng is the numpy RandomState to draw from (a new one by default).
+		"""
+		self.w = w
+		self.h = h
+		if rng is None:
+			rng = np.random.RandomState()
+		self.rng = rng
+
+		# Ships in the order they're placed, by their index in the fleet.
+		self.indices = sorted(bs.Ship.FLEET, key=lambda i: -bs.Ship.FLEET[i][0])
+		self.sizes = [bs.Ship.FLEET[i][0] for i in self.indices]
+
+		# Positions of each ship size: (x, y, orientation) of each
+		# (as tuples and as an array), and the cells they cover and
+		# take, as bitmasks.
+		self.positions = {}
+		self.anchors = {}
+		self.masks = {}
+		self.areas = {}
+		# The same cells as (positions x cells) arrays, made when
+		# first drawing fleets in bulk.
+		self.mask_cells = {}
+		self.area_cells = {}
+		# Fleets drawn in bulk, not handed out yet.
+		self.drawn = []
+		bits = bbit.BitBoard(w, h)
+		for size in set(self.sizes):
+			anchors = []
+			masks = []
+			areas = []
+			for orientation in (FleetSampler.O_HORIZONTAL, FleetSampler.O_VERTICAL):
+				for y in range(h):
+					for x in range(w):
+						mask = bits.ship_mask(size, x, y, orientation)
+						if mask is not None:
+							anchors.append((x, y, orientation))
+							masks.append(mask)
+							areas.append(bits.dilate(mask))
+			self.positions[size] = anchors
+			self.anchors[size] = np.array(anchors, dtype=np.int32).reshape(-1, 3)
+			self.masks[size] = masks
+			self.areas[size] = areas
+
+	def cells(self, size):
+		"""
+		Get the (positions x cells) arrays of the cells covered and taken
+		by each position of a ship size.
+		"""
+		if size not in self.mask_cells:
+			anchors = self.anchors[size]
+			steps = np.arange(size)
+			dx = (anchors[:, 2] == FleetSampler.O_HORIZONTAL)
+			dy = (anchors[:, 2] == FleetSampler.O_VERTICAL)
+			cx = anchors[:, 0, None] + steps * dx[:, None]
+			cy = anchors[:, 1, None] + steps * dy[:, None]
+			mask = np.zeros((len(anchors), self.h, self.w), dtype=bool)
+			mask[np.arange(len(anchors))[:, None], cy, cx] = True
+			area = bba.BoardBatch.dilate(mask)
+			self.mask_cells[size] = mask.reshape(len(anchors), -1).astype(np.float32)
+			self.area_cells[size] = area.reshape(len(anchors), -1).astype(np.float32)
+		return self.mask_cells[size], self.area_cells[size]
+
+	def sample(self, tries = 100):
+		"""
+		Draw one fleet.
+		Returns the (x, y, orientation) of each ship, by its index in the fleet.
+		"""
+		if self.w * self.h > FleetSampler.MAX_BULK:
+			return self.sample_masks(tries)
+		if not self.drawn:
+			self.drawn = self.sample_many(FleetSampler.BLOCK, tries).tolist()
+		return [tuple(anchor) for anchor in self.drawn.pop()]
+
+	def sample_masks(self, tries = 100):
+		"""
+		Draw one fleet, checking the positions against the bitmask
+		of the cells taken (for boards too large for the tables).
+		"""
+		for t in range(tries):
+			taken = 0
+			fleet = {}
+			for index, size in zip(self.indices, self.sizes):
+				masks = self.masks[size]
+				legal = [i for i in range(len(masks)) if not masks[i] & taken]
+				if not legal:
+					break
+				i = legal[self.rng.randint(len(legal))]
+				taken |= self.areas[size][i]
+				fleet[index] = self.positions[size][i]
+			else:
+				return [fleet[index] for index in sorted(fleet)]
+		raise ValueError("The fleet doesn't fit on the board!")
+
+	def sample_many(self, n, tries = 100):
+		"""
+		Draw n fleets at once (meant for small boards, the tables
+		grow with the square of the number of cells).
+		Returns an (n x ships x 3) array of the (x, y, orientation)
+		of each ship, by its index in the fleet (as in BoardBatch.anchors).
+		"""
+		out = np.empty((n, len(self.sizes), 3), dtype=np.int32)
+		todo = np.arange(n)
+		while len(todo) > 0:
+			if tries <= 0:
+				raise ValueError("The fleet doesn't fit on the board!")
+			tries -= 1
+			m = len(todo)
+			# Number of ships taking each cell of each board.
+			taken = np.zeros((m, self.w * self.h), dtype=np.float32)
+			failed = np.zeros(m, dtype=bool)
+			for index, size in zip(self.indices, self.sizes):
+				mask_cells, area_cells = self.cells(size)
+				# Positions, which don't cover a taken cell.
+				legal = taken.dot(mask_cells.T) == 0
+				legal &= ~failed[:, None]
+				# Pick a random legal position on each board.
+				scores = self.rng.random_sample(legal.shape)
+				scores[~legal] = -1.0
+				choice = scores.argmax(axis=1)
+				failed |= ~legal.any(axis=1)
+
+				out[todo, index] = self.anchors[size][choice]
+				taken += area_cells[choice]
+			# Draw the cornered fleets again.
+			todo = todo[failed]
+		return out
@@ -34,16 +34,6 @@ class Ship():
 			return False
 		return True
 
-	def rect(self):
-		if not self.is_valid():
-			return None
-
-		if self.orientation == Ship.O_HORIZONTAL:
-			return (self.pos[0] * bt.Tile.SIZE, self.pos[1] * bt.Tile.SIZE, 
-					self.size * bt.Tile.SIZE, bt.Tile.SIZE)
-		return (self.pos[0] * bt.Tile.SIZE, self.pos[1] * bt.Tile.SIZE, 
-				bt.Tile.SIZE, self.size * bt.Tile.SIZE)
-	
 	def tile(self):
 		if not self.is_valid():
 			return bt.Tile(bt.Tile.T_WATER)
@@ -1,41 +1,42 @@
-import pygame
-
-class Tile():
-	SIZE = 32
+class Tile(object):
+	"""
+	A tile of the game board.
+	Tiles are flyweights: there's a single shared instance per tile code,
+	and the boards themselves only store the codes.
+	"""
+	__slots__ = ("tile",)
 
 	T_VOID = ' '
 	T_WATER = '~'
 	T_OCCUPIED = ':'
 	T_BOMBED = '#'
 
-	C_VOID = (0, 0, 0, 0)
-	C_WATER = (0, 25, 51, 0)
-	C_OCCUPIED = (0, 51, 102, 0)
-	C_SHIP = (96, 96, 96, 0)
-	C_BOMBED = (102, 0, 0, 0)
+	# Shared instances by tile code.
+	_interned = {}
+
+	def __new__(cls, tile=' '):
+		instance = cls._interned.get(tile)
+		if instance is None:
+			instance = object.__new__(cls)
+			instance.tile = tile
+			cls._interned[tile] = instance
+		return instance
 
-	BACKGROUND = {
-			' ': C_VOID,
-			'~': C_WATER,
-			':': C_OCCUPIED,
-			'#': C_BOMBED
-			}
+	@staticmethod
+	def from_code(code):
+		"""
+		Get the tile for a code stored in a board grid (a byte).
+		"""
+		return Tile(chr(code))
 
-	def __init__(self, tile=' '):
-		self.tile = tile
+	def code(self):
+		"""
+		Get the byte that represents the tile in a board grid.
+		"""
+		return ord(self.tile)
 	
 	def __str__(self):
 		return self.tile
 
 	def is_free(self):
 		return (self.tile == Tile.T_WATER)
-	
-	def render(self, surface, pos):
-		if self.tile in Tile.BACKGROUND:
-			color = Tile.BACKGROUND[self.tile]
-		else:
-			color = Tile.C_SHIP
-		rect = (pos[0], pos[1], 
-				Tile.SIZE, Tile.SIZE)
-		pygame.draw.rect(surface, color, rect, 0)
-
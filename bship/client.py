@@ -1,38 +1,43 @@
 #!/usr/bin/python
-import pika
 import uuid, time
-import pickle
-import sys, pygame
+import timeit
+import sys
 import logging
-from collections import OrderedDict
-
-import ocempgui.widgets as ow
-import ocempgui.widgets.Constants as oc
-import ocempgui.events as oe
+import threading
+import Queue
+import argparse
+
+from lazy import lazy
+
+# The GUI, rendering and transport stacks are only imported once used,
+# so that the rest can be used (and started) without them.
+pika = lazy("pika")
+pygame = lazy("pygame")
+ow = lazy("ocempgui.widgets")
+oe = lazy("ocempgui.events")
+brv = lazy("render.board_view")
+bso = lazy("render.stats_overlay")
+brc = lazy("render.camera")
+bgui = lazy("gui.gui")
+# Events need pygame, the states don't.
+be = lazy("events")
 
 import board.board as bb
+import board.tile as bt
 import protocol as bp
+import outbox as bo
+import room as brm
+import transport as btr
+import scheduler as bsc
+import lobby as bl
+import framestats as bfs
+import logs as blg
+import pacer as bpc
+import sync as bsy
 import player as bpl
-import events as be
-from gui.gui import GUI
-
-def init_logging():
-	"""
-	Initialize logging.
-	"""
-	log = logging.getLogger("CT")
-	log.setLevel(logging.DEBUG)
-
-	# Log to file.
-	handler = logging.FileHandler("log_server.txt", encoding="UTF-8")
-	handler.setFormatter(logging.Formatter("[%(levelname)s: %(name)s]\t%(message)s"))
-	log.addHandler(handler)
-	# And log to stdout.
-	handler = logging.StreamHandler()
-	handler.setFormatter(logging.Formatter("[%(levelname)s: %(name)s]\t%(message)s"))
-	log.addHandler(handler)
+import states as bst
 
-	return log
+timer = timeit.default_timer
 
 class Client():
 	"""
@@ -42,50 +47,89 @@ class Client():
 	"""
 
 	MSG_TIMEOUT = 3
-
-	def __init__(self):
+	# Seconds to wait for an answer to a join request.
+	JOIN_TIMEOUT = 5
+	# Milliseconds between heartbeats, while in a joined game.
+	HEARTBEAT_PERIOD = 1000
+	# Frames to profile, when asked to from the keyboard (F4).
+	PROFILE_FRAMES = 300
+	PROFILE_PATH = "profile.out"
+	# Zoom factor of a step of the mouse wheel.
+	ZOOM_STEP = 1.25
+	# Keys that pan the board (by their name in pygame), and their direction.
+	PAN_KEYS = {
+			"K_LEFT": (-1, 0),
+			"K_RIGHT": (1, 0),
+			"K_UP": (0, -1),
+			"K_DOWN": (0, 1)
+			}
+
+	def __init__(self, stats = None):
+		"""
+		stats is the framestats.FrameStats to time the frames with
+		(off by default, F3 turns them and their overlay on).
+		"""
 		self.init_log("BShip")
 		self.online = False
-		self.state = be.S_LOBBY
+		self.state = bst.S_LOBBY
 		self.hosting = False
 		self.window = None
-		self.fps_limit = 30.0
+		# Redraws only when something changed, at an adaptive frame rate.
+		self.pacer = bpc.FramePacer()
+		# Events taken while waiting for them, and whether the render
+		# thread has been woken up since the last frame.
+		self.pending_events = []
+		self.woken = False
+
+		# Time spent in each stage of the frame.
+		if stats is None:
+			stats = bfs.FrameStats()
+		self.stats = stats
+		self.overlay = None
+		# Where to dump the stats on exit, if anywhere.
+		self.stats_path = None
+		# Mouse position over the board.
+		self.mpos = (0, 0)
 
 		# Picka UUID.
 		self.uuid = str(uuid.uuid4())
 		self.log.info("UUID: " + self.uuid)
 
-		# List of servers by their UUID.
-		self.server_list = OrderedDict()
-		# List of players.
-		self.player_list = []
-		# Number of players still placing ships.
-		self.num_players_busy = 0
-		# Index of the player, whose turn was last.
-		self.num_last_player = 0
-
-		self.log.info("Initializing PyGame")
-		pygame.init()
+		# The game we're hosting, if any, or the server of the game we've joined.
+		self.room = None
+		self.server_uuid = None
+		# Copies of the boards synchronised to us, by their sender and number.
+		self.replicas = {}
+		# Messages to publish, picked up by the transport thread.
+		self.outbox = bo.Outbox()
+		self.transport = None
+		# Guards the state shared with the message callbacks,
+		# which run on the transport thread.
+		self.lock = threading.RLock()
+		# Calls the message callbacks leave for the render thread
+		# (anything that touches the GUI).
+		self.main_calls = Queue.Queue()
+		# Deadlines (of the join request, and of the players in our room).
+		self.scheduler = bsc.Scheduler()
+		# Servers announced in the lobby, by their UUID.
+		self.server_list = bl.LobbyDirectory(Client.MSG_TIMEOUT, self.scheduler)
 
 	def init_log(self, prefix):
 		"""
-		Initialize logging to file and stdout.
-		"""
-		self.log = logging.getLogger(prefix)
-		self.log.setLevel(logging.DEBUG)
-		# Log to file.
-		handler = logging.FileHandler("log.txt", encoding="UTF-8")
-		handler.setFormatter(logging.Formatter("[%(levelname)s: %(name)s]\t%(message)s"))
-		self.log.addHandler(handler)
-		# And log to stdout.
-		handler = logging.StreamHandler()
-		handler.setFormatter(logging.Formatter("[%(levelname)s: %(name)s]\t%(message)s"))
-		self.log.addHandler(handler)
-	
+		Initialize logging to file and stdout, which is written
+		on a thread of its own, off the render loop.
+		"""
+		self.log, self.log_writer = blg.init_queued(prefix, logging.DEBUG, "log.txt")
+
 	def init_gfx(self):
 		"""
 		Initialize graphics.
 		"""
+		self.log.info("Initializing PyGame")
+		pygame.init()
+		self.pan_keys = dict((getattr(pygame, name), direction)
+				for name, direction in Client.PAN_KEYS.items())
+
 		self.log.info("Initializing graphics")
 		self.event_manager = oe.EventManager()
 
@@ -96,19 +140,36 @@ class Client():
 		self.window = self.renderer.screen
 
 		# Initialize the GUI.
-		self.gui = GUI(self.renderer)
+		self.gui = bgui.GUI(self.renderer)
 		self.gui.show_lobby()
 
-	def init_mq(self):
+	def init_mq(self, connection = None):
+		"""
+		Initialize the message queue connection, which runs on its own thread.
+		A connection to another broker (e.g. a LocalBroker) may be passed in.
 		"""
-		Initialize the message queue connection.
+		if connection is None:
+			self.log.info("Connecting to RabbitMQ")
+			connect = lambda: pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+		else:
+			connect = lambda: connection
+		self.transport = btr.Transport(connect, self.init_queues, self.outbox, self.stats)
+		self.transport.start()
+
+	def init_queues(self, channel):
 		"""
-		self.log.info("Connecting to RabbitMQ")
-		self.q_connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-		self.q_channel = self.q_connection.channel()
+		Declare the queues and their consumers (on the transport thread).
+		"""
+		self.q_channel = channel
 		# A lobby, which all servers and clients connect to.
-		self.q_state = self.q_channel.queue_declare(queue="lobby")
-		self.q_channel.basic_consume(self.mq_lobby_cb, queue="lobby")
+		# Every client gets its own copy of each announce, and the broker
+		# drops the ones older than MSG_TIMEOUT.
+		self.q_channel.exchange_declare(exchange=bp.LOBBY_EXCHANGE, exchange_type="fanout")
+		self.q_state = self.q_channel.queue_declare(queue="", exclusive=True, auto_delete=True,
+				arguments={"x-message-ttl": int(Client.MSG_TIMEOUT * 1000)})
+		self.q_lobby = self.q_state.method.queue
+		self.q_channel.queue_bind(queue=self.q_lobby, exchange=bp.LOBBY_EXCHANGE)
+		self.q_channel.basic_consume(self.mq_lobby_cb, queue=self.q_lobby, no_ack=True)
 		# Dedicated rooms for each game server and client.
 		self.q_room = self.q_channel.queue_declare(queue=self.uuid)
 		self.q_channel.basic_consume(self.mq_room_cb, queue=self.uuid)
@@ -118,17 +179,8 @@ class Client():
 		Announce that there's a game server here.
 		"""
 		self.log.debug("Announcing game server")
-
-		# TODO:: Move to a protocol module
-		msg_dict = {
-				"id": bp.M_ANNOUNCE,
-				"uuid": self.uuid,
-				"boardsize": (self.gameboard.w, self.gameboard.h),
-				"num_players": self.num_players,
-				"name": self.game_name
-				}
-		msg = bp.Message.pickle(msg_dict)
-		self.q_channel.basic_publish(exchange="", routing_key="lobby", body=msg)
+		with self.lock:
+			self.room.announce()
 
 	def request_join(self, event):
 		"""
@@ -146,10 +198,37 @@ class Client():
 				"name": self.game_name,
 				"nickname": self.nickname
 				}
-		msg = bp.Message.pickle(msg_dict)
-		self.q_channel.basic_publish(exchange="", routing_key=self.server_uuid, body=msg)
+		self.outbox.post("", self.server_uuid, msg_dict)
+
+		# Return to the lobby, if there's no answer.
+		self.scheduler.schedule("join", Client.JOIN_TIMEOUT, self.join_timed_out)
+
+	def join_timed_out(self):
+		"""
+		The server didn't answer our join request.
+		"""
+		if self.state == bst.S_JOIN:
+			self.log.error("Join request to {} timed out".format(self.server_uuid))
+			self.gui.do_lobby()
 
-		# TODO:: Time out on the request, and return to the lobby.
+	def start_heartbeat(self):
+		"""
+		Start letting the server know we're still there.
+		"""
+		pygame.time.set_timer(be.E_HEARTBEAT, Client.HEARTBEAT_PERIOD)
+
+	def heartbeat(self):
+		"""
+		Let the server know we're still there.
+		"""
+		if self.hosting or self.state < bst.S_GAME or self.state > bst.S_GAME_LAST:
+			return
+		msg_dict = {
+				"id": bp.M_HEARTBEAT,
+				"server_uuid": self.server_uuid,
+				"client_uuid": self.uuid
+				}
+		self.outbox.post("", self.server_uuid, msg_dict)
 
 	def ack(self, uuid, message, state):
 		"""
@@ -162,8 +241,7 @@ class Client():
 				"message": message,
 				"state": state
 				}
-		msg = bp.Message.pickle(msg_dict)
-		self.q_channel.basic_publish(exchange="", routing_key=uuid, body=msg)
+		self.outbox.post("", uuid, msg_dict)
 
 	def nack(self, uuid, message, state):
 		"""
@@ -176,101 +254,317 @@ class Client():
 				"message": message,
 				"state": state
 				}
-		msg = bp.Message.pickle(msg_dict)
-		self.q_channel.basic_publish(exchange="", routing_key=uuid, body=msg)
+		self.outbox.post("", uuid, msg_dict)
+
+	def sync_board(self, msg):
+		"""
+		Apply a board snapshot or delta, asking for a fresh snapshot
+		if some deltas went missing.
+		"""
+		key = (msg.server_uuid, msg.board)
+		replica = self.replicas.get(key)
+		if replica is None:
+			replica = self.replicas[key] = bsy.BoardReplica(msg.server_uuid, msg.board)
+		cells = replica.apply(msg)
+		resync = replica.take_resync(self.uuid)
+		if resync is not None:
+			self.log.debug("Missed deltas of board {}, resyncing".format(msg.board))
+			self.outbox.post("", msg.server_uuid, resync)
+
+		# The gameboard belongs to the render thread.
+		if cells:
+			self.main_calls.put(lambda: self.mirror_board(replica, cells))
+
+	def mirror_board(self, replica, cells = None):
+		"""
+		Take the shots on the changed cells of a synchronised board
+		at our gameboard (on the render thread).
+		"""
+		if self.state < bst.S_GAME or self.state > bst.S_GAME_LAST:
+			return
+		# Only the host's shots at its opponents' waters
+		# (that's us, in a game for two) are taken.
+		if replica.board != bsy.B_THEIRS or replica.sender != self.server_uuid:
+			return
+		gameboard = self.gameboard
+		with self.lock:
+			if len(replica.tiles) != len(gameboard.our_tiles):
+				return
+			if cells is None:
+				cells = range(len(replica.tiles))
+			# Cells of foreign waters are void until they're shot at.
+			void = bt.Tile().code()
+			bombed = bt.Tile(bt.Tile.T_BOMBED).code()
+			for cell in cells:
+				if replica.tiles[cell] != void and gameboard.our_tiles[cell] != bombed:
+					gameboard.shoot(cell % gameboard.w, cell // gameboard.w)
 
 	def mq_lobby_cb(self, ch, method, properties, body):
 		"""
 		Handle lobby message queue events.
 		"""
-		try:
-			msg = bp.Message.unpickle(body)
+		with self.stats.span("mq_lobby"):
+			try:
+				msg = bp.Message.decode(body)
 
-			# Skip stale messages.
-			if hasattr(msg, "timestamp") and time.time() - msg.timestamp < Client.MSG_TIMEOUT:
+				# Stale messages are dropped by the broker,
+				# servers that went quiet by the directory.
 				if msg.id == bp.M_ANNOUNCE:
-					self.server_list[msg.uuid] = msg
-		except ValueError as e:
-			# Ignore "insecure string pickle",
-			# which comes from incompatible. 
-			pass
-		except Exception as e:
-			self.log.exception(e)
+					with self.lock:
+						self.server_list.announce(msg)
+					# Show the new or updated server.
+					self.wake()
+			except ValueError as e:
+				# Ignore messages, which can't be decoded
+				# (e.g. from incompatible clients).
+				pass
+			except Exception as e:
+				self.log.exception(e)
 
 	def mq_room_cb(self, ch, method, properties, body):
 		"""
 		Handle room message queue events.
 		"""
-		try:
-			msg = bp.Message.unpickle(body)
-
-			# Skip stale messages.
-			if hasattr(msg, "timestamp") and time.time() - msg.timestamp < Client.MSG_TIMEOUT:
-				# Someone requests to join our server?
-				if msg.id == bp.M_JOINING and self.hosting:
-					if self.num_players[0] < self.num_players[1]:
-						self.num_players = (self.num_players[0] + 1, self.num_players[1])
-						for p in self.player_list:
-							if p[0] == msg.client_uuid or p[1] == msg.nickname:
-								if p[0] == msg.client_uuid:
-									self.log.error("UUID collision ({})".format(p[0]))
-								elif p[1] == msg.nickname:
-									self.log.error("Nickname collision ({})".format(p[1]))
-								# Notify the client as well.
-								self.nack(msg.client_uuid, "Server: Nickname collision", be.S_LOBBY)
-								return
-						# Add the player.
-						self.log.info("Adding player {} ({})".format(msg.client_uuid, msg.nickname))
-						self.player_list.append([msg.client_uuid, msg.nickname, be.S_GAME_PLACING, time.time()])
-						self.ack(msg.client_uuid, "Server: Welcome", be.S_GAME)
-
-				# TODO:: Replace Request - Ack pairs with RPC or RabbitMQ exchanges.
-
-				# An acknowledge message.
-				elif msg.id == bp.M_ACK:
-					self.log.info("Received ACK: " + msg.message)
-					# We've joined?
-					if self.state == be.S_JOIN and msg.state == be.S_GAME:
-						self.gui.do_start_joined()
-					# There's one more player waiting for their turn.
-					elif self.state == be.S_GAME and msg.state == be.S_GAME_WAITING:
-						self.num_players_busy = 0
-						for i in range(len(self.player_list)):
-							p = self.player_list[i]
-							if p[0] == msg.client_uuid:
-								self.player_list[i][2] = be.S_GAME_WAITING
-								break
-							elif p[2] != be.S_GAME_WAITING:
-								self.num_players_busy += 1
-
-						# TODO:: Timeout check here. Or implement client heartbeat.
-
-						# All players are waiting for their turn?
-						if self.num_players_busy == 0:
-							p = self.player_list[self.num_last_player]
-							p[2] = be.S_GAME_SHOOTING
-							self.log.info("Player {}'s turn".format(p[0]))
-							self.ack(p[0], "Server: Your turn", p[2])
-
-							# Cycle through the players.
-							self.num_last_player += 1
-							if self.num_last_player >= self.num_players:
-								self.num_last_player = 0
-					# It's our turn?
-					elif self.state == be.S_GAME and msg.state == be.S_GAME_SHOOTING:
-						self.state = msg.state
-				# Our request was withdrawn?
-				elif msg.id == bp.M_NACK:
-					self.log.error("Received NACK: " + msg.message)
-					if msg.state == be.S_LOBBY:
-						self.gui.do_lobby()
-					self.state = msg.state
-		except ValueError as e:
-			# Ignore "insecure string pickle",
-			# which comes from incompatible. 
-			pass
-		except Exception as e:
-			self.log.exception(e)
+		with self.stats.span("mq_room"):
+			try:
+				msg = bp.Message.decode(body)
+
+				# Skip stale messages.
+				if hasattr(msg, "timestamp") and time.time() - msg.timestamp < Client.MSG_TIMEOUT:
+					with self.lock:
+						self.handle_room_message(msg)
+					# Show what the message changed.
+					self.wake()
+			except ValueError as e:
+				# Ignore messages, which can't be decoded
+				# (e.g. from incompatible clients).
+				pass
+			except Exception as e:
+				self.log.exception(e)
+
+	def handle_room_message(self, msg):
+		"""
+		Handle a message in our room.
+		"""
+		# Requests to the game we're hosting.
+		if self.hosting and self.room.handle(msg):
+			return
+
+		# TODO:: Replace Request - Ack pairs with RPC or RabbitMQ exchanges.
+
+		# An acknowledge message.
+		if msg.id == bp.M_ACK:
+			self.log.info("Received ACK: " + msg.message)
+			# We've joined?
+			if self.state == bst.S_JOIN and msg.state == bst.S_GAME:
+				self.scheduler.cancel("join")
+				self.main_calls.put(self.gui.do_start_joined)
+				self.main_calls.put(self.start_heartbeat)
+			# It's our turn?
+			elif self.state == bst.S_GAME_WAITING and msg.state == bst.S_GAME_SHOOTING:
+				self.state = msg.state
+			# Our turn timed out?
+			elif self.state == bst.S_GAME_SHOOTING and msg.state == bst.S_GAME_WAITING:
+				self.state = msg.state
+		# A board being synchronised to us.
+		elif msg.id == bp.M_BOARD_SNAPSHOT or msg.id == bp.M_BOARD_DELTA:
+			self.sync_board(msg)
+		# Our request was withdrawn?
+		elif msg.id == bp.M_NACK:
+			self.log.error("Received NACK: " + msg.message)
+			self.scheduler.cancel("join")
+			if msg.state == bst.S_LOBBY:
+				self.main_calls.put(self.gui.do_lobby)
+			self.state = msg.state
+
+	def change_state(self, event):
+		"""
+		Handle a change in the game state.
+		"""
+		self.state = event.state
+		if self.state == bst.S_GAME:
+			# Are we hosting the game?
+			if event.hosting:
+				self.hosting = True
+				# Announce the game in the lobby.
+				pygame.time.set_timer(be.E_ANNOUNCE, 1000)
+
+			# Initialize the game board.
+			self.game_name = event.name
+			self.gameboard = bb.GameBoard(
+					event.boardsize[0], event.boardsize[1])
+			# The board is seen through a camera, which fills the window.
+			size = self.window.get_size()
+			self.boardview = brv.BoardView(self.gameboard,
+					brc.Camera(size[0] - 32, size[1] - 32, brv.BoardView.TILE_SIZE))
+			# Initialize our player.
+			self.nickname = event.nickname
+			if self.hosting:
+				self.room = brm.Room(self.uuid, self.game_name, event.boardsize,
+						event.num_players, self.outbox, self.scheduler)
+				self.room.add_player(self.uuid, self.nickname)
+				gameboard = self.gameboard
+				self.room.publish_board(bsy.B_THEIRS, gameboard.their_tiles,
+						event.boardsize[0], event.boardsize[1],
+						lambda: gameboard.dirty_theirs)
+			# Catch up with the boards synchronised while joining.
+			if not self.hosting:
+				for replica in self.replicas.values():
+					self.mirror_board(replica)
+			self.player = bpl.Player()
+			self.player.start_placing_ships()
+		# Joining another game?
+		elif self.state == bst.S_JOIN:
+			self.request_join(event)
+		# Back in the lobby?
+		elif self.state == bst.S_LOBBY:
+			pygame.time.set_timer(be.E_HEARTBEAT, 0)
+			self.replicas = {}
+
+	def run_main_calls(self):
+		"""
+		Run the calls left by the message callbacks.
+		"""
+		while True:
+			try:
+				call = self.main_calls.get_nowait()
+			except Queue.Empty:
+				return
+			call()
+
+	def render_board(self):
+		"""
+		Render the gameboard, with the cursor or the crosshair.
+		"""
+		s_board = self.boardview.render()
+
+		if self.player.is_placing_ships():
+			self.state = bst.S_GAME_PLACING
+			mpos = pygame.mouse.get_pos()
+			self.mpos = (mpos[0] - 16, mpos[1] - 16)
+			self.boardview.update_cursor(self.player, self.mpos)
+			self.boardview.render_cursor(s_board, self.player)
+		elif self.state == bst.S_GAME_PLACING:
+			self.log.info("Finished placing ships")
+			self.state = bst.S_GAME_WAITING
+			# Clients tell the server they're waiting for their turn,
+			# the host tells its own room.
+			if not self.hosting:
+				self.ack(self.server_uuid, "Waiting for my turn", bst.S_GAME_WAITING)
+			else:
+				with self.lock:
+					self.room.player_waiting(self.uuid)
+		elif self.state == bst.S_GAME_SHOOTING:
+			mpos = pygame.mouse.get_pos()
+			self.mpos = (mpos[0] - 16, mpos[1] - 16)
+			self.boardview.update_crosshair(self.mpos)
+			self.boardview.render_crosshair(s_board)
+
+		self.window.blit(s_board, (16, 16))
+
+	def handle_events(self):
+		"""
+		Handle the pygame events of a frame.
+		"""
+		events = self.pending_events + pygame.event.get()
+		self.pending_events = []
+		self.woken = False
+		for event in events:
+			# Anything but the timers may change what's on the screen,
+			# the mouse only over the board or the lobby.
+			if event.type == pygame.MOUSEMOTION:
+				if self.state == bst.S_LOBBY or self.state == bst.S_GAME_PLACING \
+						or self.state == bst.S_GAME_SHOOTING or event.buttons[2]:
+					self.pacer.invalidate()
+			elif event.type != be.E_ANNOUNCE and event.type != be.E_HEARTBEAT:
+				self.pacer.invalidate()
+
+			if event.type == pygame.QUIT:
+				self.online = False
+			elif event.type == be.E_ANNOUNCE:
+				self.do_announce()
+			elif event.type == be.E_HEARTBEAT:
+				self.heartbeat()
+			# A change in the game state?
+			elif event.type == be.E_STATE:
+				with self.lock:
+					self.change_state(event)
+			else:
+				if event.type == pygame.KEYDOWN:
+					# Frame stats and their overlay.
+					if event.key == pygame.K_F3:
+						self.toggle_stats()
+					# Profile the next frames.
+					elif event.key == pygame.K_F4:
+						self.log.info("Profiling {} frames into {}".format(
+								Client.PROFILE_FRAMES, Client.PROFILE_PATH))
+						self.stats.start_profile(Client.PROFILE_FRAMES, Client.PROFILE_PATH)
+				# In game state?
+				if self.state >= bst.S_GAME and self.state <= bst.S_GAME_LAST:
+					if event.type == pygame.MOUSEBUTTONDOWN:
+						# The wheel zooms the board.
+						if event.button == 4 or event.button == 5:
+							factor = Client.ZOOM_STEP if event.button == 4 else 1.0 / Client.ZOOM_STEP
+							self.boardview.zoom(factor, (event.pos[0] - 16, event.pos[1] - 16))
+						elif event.button == 1:
+							self.gameboard.clicked(self.player, self.mpos)
+					# Dragging with the right button pans the board.
+					elif event.type == pygame.MOUSEMOTION:
+						if event.buttons[2]:
+							self.boardview.pan(-event.rel[0], -event.rel[1])
+					elif event.type == pygame.KEYDOWN:
+						if event.key == pygame.K_SPACE:
+							self.gameboard.rotate_ship()
+						# So do the arrow keys.
+						elif event.key in self.pan_keys:
+							dx, dy = self.pan_keys[event.key]
+							step = self.boardview.camera.tile_size
+							self.boardview.pan(dx * step, dy * step)
+
+			# Pass the event to OcempGUI
+			self.renderer.distribute_events((event))
+
+	def wait_for_events(self, frame_start):
+		"""
+		Sleep until an event arrives, or the pacer's frame time is up
+		(and the screen is redrawn anyway), but never start the next
+		frame sooner than the pacer's ceiling allows.
+		"""
+		pacer = self.pacer
+		rest = frame_start + pacer.min_frame_time() - timer()
+		if rest > 0:
+			pygame.time.wait(int(rest * 1000))
+		timeout = frame_start + pacer.frame_time() - timer()
+		if timeout > 0:
+			event = pygame.event.wait(max(1, int(timeout * 1000)))
+			if event.type != pygame.NOEVENT:
+				# Handled with the rest next frame.
+				self.pending_events.append(event)
+				return
+		pacer.invalidate(False)
+
+	def wake(self):
+		"""
+		Have the render thread redraw soon (from the transport thread).
+		"""
+		self.pacer.invalidate()
+		if not self.woken:
+			self.woken = True
+			pygame.event.post(pygame.event.Event(be.E_WAKE))
+
+	def toggle_stats(self):
+		"""
+		Turn the frame stats and their overlay on or off.
+		The stats stay on while profiling, or if they're to be
+		written to a file on exit.
+		"""
+		if self.overlay is None:
+			self.stats.enabled = True
+			self.overlay = bso.StatsOverlay(self.stats)
+		else:
+			self.overlay = None
+			if self.stats.profile is None and self.stats_path is None:
+				self.stats.enabled = False
 
 	def start(self):
 		"""
@@ -280,101 +574,95 @@ class Client():
 			self.init_gfx()
 			self.init_mq()
 
-			self.fps_timer = pygame.time.Clock()
-
 			self.online = True
+			stats = self.stats
+			pacer = self.pacer
 			while self.online:
-				# Process server list while in the lobby,
-				if self.state == be.S_LOBBY:
-					self.gui.process_serverlist(self.server_list)
-				# Render gameboard, if in the right mode.
-				elif self.state >= be.S_GAME and self.state <= be.S_GAME_LAST:
-					s_board = self.gameboard.render()
-
-					if self.player.is_placing_ships():
-						self.state = be.S_GAME_PLACING
-						mpos = pygame.mouse.get_pos()
-						mpos = (mpos[0] - 16, mpos[1] - 16)
-						self.gameboard.update_cursor(self.player, mpos)
-						self.gameboard.render_cursor(s_board, self.player)
-					elif self.state == be.S_GAME_PLACING:
-						self.log.info("Finished placing ships")
-						self.state = be.S_GAME_WAITING
-						# Clients will wait for their turn, the server won't.
-						if not self.hosting:
-							self.ack(self.server_uuid, "Waiting for my turn", be.S_GAME_WAITING)
-					elif self.state == be.S_GAME_SHOOTING:
-						mpos = pygame.mouse.get_pos()
-						mpos = (mpos[0] - 16, mpos[1] - 16)
-						self.gameboard.update_crosshair(mpos)
-						self.gameboard.render_crosshair(s_board)
-
-					self.window.blit(s_board, (16, 16))
-
-				# Render OcempGUI
-				self.renderer.update()
-				self.renderer.refresh()
+				frame_start = timer()
+				# Run what the message callbacks left for us.
+				with stats.span("main_calls"):
+					self.run_main_calls()
+				# Time out the join request, servers in the lobby,
+				# or players in our room.
+				with stats.span("scheduler"):
+					with self.lock:
+						self.scheduler.tick()
 
 				# Handle events.
-				for event in pygame.event.get():
-					if event.type == pygame.QUIT:
-						self.online = False
-					elif event.type == be.E_ANNOUNCE:
-						self.do_announce()
-					# A change in the game state?
-					elif event.type == be.E_STATE:
-						self.state = event.state
-						if self.state == be.S_GAME:
-							# Are we hosting the game?
-							if event.hosting:
-								self.hosting = True
-								# Announce the game in the lobby.
-								pygame.time.set_timer(be.E_ANNOUNCE, 1000)
-
-							# Initialize the game board.
-							self.game_name = event.name
-							self.gameboard = bb.GameBoard(
-									event.boardsize[0], event.boardsize[1])
-							self.num_players = event.num_players
-							# Initialize our player.
-							self.nickname = event.nickname
-							self.player_list.append([self.uuid, self.nickname])
-							self.player = bpl.Player()
-							self.player.start_placing_ships()
-						# Joining another game?
-						elif self.state == be.S_JOIN:
-							self.request_join(event)
-					else:
-						# In game state?
-						if self.state >= be.S_GAME and self.state <= be.S_GAME_LAST:
-							if event.type == pygame.MOUSEBUTTONDOWN:
-								self.gameboard.clicked(self.player, mpos)
-							elif event.type == pygame.KEYDOWN:
-								if event.key == pygame.K_SPACE:
-									self.gameboard.rotate_ship()
-						
-					# Pass the event to OcempGUI
-					self.renderer.distribute_events((event))
+				with stats.span("events"):
+					self.handle_events()
 
 				if pygame.key.get_pressed()[pygame.K_ESCAPE]:
 					self.online = False
 
-				# Iterative processing on a blocking connection.
-				self.q_connection.process_data_events(time_limit=0)
-
-				self.fps_timer.tick(self.fps_limit)
-				pygame.display.update()
+				# Process server list while in the lobby,
+				if self.state == bst.S_LOBBY:
+					with stats.span("serverlist"):
+						with self.lock:
+							if self.gui.process_serverlist(self.server_list):
+								pacer.invalidate()
+
+				# Send the players the changes to our boards, which
+				# are only looked for among the tiles still to draw.
+				if self.room is not None and self.hosting:
+					with stats.span("sync"):
+						with self.lock:
+							self.room.sync_boards()
+
+				# Redraw, only if something changed.
+				if pacer.take_dirty():
+					# Render gameboard, if in the right mode.
+					if self.state >= bst.S_GAME and self.state <= bst.S_GAME_LAST:
+						with stats.span("board"):
+							self.render_board()
+
+					# Render OcempGUI
+					with stats.span("gui.update"):
+						self.renderer.update()
+					with stats.span("gui.refresh"):
+						self.renderer.refresh()
+
+					if self.overlay is not None:
+						self.overlay.render(self.window)
+					with stats.span("display"):
+						pygame.display.update()
+					stats.end_frame()
+				pacer.end_frame()
+
+				with stats.span("wait"):
+					self.wait_for_events(frame_start)
 		except Exception as e:
 			self.log.exception(e)
 		finally:
-			self.q_connection.close()
+			if self.transport is not None:
+				self.transport.stop()
+			self.stats.stop_profile()
+			if self.stats_path is not None and self.stats.enabled:
+				self.stats.dump(self.stats_path)
 			pygame.quit()
+			self.log_writer.stop()
 
 def main():
 	"""
 	The grand main.
 	"""
-	client = Client()
+	parser = argparse.ArgumentParser(description="Battleship client")
+	parser.add_argument("--stats", action="store_true",
+			help="time the stages of every frame, and show them over the screen")
+	parser.add_argument("--stats-file", default=None,
+			help="write the frame stage times to a file on exit")
+	parser.add_argument("--profile", type=int, default=0, metavar="FRAMES",
+			help="run cProfile over the first FRAMES frames")
+	parser.add_argument("--profile-file", default=Client.PROFILE_PATH,
+			help="where to save the profile (for pstats)")
+	args = parser.parse_args()
+
+	client = Client(bfs.FrameStats(args.stats or args.stats_file is not None))
+	client.stats_path = args.stats_file
+	if args.stats:
+		client.toggle_stats()
+	if args.profile > 0:
+		client.stats.start_profile(args.profile, args.profile_file)
 	client.start()
 
 if __name__ == '__main__':
@@ -0,0 +1,143 @@
+import numpy as np
+
+import board.ship as bs
+import board.batch as bba
+import board.bitboard as bbit
+
+class Shooter():
+	"""
+	A computer opponent, which bombs the tile most likely to hold a ship.
+
+	It keeps what it knows of the opponent's waters the way GameBoard
+	keeps their_tiles (unknown, missed and bombed tiles), and for every
+	ship still afloat counts the placements that agree with it. Ships
+	mustn't touch, so a sunk ship (a group of hits) is fenced off with
+	water. While there are hits on ships not yet sunk, the placements
+	through them count for a lot more, so they're finished off first.
+
+	The placements are counted for the whole board at once, with sliding
+	window sums along both axes, rather than tried one by one.
+	"""
+
+	R_MISS = bbit.BitBoard.R_MISS
+	R_HIT = bbit.BitBoard.R_HIT
+	R_SUNK = bbit.BitBoard.R_SUNK
+
+	# How much more a placement counts per hit it goes through.
+	TARGET_WEIGHT = 100.0
+
+	def __init__(self, w = 10, h = 10, seed = None):
+		self.w = w
+		self.h = h
+		self.rng = np.random.RandomState(seed)
+
+		# What we know of their waters (tile codes, as in their_tiles).
+		self.view = np.full((h, w), bba.C_VOID, dtype=np.uint8)
+		# Tiles no ship can be on: misses, sunk ships and the water around them.
+		self.blocked = np.zeros((h, w), dtype=bool)
+		# Hits on ships still afloat.
+		self.hits = np.zeros((h, w), dtype=bool)
+		# Sizes of the ships still afloat.
+		self.afloat = sorted(size for size, name in bs.Ship.FLEET.values())
+
+	@staticmethod
+	def window_sums(a, size, axis):
+		"""
+		Sum a over every window of the given size along an axis.
+		Entry i is the sum of a[i:i + size].
+		"""
+		n = a.shape[axis]
+		shape = list(a.shape)
+		shape[axis] = n + 1
+		c = np.zeros(shape, dtype=a.dtype)
+		if axis == 0:
+			np.cumsum(a, axis=0, out=c[1:, :])
+			return c[size:, :] - c[:n - size + 1, :]
+		np.cumsum(a, axis=1, out=c[:, 1:])
+		return c[:, size:] - c[:, :n - size + 1]
+
+	@staticmethod
+	def spread(weights, size, axis):
+		"""
+		Spread the weight of every placement over the tiles it covers.
+		The inverse of window_sums: tile i gets weights[i - size + 1:i + 1].
+		"""
+		pad = [(0, 0), (0, 0)]
+		pad[axis] = (size - 1, size - 1)
+		return Shooter.window_sums(np.pad(weights, pad, "constant"), size, axis)
+
+	def density(self):
+		"""
+		Get the (h x w) heat map: the weighted number of placements
+		of the ships afloat covering each tile.
+		"""
+		blocked = self.blocked.astype(np.float64)
+		hits = self.hits.astype(np.float64)
+		targeting = self.hits.any()
+		heat = np.zeros((self.h, self.w))
+		for size in set(self.afloat):
+			count = self.afloat.count(size)
+			for axis, n in ((1, self.w), (0, self.h)):
+				if size > n:
+					continue
+				weights = (Shooter.window_sums(blocked, size, axis) == 0).astype(np.float64)
+				if targeting:
+					weights *= 1.0 + Shooter.TARGET_WEIGHT * Shooter.window_sums(hits, size, axis)
+				heat += count * Shooter.spread(weights, size, axis)
+		return heat
+
+	def choose(self):
+		"""
+		Pick the next tile to bomb.
+		Returns (x, y), or None if there's nothing left to bomb.
+		"""
+		heat = self.density()
+		heat[self.view != bba.C_VOID] = -1.0
+		best = heat.max()
+		if best < 0:
+			return None
+		choices = np.flatnonzero(heat == best)
+		y, x = divmod(int(choices[self.rng.randint(len(choices))]), self.w)
+		return (x, y)
+
+	def observe(self, x, y, result):
+		"""
+		Take note of the result of a shot at the given tile.
+		"""
+		if result == Shooter.R_MISS:
+			self.view[y, x] = bba.C_WATER
+			self.blocked[y, x] = True
+			return
+		self.view[y, x] = bba.C_BOMBED
+		self.hits[y, x] = True
+		if result == Shooter.R_SUNK:
+			self.sink(x, y)
+
+	def sink(self, x, y):
+		"""
+		A ship was sunk at the given tile: it's made of the hits
+		connected to it, since no other ship may touch it.
+		"""
+		ship = np.zeros((self.h, self.w), dtype=bool)
+		todo = [(x, y)]
+		while todo:
+			cx, cy = todo.pop()
+			if cx < 0 or cy < 0 or cx >= self.w or cy >= self.h:
+				continue
+			if ship[cy, cx] or not self.hits[cy, cx]:
+				continue
+			ship[cy, cx] = True
+			todo.extend(((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)))
+
+		self.hits &= ~ship
+		# The ship and its surroundings can't hold another ship.
+		fence = bba.BoardBatch.dilate(ship[None])[0]
+		self.blocked |= fence
+		self.view[fence & (self.view == bba.C_VOID)] = bba.C_WATER
+
+		size = int(ship.sum())
+		if size in self.afloat:
+			self.afloat.remove(size)
+		elif self.afloat:
+			# Not a ship we know of, drop the closest one.
+			self.afloat.remove(min(self.afloat, key=lambda s: abs(s - size)))
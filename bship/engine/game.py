@@ -0,0 +1,142 @@
+import board.bitboard as bbit
+import player as bpl
+
+class Game():
+	"""
+	A headless game of battleship: boards, ships, players and turns.
+	Nothing here depends on pygame, so it can run on a server
+	or in a simulation loop.
+	"""
+
+	O_HORIZONTAL = bbit.BitBoard.O_HORIZONTAL
+	O_VERTICAL = bbit.BitBoard.O_VERTICAL
+
+	R_MISS = bbit.BitBoard.R_MISS
+	R_HIT = bbit.BitBoard.R_HIT
+	R_SUNK = bbit.BitBoard.R_SUNK
+
+	def __init__(self, num_players = 2, w = 10, h = 10, journal = None):
+		"""
+		The game is recorded in the journal (a journal.JournalWriter), if given.
+		"""
+		self.w = w
+		self.h = h
+		# Players and their boards, by seat.
+		self.players = []
+		self.boards = []
+		for i in range(num_players):
+			player = bpl.Player()
+			player.start_placing_ships()
+			self.players.append(player)
+			self.boards.append(bbit.BitBoard(w, h))
+		# Seat of the player, whose turn it is.
+		self.turn = 0
+		# Number of shots fired so far.
+		self.num_shots = 0
+
+		self.journal = journal
+		if journal is not None:
+			self.game_id = journal.new_game()
+			for seat in range(num_players):
+				journal.join(self.game_id, seat, None, w, h, num_players)
+
+	def place(self, seat, x, y, orientation):
+		"""
+		Place the current ship of the player at the given seat.
+		Returns the next ship to place, or None if the fleet is complete.
+		"""
+		player = self.players[seat]
+		if not player.is_placing_ships():
+			raise ValueError("The whole fleet is already placed!")
+		ship = player.current_ship()
+		self.boards[seat].place_ship(ship, x, y, orientation)
+		if self.journal is not None:
+			self.journal.place(self.game_id, seat, ship.index, x, y, orientation)
+		return player.next_ship()
+
+	def can_place(self, seat, x, y, orientation):
+		"""
+		Check whether the current ship of a player fits at the given position.
+		"""
+		ship = self.players[seat].current_ship()
+		return self.boards[seat].can_place(ship.size, x, y, orientation)
+
+	def is_ready(self):
+		"""
+		Check whether every player has placed their fleet.
+		"""
+		for player in self.players:
+			if player.is_placing_ships():
+				return False
+		return True
+
+	def is_alive(self, seat):
+		"""
+		Check whether the player at the given seat still has a ship afloat.
+		"""
+		return not self.boards[seat].is_destroyed()
+
+	def target(self, seat = None):
+		"""
+		Get the seat of the next player still in the game after the given one
+		(the one whose turn it is, by default).
+		"""
+		if seat is None:
+			seat = self.turn
+		num_players = len(self.players)
+		for i in range(1, num_players):
+			other = (seat + i) % num_players
+			if self.is_alive(other):
+				return other
+		return None
+
+	def shoot(self, x, y, target = None):
+		"""
+		Bomb a tile of the target (by default, the next player still in the game)
+		on behalf of the player whose turn it is, and pass the turn on.
+		Returns one of the R_* results.
+		"""
+		if not self.is_ready():
+			raise ValueError("Not all the ships are placed yet!")
+		if self.is_over():
+			raise ValueError("The game is over!")
+		if target is None:
+			target = self.target()
+		elif target == self.turn or not self.is_alive(target):
+			raise ValueError("Can't shoot at that player!")
+
+		result = self.boards[target].shoot(x, y)
+		if self.journal is not None:
+			self.journal.turn(self.game_id, self.turn, self.num_shots)
+			self.journal.shot(self.game_id, self.turn, self.num_shots, target, x, y, result)
+		self.num_shots += 1
+
+		# Cycle through the players still in the game.
+		if not self.is_over():
+			self.turn = self.target()
+		elif self.journal is not None:
+			self.journal.end(self.game_id, self.winner())
+		return result
+
+	def is_over(self):
+		"""
+		Check whether at most one player is left with ships afloat.
+		"""
+		if not self.is_ready():
+			return False
+		num_alive = 0
+		for board in self.boards:
+			if not board.is_destroyed():
+				num_alive += 1
+		return num_alive <= 1
+
+	def winner(self):
+		"""
+		Get the seat of the winner, or None if the game isn't over.
+		"""
+		if not self.is_over():
+			return None
+		for seat in range(len(self.boards)):
+			if self.is_alive(seat):
+				return seat
+		return None
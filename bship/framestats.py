@@ -0,0 +1,172 @@
+import cProfile
+import threading
+import timeit
+from collections import deque, OrderedDict
+
+timer = timeit.default_timer
+
+class NullSpan():
+	"""
+	A span, which doesn't time anything (while the stats are off).
+	"""
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		return False
+
+NULL_SPAN = NullSpan()
+
+class Span():
+	"""
+	Times a stage of a frame, from entering to leaving the with block.
+	"""
+
+	__slots__ = ("samples", "start")
+
+	def __init__(self, samples):
+		self.samples = samples
+		self.start = 0.0
+
+	def __enter__(self):
+		self.start = timer()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		# Appending to a deque is atomic, spans may end on any thread.
+		self.samples.append(timer() - self.start)
+		return False
+
+class FrameStats():
+	"""
+	Time spent in each stage of the frame (and in the message
+	callbacks), over the last WINDOW samples of each.
+
+	Stages are timed with spans:
+
+		with stats.span("render"):
+			...
+
+	which cost next to nothing while the stats are off.
+	The stats can also run cProfile over a number of frames.
+	"""
+
+	# Number of samples kept of each stage.
+	WINDOW = 300
+	# Percentiles reported.
+	PERCENTILES = (50, 95, 99)
+
+	def __init__(self, enabled = False):
+		self.enabled = enabled
+		# Samples (seconds) of each stage, by its name.
+		self.samples = OrderedDict()
+		self.lock = threading.Lock()
+		self.frame_start = None
+		self.num_frames = 0
+
+		# A running profile, the number of frames left to profile, and where to save it.
+		self.profile = None
+		self.profile_frames = 0
+		self.profile_path = None
+
+	def stage(self, name):
+		"""
+		Get the samples of a stage.
+		"""
+		samples = self.samples.get(name)
+		if samples is None:
+			with self.lock:
+				samples = self.samples.setdefault(name, deque(maxlen=FrameStats.WINDOW))
+		return samples
+
+	def span(self, name):
+		"""
+		Get a span (a context manager), which times a stage.
+		"""
+		if not self.enabled:
+			return NULL_SPAN
+		return Span(self.stage(name))
+
+	def end_frame(self):
+		"""
+		Mark the end of a frame (and the start of the next one).
+		"""
+		if self.profile is not None:
+			self.profile_frames -= 1
+			if self.profile_frames <= 0:
+				self.stop_profile()
+		if not self.enabled:
+			return
+		now = timer()
+		if self.frame_start is not None:
+			self.stage("frame").append(now - self.frame_start)
+		self.frame_start = now
+		self.num_frames += 1
+
+	def start_profile(self, num_frames, path):
+		"""
+		Run cProfile for the given number of frames,
+		then save the profile to path (for pstats).
+		"""
+		if self.profile is not None:
+			return
+		self.profile_frames = num_frames
+		self.profile_path = path
+		self.profile = cProfile.Profile()
+		self.profile.enable()
+
+	def stop_profile(self):
+		"""
+		Stop profiling and save the profile.
+		"""
+		if self.profile is None:
+			return
+		self.profile.disable()
+		self.profile.dump_stats(self.profile_path)
+		self.profile = None
+
+	@staticmethod
+	def percentiles(samples):
+		"""
+		Get the FrameStats.PERCENTILES of the samples (nearest rank).
+		"""
+		ordered = sorted(samples)
+		n = len(ordered)
+		if n == 0:
+			return [0.0 for p in FrameStats.PERCENTILES]
+		return [ordered[min(n - 1, int(n * p / 100.0))] for p in FrameStats.PERCENTILES]
+
+	def summary(self):
+		"""
+		Get (stage, number of samples, percentiles) of every stage.
+		"""
+		with self.lock:
+			stages = list(self.samples.items())
+		rows = []
+		for name, samples in stages:
+			samples = list(samples)
+			rows.append((name, len(samples), FrameStats.percentiles(samples)))
+		return rows
+
+	def lines(self):
+		"""
+		Get the summary as lines of text, in milliseconds.
+		"""
+		header = "{:<16} {:>6}".format("stage", "n") + "".join(
+				" {:>8}".format("p{}".format(p)) for p in FrameStats.PERCENTILES)
+		lines = [header]
+		for name, n, values in self.summary():
+			lines.append("{:<16} {:>6}".format(name, n) + "".join(
+					" {:>8.3f}".format(value * 1e3) for value in values))
+		return lines
+
+	def dump(self, path):
+		"""
+		Write the summary to a file.
+		"""
+		with open(path, "w") as f:
+			f.write("Frame stage times (ms) over the last {} samples, {} frames in total\n".format(
+					FrameStats.WINDOW, self.num_frames))
+			for line in self.lines():
+				f.write(line + "\n")
@@ -15,6 +15,8 @@ class GUI():
 	def __init__(self, renderer):
 		self.renderer = renderer
 		self.lobby_visible = False
+		# Items of the server list by UUID, or None if the list has to be filled.
+		self.server_items = None
 		self.game_name = ""
 		self.boardsize = (10, 10)
 		self.num_players = (1, 3)
@@ -58,6 +60,7 @@ class GUI():
 		self.li_servers = ow.ScrolledList(rect[2] - 16, rect[3] - 64)
 		self.li_servers.topleft = (rect[0], rect[1] + 16)
 		self.li_servers.set_selectionmode(oc.SELECTION_SINGLE)
+		self.server_items = None
 
 		# Add all the widgets.
 		self.renderer.add_widget(self.l_servers)
@@ -198,23 +201,38 @@ class GUI():
 		self.hide_all()
 		self.renderer.color = (0, 0, 0, 0)
 
-	def process_serverlist(self, serverlist):
+	def process_serverlist(self, directory):
 		"""
-		Process the announcements collected from the message queue.
+		Apply the changes to the lobby directory since the last frame.
+		Returns True, if the list changed.
 		"""
+		added, updated, removed = directory.take_diff()
+
 		# Note that events may be late.
 		# However, mustn't work on widgets that are being
 		# garbage collected.
 		if not self.lobby_visible:
-			return
-
-		num_servers = 0
-		for key, val in serverlist.iteritems():
-			# Either update an existing list item.
-			if len(self.li_servers.items) > 0 and num_servers < len(self.li_servers.items):
-				self.li_servers.items[num_servers].set_server(val)
-			# Or create a new one.
+			return False
+
+		items = self.li_servers.items
+		# A new list, fill it with every server there is.
+		if self.server_items is None:
+			self.server_items = {}
+			added, updated, removed = directory.servers.values(), [], []
+
+		for uuid in removed:
+			item = self.server_items.pop(uuid, None)
+			if item is not None:
+				items.remove(item)
+		for server in updated:
+			item = self.server_items.get(server.uuid)
+			if item is not None:
+				item.set_server(server)
 			else:
-				self.li_servers.items.append(LobbyListItem(val))
-			num_servers += 1
+				added.append(server)
+		for server in added:
+			item = LobbyListItem(server)
+			self.server_items[server.uuid] = item
+			items.append(item)
+		return bool(added or updated or removed)
 
@@ -1,5 +1,7 @@
 import ocempgui.widgets as ow
 
+import lobby as bl
+
 class LobbyListItem(ow.components.TextListItem):
 	"""
 	A listbox item with text and UUID.
@@ -15,18 +17,16 @@ class LobbyListItem(ow.components.TextListItem):
 		"""
 		Translate the lobby list item into readable text.
 		"""
-		text =  "{} ({}x{}, {}/{})".format(
-				self.server.name, 
-				self.server.boardsize[0], self.server.boardsize[1],
-				self.server.num_players[0], self.server.num_players[1])
-		return text
+		return bl.describe(self.server)
 	
 	def set_server(self, server):
 		"""
 		Update item contents.
 		"""
 		self.server = server
-		self.set_text(str(self))
+		text = str(self)
+		if text != self.text:
+			self.set_text(text)
 
 	def get_uuid(self):
 		"""
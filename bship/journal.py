@@ -0,0 +1,304 @@
+import mmap
+import os
+import struct
+import time
+import uuid
+from collections import namedtuple
+
+# A player joined (seat, uuid, board size in x and y, the maximum number of players in a).
+J_JOIN = 0x01
+# A ship was placed (seat, ship index in b, position in x and y, orientation in a).
+J_PLACE = 0x02
+# A player's turn began (seat, turn).
+J_TURN = 0x03
+# A shot was fired (seat, turn, target seat in b, position in x and y, result in a).
+J_SHOT = 0x04
+# The game ended (winner's seat, or 0xFF for none).
+J_END = 0x05
+
+MAGIC = b"BSJN"
+VERSION = 2
+
+# Magic, version, offset of the index footer (0 while the journal is open).
+HEADER = struct.Struct("!4sB3xQ")
+# Where the offset of the footer is in the header.
+FOOTER_OFFSET = struct.calcsize("!4sB3x")
+# Kind, seat, a, b, x, y, game, turn, time, player UUID (only for joins).
+RECORD = struct.Struct("!BBBBHHIId16s")
+# Game, offset and number of its record numbers, offset and number of its turns.
+MATCH = struct.Struct("!IQIQI")
+# Offset of the index footer, number of games, magic.
+TRAILER = struct.Struct("!QI4s")
+# A record number, or the index of a turn among the records of its game.
+NUMBER = struct.Struct("!I")
+
+NO_UUID = b"\0" * 16
+
+Record = namedtuple("Record", "kind seat a b x y game turn time uuid")
+
+class JournalWriter():
+	"""
+	An append-only journal of game events: joins, placements, turns
+	and shots of any number of games, in fixed-size records.
+	On closing, an index footer is appended, listing the records and
+	turns of each game, so a reader can seek to them directly. Where
+	it starts is noted in the header first, so a footer torn by a crash
+	is never mistaken for records.
+	Opening an existing journal drops its footer and carries on.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		# Record numbers of each game, and the positions of its turns among them.
+		self.game_records = {}
+		self.game_turns = {}
+		self.num_records = 0
+		self.next_game = 0
+
+		if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+			self.file = open(path, "r+b")
+			reader = JournalReader(path)
+			try:
+				for game in reader.games():
+					self.game_records[game] = list(reader.record_numbers(game))
+					self.game_turns[game] = list(reader.turn_positions(game))
+					self.next_game = max(self.next_game, game + 1)
+				self.num_records = len(reader)
+			finally:
+				reader.close()
+			# Drop the footer (or a torn record at the end).
+			self.file.truncate(HEADER.size + self.num_records * RECORD.size)
+			self.set_footer(0)
+			self.file.seek(0, os.SEEK_END)
+		else:
+			self.file = open(path, "w+b")
+			self.file.write(HEADER.pack(MAGIC, VERSION, 0))
+
+	def set_footer(self, offset):
+		"""
+		Note where the footer starts in the header (0 for no footer).
+		"""
+		self.file.seek(FOOTER_OFFSET)
+		self.file.write(struct.pack("!Q", offset))
+		self.file.flush()
+
+	def new_game(self):
+		"""
+		Get the number of a new game.
+		"""
+		game = self.next_game
+		self.next_game += 1
+		self.game_records[game] = []
+		self.game_turns[game] = []
+		return game
+
+	def record(self, kind, game, seat = 0, turn = 0, x = 0, y = 0, a = 0, b = 0, player = None):
+		"""
+		Append a record.
+		"""
+		raw = uuid.UUID(player).bytes if player is not None else NO_UUID
+		self.file.write(RECORD.pack(kind, seat, a, b, x, y, game, turn, time.time(), raw))
+		records = self.game_records.setdefault(game, [])
+		if kind == J_TURN:
+			self.game_turns.setdefault(game, []).append(len(records))
+		records.append(self.num_records)
+		self.num_records += 1
+
+	def join(self, game, seat, player, w, h, max_players):
+		self.record(J_JOIN, game, seat, 0, w, h, max_players, 0, player)
+
+	def place(self, game, seat, index, x, y, orientation):
+		self.record(J_PLACE, game, seat, 0, x, y, orientation, index)
+
+	def turn(self, game, seat, turn):
+		self.record(J_TURN, game, seat, turn)
+
+	def shot(self, game, seat, turn, target, x, y, result):
+		self.record(J_SHOT, game, seat, turn, x, y, result, target)
+
+	def end(self, game, winner):
+		self.record(J_END, game, 0xFF if winner is None else winner)
+
+	def flush(self):
+		self.file.flush()
+
+	def close(self):
+		"""
+		Append the index footer and close the journal.
+		"""
+		f = self.file
+		f.seek(0, os.SEEK_END)
+		footer = f.tell()
+		self.set_footer(footer)
+		f.seek(footer)
+		games = sorted(self.game_records)
+
+		# The directory of games comes first, then their tables.
+		offset = footer + MATCH.size * len(games)
+		tables = []
+		for game in games:
+			records = self.game_records[game]
+			turns = self.game_turns.get(game, [])
+			f.write(MATCH.pack(game, offset, len(records),
+					offset + NUMBER.size * len(records), len(turns)))
+			offset += NUMBER.size * (len(records) + len(turns))
+			tables.append(records)
+			tables.append(turns)
+		for table in tables:
+			f.write(struct.pack("!{}I".format(len(table)), *table))
+		f.write(TRAILER.pack(footer, len(games), MAGIC))
+		f.close()
+
+class JournalReader():
+	"""
+	Reads a journal through a memory map, so that a game (or a turn of it)
+	can be read without going through the rest of the file.
+	Without a footer (a journal, which wasn't closed, or whose footer
+	was torn), the records are scanned once to index them.
+	"""
+
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		if len(self.map) < HEADER.size:
+			raise ValueError("Not a game journal")
+		magic, version, start = HEADER.unpack_from(self.map, 0)
+		if magic != MAGIC:
+			raise ValueError("Not a game journal")
+		if version != VERSION:
+			raise ValueError("Unsupported journal version {}".format(version))
+
+		# Games as (records offset, number of records, turns offset, number of turns).
+		self.index = {}
+		# Record numbers and turn positions of games indexed by scanning.
+		self.scanned = None
+
+		size = len(self.map)
+		# The records end where the footer starts, whether it's whole or not.
+		end = size
+		if start >= HEADER.size and start <= size:
+			end = start
+		footer = None
+		if start and size >= HEADER.size + TRAILER.size:
+			footer, num_games, magic = TRAILER.unpack_from(self.map, size - TRAILER.size)
+			if magic != MAGIC or footer != start:
+				footer = None
+		self.num_records = (end - HEADER.size) // RECORD.size
+		if footer is not None:
+			for i in range(num_games):
+				game, rec_offset, num_records, turn_offset, num_turns = \
+						MATCH.unpack_from(self.map, footer + i * MATCH.size)
+				self.index[game] = (rec_offset, num_records, turn_offset, num_turns)
+		else:
+			self.scan()
+
+	def scan(self):
+		"""
+		Index the records of each game by going through all of them.
+		"""
+		self.scanned = {}
+		for n in range(self.num_records):
+			record = self.record(n)
+			records, turns = self.scanned.setdefault(record.game, ([], []))
+			if record.kind == J_TURN:
+				turns.append(len(records))
+			records.append(n)
+
+	def __len__(self):
+		return self.num_records
+
+	def games(self):
+		"""
+		Get the numbers of the games in the journal.
+		"""
+		if self.scanned is not None:
+			return sorted(self.scanned)
+		return sorted(self.index)
+
+	def record(self, n):
+		"""
+		Get record number n.
+		"""
+		if n < 0 or n >= self.num_records:
+			raise IndexError("No record {}".format(n))
+		fields = RECORD.unpack_from(self.map, HEADER.size + n * RECORD.size)
+		if fields[-1] == NO_UUID:
+			player = None
+		else:
+			player = str(uuid.UUID(bytes=fields[-1]))
+		return Record(*(fields[:-1] + (player,)))
+
+	def record_numbers(self, game):
+		"""
+		Iterate over the record numbers of a game.
+		"""
+		if self.scanned is not None:
+			return iter(self.scanned[game][0])
+		offset, num, turn_offset, num_turns = self.index[game]
+		return (NUMBER.unpack_from(self.map, offset + i * NUMBER.size)[0] for i in range(num))
+
+	def turn_positions(self, game):
+		"""
+		Iterate over the positions of the turns of a game among its records.
+		"""
+		if self.scanned is not None:
+			return iter(self.scanned[game][1])
+		offset, num, turn_offset, num_turns = self.index[game]
+		return (NUMBER.unpack_from(self.map, turn_offset + i * NUMBER.size)[0] for i in range(num_turns))
+
+	def num_turns(self, game):
+		if self.scanned is not None:
+			return len(self.scanned[game][1])
+		return self.index[game][3]
+
+	def records(self, game, turn = None):
+		"""
+		Iterate over the records of a game, from the start
+		or from the start of the given turn (counting from 0).
+		"""
+		if self.scanned is not None:
+			numbers, turns = self.scanned[game]
+			start = 0 if turn is None else turns[turn]
+			for n in numbers[start:]:
+				yield self.record(n)
+			return
+
+		offset, num, turn_offset, num_turns = self.index[game]
+		start = 0
+		if turn is not None:
+			if turn < 0 or turn >= num_turns:
+				raise IndexError("No turn {} in game {}".format(turn, game))
+			start = NUMBER.unpack_from(self.map, turn_offset + turn * NUMBER.size)[0]
+		for i in range(start, num):
+			yield self.record(NUMBER.unpack_from(self.map, offset + i * NUMBER.size)[0])
+
+	def replay(self, game, turns = None):
+		"""
+		Replay a game on the headless engine, up to the given number
+		of turns (all of them by default).
+		Returns the engine.game.Game.
+		"""
+		import engine.game as eg
+
+		players = {}
+		engine = None
+		num_turns = 0
+		for record in self.records(game):
+			if record.kind == J_JOIN:
+				players[record.seat] = record
+			elif record.kind == J_PLACE:
+				if engine is None:
+					join = players[min(players)]
+					engine = eg.Game(len(players), join.x, join.y)
+				engine.place(record.seat, record.x, record.y, record.a)
+			elif record.kind == J_TURN:
+				if turns is not None and num_turns >= turns:
+					break
+				num_turns += 1
+			elif record.kind == J_SHOT:
+				engine.shoot(record.x, record.y, record.b)
+		return engine
+
+	def close(self):
+		self.map.close()
+		self.file.close()
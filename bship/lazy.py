@@ -0,0 +1,45 @@
+import importlib
+
+class LazyModule():
+	"""
+	Stands in for a module, which is only imported once one of its
+	attributes is first used, e.g.:
+
+		pygame = lazy("pygame")
+
+	so that tools, which only need the protocol or the board logic,
+	don't pay for the GUI, rendering and transport stacks at startup.
+	"""
+
+	def __init__(self, name):
+		self.__dict__["_name"] = name
+		self.__dict__["_module"] = None
+
+	def __getattr__(self, attr):
+		return getattr(load(self), attr)
+
+	def __setattr__(self, attr, value):
+		setattr(load(self), attr, value)
+		self.__dict__[attr] = value
+
+def load(lazy_module):
+	"""
+	Import the module behind a LazyModule, if it's not been imported yet.
+	Returns the module.
+	"""
+	# Not a method, since the module's own attributes end up on the stand-in.
+	state = lazy_module.__dict__
+	module = state["_module"]
+	if module is None:
+		module = importlib.import_module(state["_name"])
+		state["_module"] = module
+		# Later lookups find the module's attributes without
+		# coming back here (ones added afterwards still do).
+		state.update(module.__dict__)
+	return module
+
+def lazy(name):
+	"""
+	Get a module, which is imported on first use.
+	"""
+	return LazyModule(name)
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+import scheduler as bsc
+
+def describe(server):
+	"""
+	Translate a server announce into readable text.
+	"""
+	return "{} ({}x{}, {}/{})".format(
+			server.name,
+			server.boardsize[0], server.boardsize[1],
+			server.num_players[0], server.num_players[1])
+
+class LobbyDirectory():
+	"""
+	The servers announced in the lobby, by their UUID.
+	A server is dropped TTL seconds after its last announce.
+	The servers added, updated and removed since the last frame
+	are collected, so that only the rows that differ are redrawn.
+	"""
+
+	TTL = 3.0
+
+	def __init__(self, ttl = TTL, scheduler = None):
+		self.ttl = ttl
+		# Expires the servers. The owner of a shared scheduler ticks it.
+		if scheduler is None:
+			scheduler = bsc.Scheduler()
+		self.scheduler = scheduler
+		# Latest announce of each server, in the order they appeared.
+		self.servers = OrderedDict()
+		# Changes since the last diff (UUIDs).
+		self.added = OrderedDict()
+		self.updated = OrderedDict()
+		self.removed = OrderedDict()
+
+	def __len__(self):
+		return len(self.servers)
+
+	def __contains__(self, uuid):
+		return uuid in self.servers
+
+	def announce(self, msg):
+		"""
+		Add a server, or update it, and push its expiry back.
+		"""
+		uuid = msg.uuid
+		old = self.servers.get(uuid)
+		self.servers[uuid] = msg
+		if old is None:
+			if uuid in self.removed:
+				# Gone and back within a frame.
+				del self.removed[uuid]
+				self.updated[uuid] = True
+			else:
+				self.added[uuid] = True
+		elif uuid not in self.added and (old.name != msg.name
+				or old.boardsize != msg.boardsize or old.num_players != msg.num_players):
+			self.updated[uuid] = True
+		self.scheduler.schedule(("server", uuid), self.ttl, self.expire, uuid)
+
+	def expire(self, uuid):
+		"""
+		Drop a server, which hasn't been announced in a while.
+		"""
+		if self.servers.pop(uuid, None) is None:
+			return
+		self.updated.pop(uuid, None)
+		if uuid in self.added:
+			# Never seen by anyone.
+			del self.added[uuid]
+		else:
+			self.removed[uuid] = True
+
+	def tick(self, now = None):
+		"""
+		Drop the expired servers (if the scheduler isn't ticked elsewhere).
+		"""
+		return self.scheduler.tick(now)
+
+	def take_diff(self):
+		"""
+		Get the servers added and updated (their announces),
+		and removed (their UUIDs) since the last call.
+		"""
+		servers = self.servers
+		added = [servers[uuid] for uuid in self.added]
+		updated = [servers[uuid] for uuid in self.updated]
+		removed = list(self.removed)
+		self.added = OrderedDict()
+		self.updated = OrderedDict()
+		self.removed = OrderedDict()
+		return added, updated, removed
@@ -0,0 +1,204 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+class LocalBroker():
+	"""
+	An in-process stand-in for a RabbitMQ broker.
+	Connections to it have the part of the pika BlockingConnection and
+	channel API the game uses, so clients and servers can run (and be
+	tested) without a real broker. Supports the default exchange,
+	fanout exchanges, exclusive auto-delete queues and message TTL.
+	Connections may be used from different threads.
+	"""
+
+	def __init__(self):
+		# Guards everything below, and wakes up waiting consumers.
+		self.cond = threading.Condition()
+		# Exchange types by name (the default exchange is "").
+		self.exchanges = {"": "direct"}
+		# Queues bound to each fanout exchange.
+		self.bindings = {}
+		# Queues by name.
+		self.queues = {}
+		# For generated queue names.
+		self.counter = itertools.count()
+
+	def connect(self):
+		"""
+		Open a new connection to the broker.
+		"""
+		return LocalConnection(self)
+
+	def route(self, exchange, routing_key):
+		"""
+		Get the names of the queues a message should be delivered to.
+		"""
+		if exchange not in self.exchanges:
+			raise ValueError("No exchange '{}'".format(exchange))
+		if self.exchanges[exchange] == "fanout":
+			return list(self.bindings.get(exchange, ()))
+		if routing_key in self.queues:
+			return [routing_key]
+		return []
+
+class LocalQueue():
+	"""
+	A queue of the local broker.
+	"""
+
+	def __init__(self, name, owner, auto_delete, ttl):
+		self.name = name
+		self.owner = owner
+		self.auto_delete = auto_delete
+		# Message TTL (in seconds), or None.
+		self.ttl = ttl
+		# Messages as (expiry time, exchange, routing key, properties, body).
+		self.messages = deque()
+		self.consumer = None
+
+class Method():
+	"""
+	Stand-in for the pika method frames passed to callbacks.
+	"""
+
+	def __init__(self, **kwargs):
+		self.__dict__.update(kwargs)
+
+class Frame():
+	"""
+	Stand-in for the pika frames returned by declarations.
+	"""
+
+	def __init__(self, method):
+		self.method = method
+
+class LocalConnection():
+	"""
+	A connection to the local broker, which is also its only channel.
+	"""
+
+	def __init__(self, broker):
+		self.broker = broker
+		self.is_open = True
+		# Queues consumed through this connection.
+		self.consumed = []
+		self.delivery_tags = itertools.count(1)
+		# Calls left by other threads, to run while processing events.
+		self.callbacks = []
+
+	def channel(self):
+		return self
+
+	def exchange_declare(self, exchange, exchange_type="direct", **kwargs):
+		broker = self.broker
+		with broker.cond:
+			if broker.exchanges.get(exchange, exchange_type) != exchange_type:
+				raise ValueError("Exchange '{}' redeclared as {}".format(exchange, exchange_type))
+			broker.exchanges[exchange] = exchange_type
+			broker.bindings.setdefault(exchange, set())
+		return Frame(Method(exchange=exchange))
+
+	def queue_declare(self, queue="", exclusive=False, auto_delete=False, arguments=None, **kwargs):
+		broker = self.broker
+		with broker.cond:
+			if not queue:
+				queue = "amq.gen-{}".format(next(broker.counter))
+			if queue not in broker.queues:
+				ttl = None
+				if arguments and "x-message-ttl" in arguments:
+					ttl = arguments["x-message-ttl"] / 1000.0
+				owner = self if exclusive else None
+				broker.queues[queue] = LocalQueue(queue, owner, auto_delete, ttl)
+			q = broker.queues[queue]
+			return Frame(Method(queue=queue, message_count=len(q.messages)))
+
+	def queue_bind(self, queue, exchange, routing_key=None, **kwargs):
+		with self.broker.cond:
+			self.broker.bindings.setdefault(exchange, set()).add(queue)
+
+	def basic_consume(self, consumer_callback, queue="", no_ack=False, **kwargs):
+		with self.broker.cond:
+			q = self.broker.queues[queue]
+			q.consumer = consumer_callback
+			self.consumed.append(q)
+		return queue
+
+	def basic_publish(self, exchange, routing_key, body, properties=None, **kwargs):
+		now = time.time()
+		# Per-message expiration is in milliseconds, as a string.
+		expiration = None
+		if properties is not None and getattr(properties, "expiration", None):
+			expiration = now + int(properties.expiration) / 1000.0
+		with self.broker.cond:
+			for name in self.broker.route(exchange, routing_key):
+				q = self.broker.queues[name]
+				expires = expiration
+				if q.ttl is not None and (expires is None or now + q.ttl < expires):
+					expires = now + q.ttl
+				q.messages.append((expires, exchange, routing_key, properties, body))
+			self.broker.cond.notify_all()
+
+	def basic_ack(self, delivery_tag=0, multiple=False):
+		pass
+
+	def has_messages(self):
+		for q in self.consumed:
+			if q.messages:
+				return True
+		return False
+
+	def add_callback_threadsafe(self, callback):
+		"""
+		Have callback run by the thread processing events, waking it up.
+		"""
+		with self.broker.cond:
+			self.callbacks.append(callback)
+			self.broker.cond.notify_all()
+
+	def process_data_events(self, time_limit=0):
+		"""
+		Deliver the messages waiting in the consumed queues,
+		dropping the expired ones, and run the callbacks added
+		since. If there are none, wait for up to time_limit
+		seconds for some to arrive (or until they do, if None).
+		"""
+		with self.broker.cond:
+			if not self.has_messages() and not self.callbacks:
+				if time_limit is None:
+					self.broker.cond.wait()
+				elif time_limit:
+					self.broker.cond.wait(time_limit)
+			callbacks = self.callbacks
+			self.callbacks = []
+			now = time.time()
+			deliveries = []
+			for q in self.consumed:
+				while q.messages:
+					expires, exchange, routing_key, properties, body = q.messages.popleft()
+					if expires is None or expires > now:
+						deliveries.append((q.consumer, exchange, routing_key, properties, body))
+
+		for consumer, exchange, routing_key, properties, body in deliveries:
+			method = Method(
+					delivery_tag=next(self.delivery_tags),
+					exchange=exchange,
+					routing_key=routing_key)
+			consumer(self, method, properties, body)
+		for callback in callbacks:
+			callback()
+
+	def close(self):
+		"""
+		Close the connection, deleting its exclusive and auto-delete queues.
+		"""
+		broker = self.broker
+		with broker.cond:
+			for name, q in list(broker.queues.items()):
+				if q.owner is self or (q.auto_delete and q in self.consumed):
+					del broker.queues[name]
+					for bound in broker.bindings.values():
+						bound.discard(name)
+			self.consumed = []
+		self.is_open = False
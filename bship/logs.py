@@ -0,0 +1,147 @@
+import json
+import logging
+import threading
+import time
+import zlib
+import Queue
+
+# A level below DEBUG, for large diagnostics (e.g. board dumps),
+# which are only put together if it's enabled.
+DUMP = 5
+logging.addLevelName(DUMP, "DUMP")
+
+FORMAT = "[%(levelname)s: %(name)s]\t%(message)s"
+
+class QueueHandler(logging.Handler):
+	"""
+	Hands log records over to a LogWriter, without formatting them
+	or touching any file on the calling thread.
+	Records are dropped (and counted), if the writer falls behind.
+	"""
+
+	def __init__(self, queue):
+		logging.Handler.__init__(self)
+		self.queue = queue
+		self.num_dropped = 0
+
+	def emit(self, record):
+		try:
+			self.queue.put_nowait(record)
+		except Queue.Full:
+			self.num_dropped += 1
+
+class LogWriter(threading.Thread):
+	"""
+	Formats and writes the queued log records on a background thread.
+	"""
+
+	# Number of records, which may wait to be written.
+	MAX_QUEUED = 10000
+
+	def __init__(self, handlers):
+		threading.Thread.__init__(self, name="LogWriter")
+		self.daemon = True
+		self.handlers = handlers
+		self.queue = Queue.Queue(LogWriter.MAX_QUEUED)
+
+	def handler(self):
+		"""
+		Get a handler, which queues records for this writer.
+		"""
+		return QueueHandler(self.queue)
+
+	def run(self):
+		while True:
+			record = self.queue.get()
+			if record is None:
+				break
+			for handler in self.handlers:
+				if record.levelno >= handler.level:
+					handler.handle(record)
+
+	def stop(self):
+		"""
+		Write what's left, and stop the thread.
+		"""
+		if self.is_alive():
+			self.queue.put(None)
+			self.join()
+		for handler in self.handlers:
+			handler.flush()
+
+def init_queued(name, level, path = None, fmt = FORMAT):
+	"""
+	Log to stdout (and a file, if given) through a LogWriter.
+	Returns the logger and the (started) writer.
+	"""
+	formatter = logging.Formatter(fmt)
+	handlers = [logging.StreamHandler()]
+	if path is not None:
+		handlers.append(logging.FileHandler(path, encoding="UTF-8"))
+	for handler in handlers:
+		handler.setFormatter(formatter)
+
+	writer = LogWriter(handlers)
+	writer.start()
+	log = logging.getLogger(name)
+	log.setLevel(level)
+	log.addHandler(writer.handler())
+	return log, writer
+
+class TraceRecord():
+	"""
+	The message of a trace record, turned into a line of JSON
+	only when it's written.
+	"""
+
+	__slots__ = ("fields",)
+
+	def __init__(self, fields):
+		self.fields = fields
+
+	def __str__(self):
+		return json.dumps(self.fields, separators=(",", ":"), sort_keys=True)
+
+class GameTrace():
+	"""
+	A compact trace of game events (joins, turns, evictions, ...), a line
+	of JSON per event, written through a LogWriter of its own.
+	Only a share of the rooms is traced: whether a room is, follows
+	from its UUID, so every event of a traced room makes it in.
+	"""
+
+	def __init__(self, path, rate = 1.0):
+		"""
+		rate is the share of the rooms to trace (0 to 1).
+		"""
+		self.rate = rate
+		# The threshold of a room's hash (32 bits) to be traced.
+		self.threshold = int(rate * 0x100000000)
+		self.log = logging.getLogger("BShip.Trace")
+		self.log.propagate = False
+		self.log.setLevel(logging.INFO)
+		handler = logging.FileHandler(path, encoding="UTF-8")
+		handler.setFormatter(logging.Formatter("%(message)s"))
+		self.writer = LogWriter([handler])
+		self.writer.start()
+		self.handler = self.writer.handler()
+		self.log.addHandler(self.handler)
+
+	def sampled(self, room):
+		"""
+		Check whether a room (by its UUID) is traced.
+		"""
+		return (zlib.crc32(room) & 0xFFFFFFFF) < self.threshold
+
+	def event(self, room, kind, **fields):
+		"""
+		Trace an event of a room (one that's sampled).
+		"""
+		fields["t"] = round(time.time(), 3)
+		fields["room"] = room
+		fields["ev"] = kind
+		self.log.info(TraceRecord(fields))
+
+	def close(self):
+		self.log.removeHandler(self.handler)
+		self.writer.stop()
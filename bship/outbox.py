@@ -0,0 +1,89 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import protocol as bp
+
+class Outbox():
+	"""
+	Outgoing messages, buffered during a frame and published in one go.
+	Messages that replace each other (repeated announces, repeated
+	state acknowledgements to the same client) are merged,
+	so only the latest one is sent.
+	Messages may be posted from any thread.
+	"""
+
+	def __init__(self):
+		self.log = logging.getLogger("BShip.Outbox")
+		self.lock = threading.Lock()
+		# Messages to publish, in order, by their merge key.
+		self.pending = OrderedDict()
+		# Number of messages posted, and merged into later ones.
+		self.num_posted = 0
+		self.num_merged = 0
+		# Number of messages dropped, since they couldn't be encoded.
+		self.num_dropped = 0
+		# Called (on the posting thread) when a message is posted
+		# to an empty outbox, e.g. to wake up the transport thread.
+		self.wake = None
+
+	@staticmethod
+	def merge_key(exchange, routing_key, msg_dict):
+		"""
+		Get the key of messages that replace each other,
+		or None if the message must always be sent.
+		"""
+		msg_id = msg_dict["id"]
+		if msg_id == bp.M_ANNOUNCE:
+			return (exchange, routing_key, msg_id, msg_dict["uuid"])
+		elif msg_id == bp.M_JOINING or msg_id == bp.M_HEARTBEAT:
+			return (exchange, routing_key, msg_id)
+		elif msg_id == bp.M_ACK:
+			return (exchange, routing_key, msg_id, msg_dict["state"])
+		# Board snapshots, deltas and resync requests are numbered,
+		# and each of them counts.
+		return None
+
+	def post(self, exchange, routing_key, msg_dict):
+		"""
+		Queue a message (dict) for the next flush.
+		"""
+		key = Outbox.merge_key(exchange, routing_key, msg_dict)
+		with self.lock:
+			was_empty = not self.pending
+			if key is None:
+				# Unique, never merged.
+				key = self.num_posted
+			elif key in self.pending:
+				# Drop the older one, the new one goes to the back of the queue.
+				del self.pending[key]
+				self.num_merged += 1
+			self.num_posted += 1
+			self.pending[key] = (exchange, routing_key, msg_dict)
+		wake = self.wake
+		if was_empty and wake is not None:
+			wake()
+
+	def flush(self, channel):
+		"""
+		Publish every queued message.
+		A message, which can't be encoded, is dropped (and logged)
+		without holding up the rest.
+		Returns the number of messages published.
+		"""
+		if not self.pending:
+			return 0
+		with self.lock:
+			pending = self.pending
+			self.pending = OrderedDict()
+		num_published = 0
+		for exchange, routing_key, msg_dict in pending.values():
+			try:
+				msg = bp.Message.encode(msg_dict)
+			except (ValueError, KeyError, TypeError) as e:
+				self.num_dropped += 1
+				self.log.error("Dropped message {}: {}".format(msg_dict.get("id"), e))
+				continue
+			channel.basic_publish(exchange=exchange, routing_key=routing_key, body=msg)
+			num_published += 1
+		return num_published
@@ -0,0 +1,71 @@
+class FramePacer():
+	"""
+	Decides when the client redraws, and how long it may sleep.
+
+	The screen is only redrawn once something invalidates it: input,
+	an incoming message, or the end of a frame time without any (a
+	timer). Input and messages bring the frame rate up to the active
+	ceiling; while idle, it decays towards the floor, so an idle
+	client mostly sleeps.
+	"""
+
+	# Frames per second while idle, and while active.
+	IDLE_FPS = 2.0
+	ACTIVE_FPS = 30.0
+	# Share of the frame rate kept every idle frame, on the way to the floor.
+	DECAY = 0.8
+
+	def __init__(self, idle_fps = IDLE_FPS, active_fps = ACTIVE_FPS):
+		self.idle_fps = idle_fps
+		self.active_fps = active_fps
+		self.fps = active_fps
+		# Whether the screen has to be redrawn, and whether anything happened.
+		self.dirty = True
+		self.active = False
+		# Number of frames, and of the ones redrawn.
+		self.num_frames = 0
+		self.num_drawn = 0
+
+	def invalidate(self, active = True):
+		"""
+		The screen has to be redrawn.
+		Unless it's only the timer, the frame rate goes up to the ceiling.
+		May be called from any thread.
+		"""
+		self.dirty = True
+		if active:
+			self.active = True
+
+	def take_dirty(self):
+		"""
+		Check whether the screen has to be redrawn, and start over.
+		"""
+		dirty = self.dirty
+		self.dirty = False
+		if dirty:
+			self.num_drawn += 1
+		return dirty
+
+	def end_frame(self):
+		"""
+		Adjust the frame rate at the end of a frame.
+		"""
+		self.num_frames += 1
+		if self.active:
+			self.active = False
+			self.fps = self.active_fps
+		else:
+			self.fps = max(self.idle_fps, self.fps * FramePacer.DECAY)
+
+	def frame_time(self):
+		"""
+		Get the longest time (in seconds) to wait for events before
+		the next frame.
+		"""
+		return 1.0 / self.fps
+
+	def min_frame_time(self):
+		"""
+		Get the shortest time (in seconds) between frames.
+		"""
+		return 1.0 / self.active_fps
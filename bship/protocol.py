@@ -1,33 +1,271 @@
-import pickle
+import struct
+import sys
+import zlib
 import time
+import uuid
+from array import array
 
 # Server announce message.
 M_ANNOUNCE = 0x00
 # Client join message.
 M_JOINING = 0x01
+# Client heartbeat, while in a game.
+M_HEARTBEAT = 0x02
+# Full snapshot of a board.
+M_BOARD_SNAPSHOT = 0x03
+# Cells of a board changed since the previous snapshot or delta.
+M_BOARD_DELTA = 0x04
+# Request for a fresh snapshot of a board.
+M_BOARD_RESYNC = 0x05
 # Generic acknowledge.
 M_ACK = 0x0A
 # Generic error message.
 M_NACK = 0xFF
 
+# Fanout exchange for the lobby announces.
+LOBBY_EXCHANGE = "lobby"
+
+# Version of the wire format.
+VERSION = 1
+
+# Message id, version, timestamp.
+HEADER = struct.Struct("!BBd")
+# Length of a string.
+STRING = struct.Struct("!H")
+# UUID, board width and height, number of players and the maximum.
+ANNOUNCE = struct.Struct("!16sHHBB")
+# Server UUID, client UUID.
+JOINING = struct.Struct("!16s16s")
+# Server UUID, client UUID.
+HEARTBEAT = struct.Struct("!16s16s")
+# Server UUID, client UUID, state.
+ACK = struct.Struct("!16s16sB")
+# Sender UUID, recipient UUID, board, sequence number.
+BOARD = struct.Struct("!16s16sBI")
+# Board width and height.
+BOARDSIZE = struct.Struct("!HH")
+# Length of a blob, or a number of cells.
+COUNT = struct.Struct("!I")
+
+# Largest values of the unsigned fields.
+U8 = 0xFF
+U16 = 0xFFFF
+U32 = 0xFFFFFFFF
+
+# Largest board (in cells) a snapshot may unpack to,
+# and the most cells a delta may change.
+MAX_SNAPSHOT = 4096 * 4096
+
+# Array type of the cell indices of a delta (4 bytes each).
+CELL = "I" if array("I").itemsize == 4 else "L"
+
+def check_range(name, value, top):
+	"""
+	Check that a field fits its unsigned type on the wire (0 to top).
+	Raises ValueError, if it doesn't.
+	"""
+	if not 0 <= value <= top:
+		raise ValueError("{} out of range: {} (0 to {})".format(name, value, top))
+
+def encode_string(text):
+	"""
+	Encode a string as its length followed by UTF-8.
+	"""
+	if not isinstance(text, bytes):
+		text = text.encode("utf-8")
+	check_range("String length", len(text), U16)
+	return STRING.pack(len(text)) + text
+
+def encode_blob(data):
+	"""
+	Encode bytes as their length followed by the bytes.
+	"""
+	return COUNT.pack(len(data)) + data
+
+def decode_blob(raw, offset):
+	"""
+	Decode bytes at the given offset.
+	Returns the bytes and the offset past them.
+	"""
+	length, = COUNT.unpack_from(raw, offset)
+	offset += COUNT.size
+	data = raw[offset:offset + length]
+	if len(data) != length:
+		raise ValueError("Truncated blob")
+	return bytes(data), offset + length
+
+def decode_string(raw, offset):
+	"""
+	Decode a string at the given offset.
+	Returns the string and the offset past it.
+	"""
+	length, = STRING.unpack_from(raw, offset)
+	offset += STRING.size
+	text = raw[offset:offset + length]
+	if len(text) != length:
+		raise ValueError("Truncated string")
+	if not isinstance(text, str):
+		# Python 3, where str isn't bytes.
+		text = text.decode("utf-8")
+	return text, offset + length
+
 class Message():
 	"""
 	A message, which is passed via messagequeue.
 	"""
 	def __init__(self, d):
 		self.__dict__ = d
-	
+
 	@staticmethod
-	def pickle(message):
+	def encode(message):
 		"""
-		Pickle the message (dict) with the current timestamp.
+		Encode the message (dict) with the current timestamp.
+		Raises ValueError, if a field doesn't fit the wire format.
+		"""
+		try:
+			return Message.encode_fields(message)
+		except struct.error as e:
+			raise ValueError("Can't encode message: {}".format(e))
+
+	@staticmethod
+	def encode_fields(message):
+		"""
+		Encode the message (dict), checking the ranges of its fields.
 		"""
 		message["timestamp"] = time.time()
-		return pickle.dumps(message)
-	
+		msg_id = message["id"]
+		raw = HEADER.pack(msg_id, VERSION, message["timestamp"])
+
+		if msg_id in (M_ANNOUNCE, M_BOARD_SNAPSHOT):
+			check_range("Board width", message["boardsize"][0], U16)
+			check_range("Board height", message["boardsize"][1], U16)
+
+		if msg_id == M_ANNOUNCE:
+			check_range("Number of players", message["num_players"][0], U8)
+			check_range("Maximum number of players", message["num_players"][1], U8)
+			raw += ANNOUNCE.pack(
+					uuid.UUID(message["uuid"]).bytes,
+					message["boardsize"][0], message["boardsize"][1],
+					message["num_players"][0], message["num_players"][1])
+			raw += encode_string(message["name"])
+		elif msg_id == M_JOINING:
+			raw += JOINING.pack(
+					uuid.UUID(message["server_uuid"]).bytes,
+					uuid.UUID(message["client_uuid"]).bytes)
+			raw += encode_string(message["name"])
+			raw += encode_string(message["nickname"])
+		elif msg_id == M_HEARTBEAT:
+			raw += HEARTBEAT.pack(
+					uuid.UUID(message["server_uuid"]).bytes,
+					uuid.UUID(message["client_uuid"]).bytes)
+		elif msg_id in (M_BOARD_SNAPSHOT, M_BOARD_DELTA, M_BOARD_RESYNC):
+			check_range("Board", message["board"], U8)
+			check_range("Sequence number", message["seq"], U32)
+			raw += BOARD.pack(
+					uuid.UUID(message["server_uuid"]).bytes,
+					uuid.UUID(message["client_uuid"]).bytes,
+					message["board"], message["seq"])
+			if msg_id == M_BOARD_SNAPSHOT:
+				# Tiles row by row, compressed.
+				raw += BOARDSIZE.pack(message["boardsize"][0], message["boardsize"][1])
+				raw += encode_blob(zlib.compress(bytes(message["tiles"])))
+			elif msg_id == M_BOARD_DELTA:
+				# Indices of the changed cells, then their tiles.
+				cells = message["cells"]
+				if len(message["codes"]) != len(cells):
+					raise ValueError("Delta with {} cells, but {} tiles".format(
+							len(cells), len(message["codes"])))
+				raw += COUNT.pack(len(cells))
+				raw += struct.pack("!{}I".format(len(cells)), *cells)
+				raw += bytes(message["codes"])
+		elif msg_id == M_ACK or msg_id == M_NACK:
+			check_range("State", message["state"], U8)
+			raw += ACK.pack(
+					uuid.UUID(message["server_uuid"]).bytes,
+					uuid.UUID(message["client_uuid"]).bytes,
+					message["state"])
+			raw += encode_string(message["message"])
+		else:
+			raise ValueError("Unknown message id {}".format(msg_id))
+		return raw
+
 	@staticmethod
-	def unpickle(raw):
+	def decode(raw):
 		"""
-		Unpickle the message into a dict.
+		Decode a message.
+		Raises ValueError, if it's not a message of this version.
 		"""
-		return Message(pickle.loads(raw))
+		try:
+			msg_id, version, timestamp = HEADER.unpack_from(raw, 0)
+			if version != VERSION:
+				raise ValueError("Unsupported protocol version {}".format(version))
+			d = {"id": msg_id, "timestamp": timestamp}
+			offset = HEADER.size
+
+			if msg_id == M_ANNOUNCE:
+				server, w, h, num, max_num = ANNOUNCE.unpack_from(raw, offset)
+				offset += ANNOUNCE.size
+				d["uuid"] = str(uuid.UUID(bytes=server))
+				d["boardsize"] = (w, h)
+				d["num_players"] = (num, max_num)
+				d["name"], offset = decode_string(raw, offset)
+			elif msg_id == M_JOINING:
+				server, client = JOINING.unpack_from(raw, offset)
+				offset += JOINING.size
+				d["server_uuid"] = str(uuid.UUID(bytes=server))
+				d["client_uuid"] = str(uuid.UUID(bytes=client))
+				d["name"], offset = decode_string(raw, offset)
+				d["nickname"], offset = decode_string(raw, offset)
+			elif msg_id == M_HEARTBEAT:
+				server, client = HEARTBEAT.unpack_from(raw, offset)
+				offset += HEARTBEAT.size
+				d["server_uuid"] = str(uuid.UUID(bytes=server))
+				d["client_uuid"] = str(uuid.UUID(bytes=client))
+			elif msg_id in (M_BOARD_SNAPSHOT, M_BOARD_DELTA, M_BOARD_RESYNC):
+				server, client, board, seq = BOARD.unpack_from(raw, offset)
+				offset += BOARD.size
+				d["server_uuid"] = str(uuid.UUID(bytes=server))
+				d["client_uuid"] = str(uuid.UUID(bytes=client))
+				d["board"] = board
+				d["seq"] = seq
+				if msg_id == M_BOARD_SNAPSHOT:
+					d["boardsize"] = BOARDSIZE.unpack_from(raw, offset)
+					offset += BOARDSIZE.size
+					size = d["boardsize"][0] * d["boardsize"][1]
+					if size > MAX_SNAPSHOT:
+						raise ValueError("Snapshot of a board too large: {}x{}".format(*d["boardsize"]))
+					tiles, offset = decode_blob(raw, offset)
+					# Never unpack more than the board takes (0 would mean no limit).
+					inflater = zlib.decompressobj()
+					try:
+						d["tiles"] = bytearray(inflater.decompress(tiles, max(size, 1)))
+					except zlib.error as e:
+						raise ValueError("Malformed snapshot: {}".format(e))
+					if len(d["tiles"]) != size or inflater.unconsumed_tail:
+						raise ValueError("Snapshot doesn't match the board size")
+				elif msg_id == M_BOARD_DELTA:
+					num, = COUNT.unpack_from(raw, offset)
+					offset += COUNT.size
+					# The count comes off the wire, check it before using it.
+					if num > MAX_SNAPSHOT:
+						raise ValueError("Delta of too many cells: {}".format(num))
+					if len(raw) - offset < 5 * num:
+						raise ValueError("Truncated delta")
+					cells = array(CELL, bytes(raw[offset:offset + 4 * num]))
+					if sys.byteorder == "little":
+						cells.byteswap()
+					d["cells"] = cells
+					offset += 4 * num
+					d["codes"] = bytearray(raw[offset:offset + num])
+			elif msg_id == M_ACK or msg_id == M_NACK:
+				server, client, state = ACK.unpack_from(raw, offset)
+				offset += ACK.size
+				d["server_uuid"] = str(uuid.UUID(bytes=server))
+				d["client_uuid"] = str(uuid.UUID(bytes=client))
+				d["state"] = state
+				d["message"], offset = decode_string(raw, offset)
+			else:
+				raise ValueError("Unknown message id {}".format(msg_id))
+		except struct.error as e:
+			raise ValueError("Malformed message: {}".format(e))
+		return Message(d)
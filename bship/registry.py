@@ -0,0 +1,106 @@
+import time
+
+import states as bst
+
+class PlayerEntry(object):
+	"""
+	A player in a room.
+	"""
+	__slots__ = ("uuid", "nickname", "state", "time")
+
+	def __init__(self, uuid, nickname, state):
+		self.uuid = uuid
+		self.nickname = nickname
+		self.state = state
+		# When the player was last heard from.
+		self.time = time.time()
+
+class PlayerRegistry():
+	"""
+	The players of a room, indexed by their UUID and nickname,
+	with the number of players in each state kept up to date,
+	so that joining and checking whether everyone's ready
+	don't depend on the number of players.
+	"""
+
+	def __init__(self):
+		self.by_uuid = {}
+		self.by_nickname = {}
+		# Players in the order they joined (the order of turns).
+		self.order = []
+		# Number of players in each state.
+		self.num_in_state = [0] * (bst.S_GAME_LAST + 1)
+
+	def __len__(self):
+		return len(self.order)
+
+	def __iter__(self):
+		return iter(self.order)
+
+	def __contains__(self, uuid):
+		return uuid in self.by_uuid
+
+	def get(self, uuid):
+		"""
+		Get a player by their UUID, or None.
+		"""
+		return self.by_uuid.get(uuid)
+
+	def collision(self, uuid, nickname):
+		"""
+		Check whether a player may join.
+		Returns "uuid" or "nickname", if either is taken, otherwise None.
+		"""
+		if uuid in self.by_uuid:
+			return "uuid"
+		if nickname in self.by_nickname:
+			return "nickname"
+		return None
+
+	def add(self, uuid, nickname, state):
+		"""
+		Add a player.
+		"""
+		if self.collision(uuid, nickname) is not None:
+			raise ValueError("Player {} ({}) is already in the room".format(uuid, nickname))
+		player = PlayerEntry(uuid, nickname, state)
+		self.by_uuid[uuid] = player
+		self.by_nickname[nickname] = player
+		self.order.append(player)
+		self.num_in_state[state] += 1
+		return player
+
+	def remove(self, uuid):
+		"""
+		Remove a player.
+		Returns the index they had in the order of turns.
+		"""
+		player = self.by_uuid.pop(uuid)
+		del self.by_nickname[player.nickname]
+		index = self.order.index(player)
+		del self.order[index]
+		self.num_in_state[player.state] -= 1
+		return index
+
+	def set_state(self, uuid, state):
+		"""
+		Move a player to another state.
+		"""
+		player = self.by_uuid[uuid]
+		self.num_in_state[player.state] -= 1
+		self.num_in_state[state] += 1
+		player.state = state
+		player.time = time.time()
+		return player
+
+	def count(self, state):
+		"""
+		Get the number of players in a state.
+		"""
+		return self.num_in_state[state]
+
+	def all_in(self, state):
+		"""
+		Check whether every player is in the state.
+		"""
+		return len(self.order) > 0 and self.num_in_state[state] == len(self.order)
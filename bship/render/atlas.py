@@ -0,0 +1,113 @@
+import pygame
+
+import board.tile as bt
+import board.ship as bs
+
+class TileAtlas():
+	"""
+	Tiles of a single size, pre-rendered once (one surface per tile code).
+	Each tile carries the grid lines along its top and left edges, so
+	any part of a board can be drawn without a grid overlay the size of
+	the board; only the right and bottom edges are drawn separately.
+	"""
+
+	C_VOID = (0, 0, 0, 0)
+	C_WATER = (0, 25, 51, 0)
+	C_OCCUPIED = (0, 51, 102, 0)
+	C_SHIP = (96, 96, 96, 0)
+	C_BOMBED = (102, 0, 0, 0)
+	C_GRID = (0, 51, 102, 0)
+
+	BACKGROUND = {
+			bt.Tile.T_VOID: C_VOID,
+			bt.Tile.T_WATER: C_WATER,
+			bt.Tile.T_OCCUPIED: C_OCCUPIED,
+			bt.Tile.T_BOMBED: C_BOMBED
+			}
+
+	# Atlases by tile size.
+	_atlases = {}
+
+	def __init__(self, size):
+		self.size = size
+		# Tile surfaces by tile code (a byte).
+		self.tiles = {}
+
+		# Pre-render every tile that can appear on a board.
+		for tile in TileAtlas.BACKGROUND:
+			self.tile(bt.Tile(tile).code())
+		for index in bs.Ship.FLEET:
+			self.tile(bs.Ship(index).tile().code())
+
+	@staticmethod
+	def get(size):
+		"""
+		Get the shared atlas for the given tile size.
+		"""
+		atlas = TileAtlas._atlases.get(size)
+		if atlas is None:
+			atlas = TileAtlas(size)
+			TileAtlas._atlases[size] = atlas
+		return atlas
+
+	@staticmethod
+	def draw_tile(surface, tile, pos, size):
+		"""
+		Draw a single tile.
+		"""
+		if tile.tile in TileAtlas.BACKGROUND:
+			color = TileAtlas.BACKGROUND[tile.tile]
+		else:
+			color = TileAtlas.C_SHIP
+		rect = (pos[0], pos[1], size, size)
+		pygame.draw.rect(surface, color, rect, 0)
+
+	@staticmethod
+	def draw_grid(surface, color, pos, size, w, h):
+		"""
+		Draw the grid of a w x h board with the specified
+		position, size (in pixels), and color.
+		"""
+		ax, ay = pos
+		sx, sy = size
+		bx = ax + sx
+		by = ay + sy
+
+		tsx = sx // w
+		tsy = sy // h
+
+		# Draw vertical lines.
+		for x in range(ax, bx, tsx):
+			pygame.draw.aaline(
+					surface, color, 
+					(x, ay), (x, by), 1)
+		# Draw horizontal lines.
+		for y in range(ay, by, tsy):
+			pygame.draw.aaline(
+					surface, color, 
+					(ax, y), (bx, y), 1)
+		# Draw a rect around it.
+		pygame.draw.rect(surface, color, (ax, ay, sx, sy), 1)
+
+	def tile(self, code):
+		"""
+		Get the surface of a tile by its code.
+		"""
+		surface = self.tiles.get(code)
+		if surface is None:
+			size = self.size
+			surface = pygame.Surface((size, size))
+			TileAtlas.draw_tile(surface, bt.Tile.from_code(code), (0, 0), size)
+			pygame.draw.line(surface, TileAtlas.C_GRID, (0, 0), (size - 1, 0))
+			pygame.draw.line(surface, TileAtlas.C_GRID, (0, 0), (0, size - 1))
+			self.tiles[code] = surface
+		return surface
+
+	def draw_edges(self, surface, pos, w, h):
+		"""
+		Draw the right and bottom edges of the grid of a w x h board at pos.
+		"""
+		right = pos[0] + w * self.size - 1
+		bottom = pos[1] + h * self.size - 1
+		pygame.draw.line(surface, TileAtlas.C_GRID, (right, pos[1]), (right, bottom))
+		pygame.draw.line(surface, TileAtlas.C_GRID, (pos[0], bottom), (right, bottom))
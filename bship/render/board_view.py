@@ -0,0 +1,208 @@
+import pygame
+
+import board.ship as bs
+from atlas import TileAtlas
+from camera import Camera
+
+class BoardView():
+	"""
+	Draws a game board with pygame.
+	The board itself only keeps the game state, and knows nothing
+	about pixels, surfaces or colors.
+
+	The board is seen through a camera (a Camera), and only the tiles
+	in sight are drawn, so the cost of a frame depends on the size of
+	the viewport rather than the size of the board. Tile coordinates
+	cover both grids: ours from x = 0, theirs from x = w + 1.
+	"""
+
+	# Size of a tile in pixels (at the default zoom).
+	TILE_SIZE = 32
+
+	C_CURSOR = (255, 255, 255, 0)
+	C_CROSSHAIR = (255, 20, 0, 0)
+
+	def __init__(self, board, camera = None):
+		"""
+		Without a camera, the whole board is drawn at TILE_SIZE.
+		"""
+		self.board = board
+		if camera is None:
+			camera = Camera.covering(2 * board.w + 1, board.h, BoardView.TILE_SIZE)
+		self.camera = camera
+		self.atlas = TileAtlas.get(camera.tile_size)
+		# The tiles in sight, kept between frames and patched tile by tile.
+		self.layer = None
+		# The layer with the cursor or crosshair drawn on top.
+		self.frame = None
+		# Areas of the frame covered by the overlay in the last frame.
+		self.overlay_rects = []
+
+	def to_tile(self, pos):
+		"""
+		Translate a pixel position in the view into tile coordinates.
+		"""
+		return self.camera.to_world(pos)
+
+	def world_size(self):
+		"""
+		Get the size of both grids (with the gap between them) in tiles.
+		"""
+		return (2 * self.board.w + 1, self.board.h)
+
+	def pan(self, dx, dy):
+		"""
+		Move the view by the given number of pixels.
+		"""
+		self.camera.pan(dx, dy)
+		self.camera.clamp(*self.world_size())
+
+	def zoom(self, factor, pos):
+		"""
+		Zoom in (factor > 1) or out around a pixel position in the view.
+		"""
+		self.camera.zoom(factor, pos)
+		self.camera.clamp(*self.world_size())
+
+	def render_cell(self, surface, tile, pos, x, y):
+		"""
+		Render a single board tile, with the grid lines over it.
+		"""
+		tsize = self.camera.tile_size
+		tpos = (pos[0] + x * tsize, pos[1] + y * tsize)
+		surface.blit(self.atlas.tile(tile.code()), tpos)
+		if x == self.board.w - 1 or y == self.board.h - 1:
+			self.atlas.draw_edges(surface, pos, self.board.w, self.board.h)
+
+	def render_tiles(self, surface, tiles, pos):
+		"""
+		Render the board tiles in sight (on the surface), with the grid
+		drawn at pos.
+		"""
+		w = self.board.w
+		h = self.board.h
+		tsize = self.camera.tile_size
+		atlas = self.atlas
+
+		# Only the tiles on the surface.
+		clip = surface.get_clip()
+		x0 = max(0, (clip.left - pos[0]) // tsize)
+		y0 = max(0, (clip.top - pos[1]) // tsize)
+		x1 = min(w, (clip.right - pos[0] + tsize - 1) // tsize)
+		y1 = min(h, (clip.bottom - pos[1] + tsize - 1) // tsize)
+
+		# Render tiles in a single batch.
+		blits = []
+		for y in range(y0, y1):
+			row = y * w
+			ty = pos[1] + y * tsize
+			for x in range(x0, x1):
+				blits.append((atlas.tile(tiles[row + x]), (pos[0] + x * tsize, ty)))
+		surface.blits(blits, False)
+		atlas.draw_edges(surface, pos, w, h)
+
+	def ship_rect(self, ship):
+		"""
+		Get the rectangle (in pixels, in the view) covered by a ship.
+		"""
+		if not ship.is_valid():
+			return None
+
+		tsize = self.camera.tile_size
+		x, y = self.camera.to_screen(ship.pos[0], ship.pos[1])
+		if ship.orientation == bs.Ship.O_HORIZONTAL:
+			return (x, y, ship.size * tsize, tsize)
+		return (x, y, tsize, ship.size * tsize)
+
+	def update_cursor(self, player, pos):
+		"""
+		Update cursor position from the mouse position (in pixels).
+		"""
+		self.board.update_cursor(player, self.to_tile(pos))
+
+	def render_cursor(self, surface, player):
+		"""
+		Render a highlight rectangle around the imaginary ship to be placed.
+		"""
+		rect = self.ship_rect(player.current_ship())
+		pygame.draw.rect(
+				surface, BoardView.C_CURSOR,
+				rect, 1)
+		self.overlay_rects.append(rect)
+
+	def update_crosshair(self, pos):
+		"""
+		Update crosshair position from the mouse position (in pixels).
+		"""
+		self.board.update_crosshair(self.to_tile(pos))
+
+	def render_crosshair(self, surface):
+		"""
+		Render a rectangle around the tile to bomb.
+		"""
+		cur_pos = self.board.cur_pos
+		if cur_pos != None:
+			tsize = self.camera.tile_size
+			x, y = self.camera.to_screen(cur_pos[0], cur_pos[1])
+			rect = (x, y, tsize, tsize)
+			pygame.draw.rect(
+					surface, BoardView.C_CROSSHAIR,
+					rect, 1)
+			self.overlay_rects.append(rect)
+
+	def their_pos(self):
+		"""
+		Get the position of foreign waters in the view.
+		"""
+		return self.camera.to_screen(self.board.w + 1, 0)
+
+	def render(self):
+		"""
+		Render the gameboard, which consists
+		of two grids (ours, theirs).
+		Only the tiles changed since the last frame are redrawn,
+		unless the camera moved.
+		The returned surface is reused between frames, the cursor
+		and crosshair may be drawn on it until the next call.
+		"""
+		board = self.board
+		camera = self.camera
+		tsize = camera.tile_size
+		our_pos = camera.to_screen(0, 0)
+		their_pos = self.their_pos()
+
+		# Draw what's in sight in full the first time, and whenever the camera moves.
+		if camera.take_moved() or self.layer is None:
+			if self.layer is None or self.layer.get_size() != (camera.w, camera.h):
+				self.layer = pygame.Surface((camera.w, camera.h))
+				self.frame = self.layer.copy()
+			self.atlas = TileAtlas.get(tsize)
+			self.layer.fill(TileAtlas.C_VOID)
+			self.render_tiles(self.layer, board.our_tiles, our_pos)
+			self.render_tiles(self.layer, board.their_tiles, their_pos)
+			board.take_dirty()
+			self.frame.blit(self.layer, (0, 0))
+			self.overlay_rects = []
+			return self.frame
+
+		# Wipe the overlay of the last frame.
+		for rect in self.overlay_rects:
+			self.frame.blit(self.layer, rect[:2], rect)
+		self.overlay_rects = []
+
+		# Patch the changed tiles in sight.
+		dirty_ours, dirty_theirs = board.take_dirty()
+		for get_tile, pos, dirty in (
+				(board.get_our_tile, our_pos, dirty_ours),
+				(board.get_their_tile, their_pos, dirty_theirs)):
+			x0, y0, x1, y1 = camera.visible(pos, board.w, board.h)
+			for cell in dirty:
+				x = cell % board.w
+				y = cell // board.w
+				if x < x0 or x >= x1 or y < y0 or y >= y1:
+					continue
+				self.render_cell(self.layer, get_tile(x, y), pos, x, y)
+				rect = (pos[0] + x * tsize, pos[1] + y * tsize, tsize, tsize)
+				self.frame.blit(self.layer, rect[:2], rect)
+
+		return self.frame
@@ -0,0 +1,104 @@
+class Camera():
+	"""
+	The part of the board seen through a viewport, and its zoom.
+
+	Positions on the board are in tiles (the world), positions in the
+	viewport in pixels (the screen). The camera's position is the world
+	position of the viewport's top left corner, in pixels at the
+	current tile size.
+	"""
+
+	# Tile sizes (in pixels) the camera can zoom between.
+	MIN_TILE = 4
+	MAX_TILE = 64
+
+	def __init__(self, w, h, tile_size = 32):
+		"""
+		w and h are the size of the viewport in pixels.
+		"""
+		self.w = w
+		self.h = h
+		self.tile_size = tile_size
+		self.x = 0
+		self.y = 0
+		# Set when the view changed, and has to be drawn anew.
+		self.moved = True
+
+	@staticmethod
+	def covering(cols, rows, tile_size = 32):
+		"""
+		Get a camera, whose viewport covers a whole world of cols x rows tiles.
+		"""
+		return Camera(cols * tile_size + 1, rows * tile_size + 1, tile_size)
+
+	def take_moved(self):
+		"""
+		Check whether the view changed since the last call.
+		"""
+		moved = self.moved
+		self.moved = False
+		return moved
+
+	def to_world(self, pos):
+		"""
+		Translate a position in the viewport into tile coordinates.
+		"""
+		tsize = self.tile_size
+		return ((pos[0] + self.x) // tsize, (pos[1] + self.y) // tsize)
+
+	def to_screen(self, tx, ty):
+		"""
+		Translate tile coordinates into the position of the tile in the viewport.
+		"""
+		tsize = self.tile_size
+		return (tx * tsize - self.x, ty * tsize - self.y)
+
+	def visible(self, pos, cols, rows):
+		"""
+		Get the tiles of a cols x rows grid drawn at pos (in the viewport),
+		which are in sight, as (x0, y0, x1, y1), the last two exclusive.
+		"""
+		tsize = self.tile_size
+		x0 = max(0, -pos[0] // tsize)
+		y0 = max(0, -pos[1] // tsize)
+		x1 = min(cols, (self.w - pos[0] + tsize - 1) // tsize)
+		y1 = min(rows, (self.h - pos[1] + tsize - 1) // tsize)
+		return (x0, y0, max(x0, x1), max(y0, y1))
+
+	def pan(self, dx, dy):
+		"""
+		Move the view by the given number of pixels.
+		"""
+		if dx or dy:
+			self.x += dx
+			self.y += dy
+			self.moved = True
+
+	def zoom(self, factor, pos):
+		"""
+		Scale the tiles by factor, keeping the point under pos
+		(in the viewport) where it is.
+		"""
+		old = self.tile_size
+		size = int(round(old * factor))
+		if size == old:
+			size = old + (1 if factor > 1 else -1)
+		size = max(Camera.MIN_TILE, min(Camera.MAX_TILE, size))
+		if size == old:
+			return
+		self.x = (pos[0] + self.x) * size // old - pos[0]
+		self.y = (pos[1] + self.y) * size // old - pos[1]
+		self.tile_size = size
+		self.moved = True
+
+	def clamp(self, cols, rows):
+		"""
+		Keep the view over a world of cols x rows tiles.
+		"""
+		tsize = self.tile_size
+		x = max(0, min(self.x, cols * tsize + 1 - self.w))
+		y = max(0, min(self.y, rows * tsize + 1 - self.h))
+		if (x, y) != (self.x, self.y):
+			self.x = x
+			self.y = y
+			self.moved = True
@@ -0,0 +1,47 @@
+import pygame
+
+class StatsOverlay():
+	"""
+	Draws the frame stage times (a framestats.FrameStats) over the screen.
+	The text is only laid out again every REFRESH frames.
+	"""
+
+	REFRESH = 15
+	FONT_SIZE = 16
+
+	C_TEXT = (255, 255, 0)
+	C_BACK = (0, 0, 0)
+
+	def __init__(self, stats):
+		self.stats = stats
+		self.font = None
+		self.surface = None
+		self.frames_left = 0
+
+	def layout(self):
+		"""
+		Lay the summary out on a surface of its own.
+		"""
+		if self.font is None:
+			self.font = pygame.font.Font(None, StatsOverlay.FONT_SIZE)
+		lines = [self.font.render(line, True, StatsOverlay.C_TEXT) for line in self.stats.lines()]
+		w = max(line.get_width() for line in lines) + 8
+		h = sum(line.get_height() for line in lines) + 8
+		surface = pygame.Surface((w, h))
+		surface.fill(StatsOverlay.C_BACK)
+		y = 4
+		for line in lines:
+			surface.blit(line, (4, y))
+			y += line.get_height()
+		self.surface = surface
+
+	def render(self, surface, pos = (0, 0)):
+		"""
+		Draw the overlay on a surface.
+		Returns the rectangle it covers.
+		"""
+		if self.frames_left <= 0 or self.surface is None:
+			self.layout()
+			self.frames_left = StatsOverlay.REFRESH
+		self.frames_left -= 1
+		return surface.blit(self.surface, pos)
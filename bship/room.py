@@ -0,0 +1,258 @@
+import logging
+
+import protocol as bp
+import states as bst
+import registry as brg
+import sync as bsy
+
+class Room():
+	"""
+	A hosted game: its players, and whose turn it is.
+	Used both by a client hosting a game, and by the headless server.
+
+	With a scheduler, players who stop sending heartbeats are evicted,
+	and players who don't take their turn in time are skipped.
+	"""
+
+	# Seconds without a heartbeat, after which a player is evicted.
+	HEARTBEAT_TIMEOUT = 5.0
+	# Seconds a player has for their turn.
+	TURN_TIMEOUT = 60.0
+
+	def __init__(self, uuid, name, boardsize, num_players, outbox, scheduler = None, journal = None, trace = None):
+		self.log = logging.getLogger("BShip.Room")
+
+		self.uuid = uuid
+		self.name = name
+		self.boardsize = boardsize
+		# Number of players, and the maximum.
+		self.num_players = num_players
+		# Messages are posted here.
+		self.outbox = outbox
+		# Deadlines of the players' heartbeats and turns (may be shared between rooms).
+		self.scheduler = scheduler
+
+		# The players, by UUID and nickname.
+		self.players = brg.PlayerRegistry()
+		# Index of the player, whose turn was last.
+		self.num_last_player = 0
+		# Number of turns so far.
+		self.num_turns = 0
+
+		# Boards synchronised to the players, by their number.
+		self.publishers = {}
+
+		# Joins and turns are recorded in the journal (a journal.JournalWriter), if given.
+		self.journal = journal
+		if journal is not None:
+			self.game_id = journal.new_game()
+		# Their events are traced (in a logs.GameTrace), if given and the room is sampled.
+		self.trace = trace
+		self.traced = trace is not None and trace.sampled(uuid)
+
+	def announce(self):
+		"""
+		Announce the room in the lobby.
+		"""
+		msg_dict = {
+				"id": bp.M_ANNOUNCE,
+				"uuid": self.uuid,
+				"boardsize": self.boardsize,
+				"num_players": self.num_players,
+				"name": self.name
+				}
+		self.outbox.post(bp.LOBBY_EXCHANGE, "", msg_dict)
+
+	def ack(self, uuid, message, state):
+		"""
+		Acknowledge a player's request.
+		"""
+		msg_dict = {
+				"id": bp.M_ACK,
+				"server_uuid": self.uuid,
+				"client_uuid": uuid,
+				"message": message,
+				"state": state
+				}
+		self.outbox.post("", uuid, msg_dict)
+
+	def nack(self, uuid, message, state):
+		"""
+		Turn down a player's request.
+		"""
+		msg_dict = {
+				"id": bp.M_NACK,
+				"server_uuid": self.uuid,
+				"client_uuid": uuid,
+				"message": message,
+				"state": state
+				}
+		self.outbox.post("", uuid, msg_dict)
+
+	def publish_board(self, board, tiles, w, h, dirty = None):
+		"""
+		Keep the players' copies of a grid of tiles (e.g. of a GameBoard)
+		up to date, as the given board.
+		dirty, if given, gets the cells changed since the grid was last
+		drawn (see sync.BoardPublisher).
+		"""
+		self.publishers[board] = bsy.BoardPublisher(self.uuid, board, tiles, w, h, dirty)
+
+	def send_snapshot(self, uuid, board):
+		"""
+		Send a player the whole board.
+		"""
+		publisher = self.publishers[board]
+		self.outbox.post("", uuid, publisher.snapshot(uuid))
+
+	def sync_boards(self):
+		"""
+		Send the players the changes to the published boards.
+		"""
+		for publisher in self.publishers.values():
+			if publisher.update():
+				for p in self.players:
+					if p.uuid != self.uuid:
+						self.outbox.post("", p.uuid, publisher.delta(p.uuid))
+
+	def add_player(self, uuid, nickname):
+		"""
+		Add a player, who's about to place their ships.
+		"""
+		self.log.info("Adding player {} ({})".format(uuid, nickname))
+		self.players.add(uuid, nickname, bst.S_GAME_PLACING)
+		self.heard_from(uuid)
+		if self.journal is not None:
+			self.journal.join(self.game_id, len(self.players) - 1, uuid,
+					self.boardsize[0], self.boardsize[1], self.num_players[1])
+		if self.traced:
+			self.trace.event(self.uuid, "join", player=uuid, seat=len(self.players) - 1)
+
+	def heard_from(self, uuid):
+		"""
+		A player is still there, push their heartbeat deadline back.
+		"""
+		# The host doesn't need to send itself heartbeats.
+		if self.scheduler is not None and uuid != self.uuid:
+			self.scheduler.schedule(("heartbeat", self.uuid, uuid),
+					Room.HEARTBEAT_TIMEOUT, self.evict, uuid)
+
+	def evict(self, uuid):
+		"""
+		Remove a player, who's timed out.
+		"""
+		if uuid not in self.players:
+			return
+		self.log.info("Player {} timed out".format(uuid))
+		index = self.players.remove(uuid)
+		self.num_players = (self.num_players[0] - 1, self.num_players[1])
+		if index < self.num_last_player:
+			self.num_last_player -= 1
+		if self.scheduler is not None:
+			self.scheduler.cancel(("heartbeat", self.uuid, uuid))
+			self.scheduler.cancel(("turn", self.uuid, uuid))
+		self.nack(uuid, "Server: Timed out", bst.S_LOBBY)
+		if self.traced:
+			self.trace.event(self.uuid, "evict", player=uuid)
+		# The rest may have been waiting for them.
+		self.next_turn()
+
+	def join(self, uuid, nickname):
+		"""
+		Handle a request to join the room.
+		"""
+		if self.num_players[0] >= self.num_players[1]:
+			self.nack(uuid, "Server: The game is full", bst.S_LOBBY)
+			return
+		collision = self.players.collision(uuid, nickname)
+		if collision is not None:
+			if collision == "uuid":
+				self.log.error("UUID collision ({})".format(uuid))
+			else:
+				self.log.error("Nickname collision ({})".format(nickname))
+			# Notify the client as well.
+			self.nack(uuid, "Server: Nickname collision", bst.S_LOBBY)
+			return
+		self.num_players = (self.num_players[0] + 1, self.num_players[1])
+		self.add_player(uuid, nickname)
+		self.ack(uuid, "Server: Welcome", bst.S_GAME)
+		# Deltas only follow a snapshot.
+		for board in self.publishers:
+			self.send_snapshot(uuid, board)
+
+	def player_waiting(self, uuid):
+		"""
+		A player is waiting for their turn.
+		Once everyone is, it's the next player's turn.
+		"""
+		if uuid not in self.players:
+			self.log.error("Unknown player {}".format(uuid))
+			return
+		self.players.set_state(uuid, bst.S_GAME_WAITING)
+		self.heard_from(uuid)
+		if self.scheduler is not None:
+			self.scheduler.cancel(("turn", self.uuid, uuid))
+		self.next_turn()
+
+	def turn_expired(self, uuid):
+		"""
+		A player didn't take their turn in time, skip them.
+		"""
+		if uuid not in self.players:
+			return
+		self.log.info("Player {} missed their turn".format(uuid))
+		self.players.set_state(uuid, bst.S_GAME_WAITING)
+		self.ack(uuid, "Server: Turn timed out", bst.S_GAME_WAITING)
+		if self.traced:
+			self.trace.event(self.uuid, "turn_expired", player=uuid)
+		self.next_turn()
+
+	def next_turn(self):
+		"""
+		Once all players are waiting for their turn, it's the next player's turn.
+		"""
+		if self.players.all_in(bst.S_GAME_WAITING):
+			if self.num_last_player >= len(self.players):
+				self.num_last_player = 0
+			p = self.players.order[self.num_last_player]
+			self.players.set_state(p.uuid, bst.S_GAME_SHOOTING)
+			self.log.info("Player {}'s turn".format(p.uuid))
+			self.ack(p.uuid, "Server: Your turn", p.state)
+			if self.journal is not None:
+				self.journal.turn(self.game_id, self.num_last_player, self.num_turns)
+			if self.traced:
+				self.trace.event(self.uuid, "turn", player=p.uuid, turn=self.num_turns)
+			self.num_turns += 1
+			# The host isn't timed out by its own room.
+			if self.scheduler is not None and p.uuid != self.uuid:
+				self.scheduler.schedule(("turn", self.uuid, p.uuid),
+						Room.TURN_TIMEOUT, self.turn_expired, p.uuid)
+
+			# Cycle through the players.
+			self.num_last_player += 1
+
+	def handle(self, msg):
+		"""
+		Handle a message sent to the room.
+		Returns False, if it's not a message for the host.
+		"""
+		# Someone requests to join our server?
+		if msg.id == bp.M_JOINING:
+			self.join(msg.client_uuid, msg.nickname)
+			return True
+		# There's one more player waiting for their turn.
+		# (Acknowledges carry the sender in server_uuid.)
+		elif msg.id == bp.M_ACK and msg.state == bst.S_GAME_WAITING:
+			self.player_waiting(msg.server_uuid)
+			return True
+		# A player's still there.
+		elif msg.id == bp.M_HEARTBEAT:
+			if msg.client_uuid in self.players:
+				self.heard_from(msg.client_uuid)
+			return True
+		# A player missed some deltas of a board.
+		elif msg.id == bp.M_BOARD_RESYNC:
+			if msg.server_uuid in self.players and msg.board in self.publishers:
+				self.send_snapshot(msg.server_uuid, msg.board)
+			return True
+		return False
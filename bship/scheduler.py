@@ -0,0 +1,75 @@
+import math
+import time
+
+class Scheduler():
+	"""
+	Deadlines (join requests, player heartbeats, turns) by key,
+	kept on a timing wheel: a slot per RESOLUTION seconds, holding
+	the keys due in it. Scheduling, rescheduling and cancelling a key
+	take constant time, and a tick only looks at the slots that have
+	passed since the last one, however many keys are tracked.
+	Callbacks run up to RESOLUTION seconds late.
+	"""
+
+	RESOLUTION = 0.1
+
+	def __init__(self, resolution = RESOLUTION):
+		self.resolution = resolution
+		# Keys due in each slot, with their (callback, args).
+		self.slots = {}
+		# The slot of each key.
+		self.slot_of = {}
+		# The first slot, which hasn't passed yet.
+		self.current = int(math.floor(time.time() / resolution))
+
+	def __len__(self):
+		return len(self.slot_of)
+
+	def __contains__(self, key):
+		return key in self.slot_of
+
+	def schedule(self, key, delay, callback, *args):
+		"""
+		Call callback(*args) in delay seconds, unless the key is
+		scheduled again or cancelled before that.
+		"""
+		self.cancel(key)
+		slot = int(math.ceil((time.time() + delay) / self.resolution))
+		if slot < self.current:
+			slot = self.current
+		self.slots.setdefault(slot, {})[key] = (callback, args)
+		self.slot_of[key] = slot
+
+	def cancel(self, key):
+		"""
+		Cancel the deadline of a key, if there is one.
+		"""
+		slot = self.slot_of.pop(key, None)
+		if slot is not None:
+			keys = self.slots.get(slot)
+			if keys is not None:
+				keys.pop(key, None)
+
+	def tick(self, now = None):
+		"""
+		Run the callbacks whose deadline has passed.
+		Returns the number of callbacks run.
+		"""
+		if now is None:
+			now = time.time()
+		last = int(math.floor(now / self.resolution))
+		num_run = 0
+		while self.current <= last:
+			slot = self.current
+			self.current += 1
+			keys = self.slots.pop(slot, None)
+			if not keys:
+				continue
+			for key, (callback, args) in keys.items():
+				# Callbacks may have rescheduled or cancelled it since.
+				if self.slot_of.get(key) != slot:
+					continue
+				del self.slot_of[key]
+				callback(*args)
+				num_run += 1
+		return num_run
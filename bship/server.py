@@ -0,0 +1,230 @@
+#!/usr/bin/python
+import uuid, time
+import logging
+import threading
+import argparse
+import multiprocessing
+from collections import OrderedDict
+
+import protocol as bp
+import outbox as bo
+import transport as btr
+import room as brm
+import scheduler as bsc
+import journal as bj
+import logs as blg
+from lazy import lazy
+
+# Only needed once connecting to RabbitMQ.
+pika = lazy("pika")
+
+def init_logging(name):
+	"""
+	Initialize logging to stdout (written on a thread of its own).
+	Returns the logger and its writer.
+	"""
+	return blg.init_queued("BShip", logging.INFO,
+			fmt="[%(levelname)s: " + name + " %(name)s]\t%(message)s")
+
+class Server():
+	"""
+	A headless game server, which hosts many games (rooms) at once.
+	All the rooms share one message queue connection: each room has
+	its own queue on the same channel, messages are dispatched to the
+	rooms by their routing key, and replies go out through one outbox.
+	"""
+
+	MSG_TIMEOUT = 3
+	# How often the rooms are announced in the lobby (in seconds).
+	ANNOUNCE_PERIOD = 1.0
+	# How often the deadlines are checked (in seconds).
+	TICK = 0.1
+
+	def __init__(self, journal = None, trace = None):
+		"""
+		The games are recorded in the journal (a journal.JournalWriter),
+		and their events in the trace (a logs.GameTrace), if given.
+		"""
+		self.log = logging.getLogger("BShip.Server")
+		self.online = False
+
+		# Rooms by their UUID (which is also the name of their queue).
+		self.rooms = OrderedDict()
+		# Messages to publish, picked up by the transport thread.
+		self.outbox = bo.Outbox()
+		self.transport = None
+		# Deadlines of the players in every room.
+		self.scheduler = bsc.Scheduler()
+		# Guards the rooms and the scheduler, which the message
+		# callbacks change on the transport thread.
+		self.lock = threading.Lock()
+		# Number of messages handled by the rooms.
+		self.num_handled = 0
+		self.journal = journal
+		self.trace = trace
+
+	def add_room(self, name, boardsize, max_players):
+		"""
+		Add a room. Rooms are added before connecting,
+		since their queues are declared on connecting.
+		"""
+		room = brm.Room(str(uuid.uuid4()), name, boardsize, (0, max_players),
+				self.outbox, self.scheduler, self.journal, self.trace)
+		self.rooms[room.uuid] = room
+		return room
+
+	def init_mq(self, connection = None):
+		"""
+		Initialize the message queue connection, which runs on its own thread.
+		A connection to another broker (e.g. a LocalBroker) may be passed in.
+		"""
+		if connection is None:
+			self.log.info("Connecting to RabbitMQ")
+			connect = lambda: pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+		else:
+			connect = lambda: connection
+		self.transport = btr.Transport(connect, self.init_queues, self.outbox)
+		self.transport.start()
+
+	def init_queues(self, channel):
+		"""
+		Declare the lobby and a queue for each room (on the transport thread).
+		"""
+		channel.exchange_declare(exchange=bp.LOBBY_EXCHANGE, exchange_type="fanout")
+		for room_uuid in self.rooms:
+			channel.queue_declare(queue=room_uuid, auto_delete=True)
+			channel.basic_consume(self.mq_room_cb, queue=room_uuid, no_ack=True)
+
+	def mq_room_cb(self, ch, method, properties, body):
+		"""
+		Handle room message queue events, for whichever room they're sent to.
+		"""
+		try:
+			room = self.rooms.get(method.routing_key)
+			if room is None:
+				return
+			msg = bp.Message.decode(body)
+
+			# Skip stale messages.
+			if time.time() - msg.timestamp < Server.MSG_TIMEOUT:
+				with self.lock:
+					if room.handle(msg):
+						self.num_handled += 1
+		except ValueError:
+			# Ignore messages, which can't be decoded
+			# (e.g. from incompatible clients).
+			pass
+		except Exception as e:
+			self.log.exception(e)
+
+	def announce(self):
+		"""
+		Announce every room in the lobby.
+		"""
+		with self.lock:
+			for room in self.rooms.values():
+				room.announce()
+
+	def tick(self):
+		"""
+		Evict the players, who timed out, skip the missed turns,
+		and send the players the changes to the rooms' boards.
+		"""
+		with self.lock:
+			num_due = self.scheduler.tick()
+			for room in self.rooms.values():
+				room.sync_boards()
+			return num_due
+
+	def serve(self, duration = None):
+		"""
+		Announce the rooms and check the deadlines until stopped
+		(or for duration seconds), while the transport thread
+		handles the messages.
+		"""
+		self.log.info("Hosting {} rooms".format(len(self.rooms)))
+		self.online = True
+		started = time.time()
+		announced = 0
+		try:
+			while self.online:
+				now = time.time()
+				if now - announced >= Server.ANNOUNCE_PERIOD:
+					self.announce()
+					announced = now
+				self.tick()
+				if duration is not None and now - started >= duration:
+					break
+				time.sleep(Server.TICK)
+		finally:
+			self.online = False
+			if self.transport is not None:
+				self.transport.stop()
+			if self.journal is not None:
+				self.journal.close()
+			if self.trace is not None:
+				self.trace.close()
+
+	def stop(self):
+		"""
+		Stop serving.
+		"""
+		self.online = False
+
+def run_worker(index, room_numbers, args):
+	"""
+	Host a share of the rooms in a worker process, over its own connection.
+	"""
+	log, writer = init_logging("Worker {}".format(index))
+	journal = None
+	if args.journal is not None:
+		# A journal per worker, since they can't share one.
+		journal = bj.JournalWriter("{}.{}".format(args.journal, index))
+	trace = None
+	if args.trace is not None:
+		trace = blg.GameTrace("{}.{}".format(args.trace, index), args.trace_rate)
+	server = Server(journal, trace)
+	for i in room_numbers:
+		server.add_room("{} {}".format(args.name, i + 1), (args.width, args.height), args.players)
+	try:
+		server.init_mq()
+		server.serve()
+	except KeyboardInterrupt:
+		server.stop()
+	finally:
+		writer.stop()
+
+def main():
+	"""
+	Host the rooms, sharded across worker processes.
+	"""
+	parser = argparse.ArgumentParser(description="Headless battleship server.")
+	parser.add_argument("--rooms", type=int, default=1, help="number of games to host")
+	parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+			help="number of worker processes (default: one per core)")
+	parser.add_argument("--name", default="Game", help="name of the games")
+	parser.add_argument("--width", type=int, default=10)
+	parser.add_argument("--height", type=int, default=10)
+	parser.add_argument("--players", type=int, default=2, help="players per game")
+	parser.add_argument("--journal", help="record the games in PATH.<worker>", metavar="PATH")
+	parser.add_argument("--trace", help="trace the game events in PATH.<worker>", metavar="PATH")
+	parser.add_argument("--trace-rate", type=float, default=1.0,
+			help="share of the rooms to trace (default: all of them)")
+	args = parser.parse_args()
+
+	num_workers = max(1, min(args.workers, args.rooms))
+	workers = []
+	for index in range(num_workers):
+		room_numbers = range(index, args.rooms, num_workers)
+		worker = multiprocessing.Process(target=run_worker, args=(index, room_numbers, args))
+		worker.start()
+		workers.append(worker)
+	try:
+		for worker in workers:
+			worker.join()
+	except KeyboardInterrupt:
+		for worker in workers:
+			worker.join()
+
+if __name__ == '__main__':
+	main()
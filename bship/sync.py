@@ -0,0 +1,164 @@
+import protocol as bp
+
+# Boards, as seen by their sender: its own waters, and the waters of its opponents.
+B_OURS = 0
+B_THEIRS = 1
+
+class BoardPublisher():
+	"""
+	The sending end of a board's synchronisation.
+	Recipients get a full snapshot when they join (or ask for one),
+	and otherwise numbered deltas of the cells changed since.
+	"""
+
+	def __init__(self, sender, board, tiles, w, h, dirty = None):
+		"""
+		tiles is the live grid of tile codes (row by row), e.g. a
+		GameBoard's our_tiles or their_tiles.
+		dirty, if given, gets the cells of the grid changed since it was
+		last drawn (e.g. a GameBoard's dirty_theirs), so that only those
+		are looked at; the grid then has to be synchronised before
+		it's drawn.
+		"""
+		self.sender = sender
+		self.board = board
+		self.tiles = tiles
+		self.dirty = dirty
+		self.w = w
+		self.h = h
+		# The grid as of the last snapshot or delta, and its sequence number.
+		self.sent = bytearray(tiles)
+		self.seq = 0
+		# The last delta (cells and their tiles), or None if nothing has changed.
+		self.cells = None
+		self.codes = None
+
+	def update(self, cells = None):
+		"""
+		Pick up the changes to the grid since the last update, looking
+		only at the given cells, the dirty ones, or else at all of them.
+		Returns True, if there's a new delta to send.
+		"""
+		tiles = self.tiles
+		sent = self.sent
+		if cells is None and self.dirty is not None:
+			cells = self.dirty()
+		if cells is None:
+			# Most of the time, nothing has changed.
+			if tiles == sent:
+				self.cells = None
+				return False
+			cells = range(len(tiles))
+		changed = sorted(cell for cell in cells if tiles[cell] != sent[cell])
+		if not changed:
+			self.cells = None
+			return False
+		codes = bytearray(tiles[cell] for cell in changed)
+		for cell in changed:
+			sent[cell] = tiles[cell]
+		self.seq += 1
+		self.cells = changed
+		self.codes = codes
+		return True
+
+	def snapshot(self, recipient):
+		"""
+		Get a snapshot message (dict) for a recipient.
+		"""
+		return {
+				"id": bp.M_BOARD_SNAPSHOT,
+				"server_uuid": self.sender,
+				"client_uuid": recipient,
+				"board": self.board,
+				"seq": self.seq,
+				"boardsize": (self.w, self.h),
+				"tiles": self.sent
+				}
+
+	def delta(self, recipient):
+		"""
+		Get a message (dict) with the last delta for a recipient.
+		"""
+		return {
+				"id": bp.M_BOARD_DELTA,
+				"server_uuid": self.sender,
+				"client_uuid": recipient,
+				"board": self.board,
+				"seq": self.seq,
+				"cells": self.cells,
+				"codes": self.codes
+				}
+
+class BoardReplica():
+	"""
+	The receiving end of a board's synchronisation.
+	Deltas are applied in order; on a gap in the sequence numbers,
+	the replica stops applying them until a fresh snapshot arrives,
+	and asks for one only once.
+	"""
+
+	def __init__(self, sender, board):
+		self.sender = sender
+		self.board = board
+		self.w = 0
+		self.h = 0
+		self.tiles = bytearray()
+		# Sequence number of the last snapshot or delta, None until the first snapshot.
+		self.seq = None
+		# Set when a snapshot should be requested.
+		self.needs_resync = False
+		# Set once it's been requested, until a snapshot arrives.
+		self.resync_pending = False
+
+	def apply(self, msg):
+		"""
+		Apply a snapshot or a delta message.
+		Returns the cells that changed.
+		"""
+		if msg.id == bp.M_BOARD_SNAPSHOT:
+			if self.seq is not None and msg.seq < self.seq:
+				# Older than what we have.
+				return []
+			resized = (self.w, self.h) != tuple(msg.boardsize)
+			self.w, self.h = msg.boardsize
+			old = self.tiles
+			self.tiles = bytearray(msg.tiles)
+			self.seq = msg.seq
+			self.needs_resync = False
+			self.resync_pending = False
+			if resized:
+				return range(len(self.tiles))
+			return [cell for cell in range(len(self.tiles)) if old[cell] != self.tiles[cell]]
+
+		if msg.id == bp.M_BOARD_DELTA:
+			if self.seq is None or msg.seq != self.seq + 1:
+				# Either a stale delta, or we've missed some.
+				if (self.seq is None or msg.seq > self.seq) and not self.resync_pending:
+					self.needs_resync = True
+				return []
+			tiles = self.tiles
+			for cell, code in zip(msg.cells, msg.codes):
+				if cell >= len(tiles):
+					raise ValueError("Delta outside the board")
+				tiles[cell] = code
+			self.seq = msg.seq
+			return msg.cells
+		return []
+
+	def take_resync(self, uuid):
+		"""
+		Get a resync request message (dict) from the given player,
+		if one is due, or None.
+		Only one is made per gap.
+		"""
+		if not self.needs_resync:
+			return None
+		self.needs_resync = False
+		self.resync_pending = True
+		return {
+				"id": bp.M_BOARD_RESYNC,
+				"server_uuid": uuid,
+				"client_uuid": self.sender,
+				"board": self.board,
+				"seq": self.seq or 0
+				}
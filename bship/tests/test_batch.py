@@ -0,0 +1,59 @@
+"""
+Pulling boards out of a BoardBatch into regular GameBoards.
+
+Run from the bship directory:
+
+    python -m unittest tests.test_batch
+"""
+import unittest
+
+import numpy as np
+
+import board.batch as bba
+import board.board as bb
+import board.tile as bt
+
+class ToGameBoardTest(unittest.TestCase):
+
+	def setUp(self):
+		self.batch = bba.BoardBatch(8, 10, 10, seed=1)
+		self.batch.place_fleet()
+
+	def ship_cells(self, i):
+		ys, xs = (self.batch.ship_ids[i] >= 0).nonzero()
+		return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+	def test_fresh_board(self):
+		for i in range(self.batch.n):
+			gb = self.batch.to_gameboard(i)
+			self.assertEqual(str(gb.our_tiles), self.batch.tiles[i].tobytes())
+			self.assertFalse(gb.is_destroyed())
+			x, y = self.ship_cells(i)[0]
+			self.assertNotEqual(gb.shoot(x, y), bb.GameBoard.R_MISS)
+
+	def test_mid_game(self):
+		rng = np.random.RandomState(2)
+		# Bomb half of the cells of every board.
+		for turn in range(50):
+			cells = rng.randint(0, 100, self.batch.n)
+			self.batch.shoot(cells % 10, cells // 10)
+
+		bombed = bt.Tile(bt.Tile.T_BOMBED).code()
+		for i in range(self.batch.n):
+			gb = self.batch.to_gameboard(i)
+			for y in range(10):
+				for x in range(10):
+					is_bombed = gb.our_tiles[y * 10 + x] == bombed
+					self.assertEqual(is_bombed, bool(self.batch.bombed[i, y, x]))
+			self.assertEqual(gb.hits_left, list(self.batch.remaining[i]))
+
+			# The rest of the game goes the same on both.
+			for x, y in self.ship_cells(i):
+				if not self.batch.bombed[i, y, x]:
+					expected = self.batch.shoot([x], [y], [i])[0]
+					self.assertEqual(gb.shoot(x, y), expected)
+			self.assertTrue(gb.is_destroyed())
+			self.assertTrue(self.batch.is_destroyed()[i])
+
+if __name__ == '__main__':
+	unittest.main()
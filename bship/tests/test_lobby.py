@@ -0,0 +1,101 @@
+"""
+Server announces in the lobby, over the local broker.
+
+Run from the bship directory:
+
+    python -m unittest tests.test_lobby
+"""
+import time
+import unittest
+import uuid
+
+import localbroker as blb
+import lobby as blo
+import protocol as bp
+
+def announce(server_uuid, name):
+	return bp.Message.encode({
+		"id": bp.M_ANNOUNCE,
+		"uuid": server_uuid,
+		"boardsize": (10, 10),
+		"num_players": (1, 2),
+		"name": name})
+
+class LobbyTest(unittest.TestCase):
+
+	def setUp(self):
+		self.broker = blb.LocalBroker()
+
+	def consumer(self, ttl = 1.0):
+		"""
+		Connect the way the client does, and collect the announces received.
+		"""
+		conn = self.broker.connect()
+		conn.exchange_declare(exchange=bp.LOBBY_EXCHANGE, exchange_type="fanout")
+		q = conn.queue_declare(queue="", exclusive=True, auto_delete=True,
+				arguments={"x-message-ttl": int(ttl * 1000)}).method.queue
+		conn.queue_bind(queue=q, exchange=bp.LOBBY_EXCHANGE)
+		received = []
+		def on_message(ch, method, properties, body):
+			received.append(bp.Message.decode(body))
+		conn.basic_consume(on_message, queue=q, no_ack=True)
+		return conn, received
+
+	def publish(self, body):
+		conn = self.broker.connect()
+		conn.exchange_declare(exchange=bp.LOBBY_EXCHANGE, exchange_type="fanout")
+		conn.basic_publish(exchange=bp.LOBBY_EXCHANGE, routing_key="", body=body)
+		conn.close()
+
+	def test_fanout(self):
+		first, first_received = self.consumer()
+		second, second_received = self.consumer()
+		servers = [str(uuid.uuid4()) for i in range(3)]
+		for i, server in enumerate(servers):
+			self.publish(announce(server, "Room {}".format(i)))
+
+		for conn, received in ((first, first_received), (second, second_received)):
+			conn.process_data_events()
+			self.assertEqual([msg.uuid for msg in received], servers)
+			self.assertEqual([msg.name for msg in received], ["Room 0", "Room 1", "Room 2"])
+			conn.close()
+
+	def test_queue_ttl(self):
+		conn, received = self.consumer(ttl=0.05)
+		self.publish(announce(str(uuid.uuid4()), "Stale"))
+		time.sleep(0.1)
+		conn.process_data_events()
+		self.assertEqual(received, [])
+		conn.close()
+
+	def test_directory_expiry(self):
+		directory = blo.LobbyDirectory(ttl=1.0)
+		resolution = directory.scheduler.resolution
+		conn, received = self.consumer()
+		old = str(uuid.uuid4())
+		fresh = str(uuid.uuid4())
+
+		start = time.time()
+		self.publish(announce(old, "Old"))
+		conn.process_data_events()
+		directory.announce(received.pop())
+		time.sleep(0.5)
+		self.publish(announce(fresh, "Fresh"))
+		conn.process_data_events()
+		directory.announce(received.pop())
+		self.assertEqual(len(directory.take_diff()[0]), 2)
+
+		# Within the TTL, both stay.
+		directory.tick()
+		self.assertIn(old, directory)
+		self.assertIn(fresh, directory)
+
+		# Past the TTL of the first announce, only that one is dropped.
+		directory.tick(start + directory.ttl + 2 * resolution)
+		self.assertNotIn(old, directory)
+		self.assertIn(fresh, directory)
+		self.assertEqual(directory.take_diff(), ([], [], [old]))
+		conn.close()
+
+if __name__ == '__main__':
+	unittest.main()
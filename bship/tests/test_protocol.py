@@ -0,0 +1,118 @@
+"""
+Encoding and decoding messages, and rejecting malformed ones.
+
+Run from the bship directory:
+
+    python -m unittest tests.test_protocol
+"""
+import struct
+import unittest
+import uuid
+import zlib
+
+import protocol as bp
+
+SERVER = str(uuid.uuid4())
+CLIENT = str(uuid.uuid4())
+
+# One message of every kind.
+MESSAGES = [
+	{"id": bp.M_ANNOUNCE, "uuid": SERVER, "boardsize": (10, 12),
+			"num_players": (1, 2), "name": "Room"},
+	{"id": bp.M_JOINING, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"name": "Room", "nickname": "Player"},
+	{"id": bp.M_HEARTBEAT, "server_uuid": SERVER, "client_uuid": CLIENT},
+	{"id": bp.M_BOARD_SNAPSHOT, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"board": 1, "seq": 7, "boardsize": (4, 3), "tiles": bytearray(b"~~~~~##~~~~X")},
+	{"id": bp.M_BOARD_DELTA, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"board": 0, "seq": 8, "cells": [0, 5, 11], "codes": bytearray(b"X~#")},
+	{"id": bp.M_BOARD_RESYNC, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"board": 1, "seq": 6},
+	{"id": bp.M_ACK, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"state": 3, "message": "Welcome"},
+	{"id": bp.M_NACK, "server_uuid": SERVER, "client_uuid": CLIENT,
+			"state": 0, "message": "Room full"},
+]
+
+def board_header(msg_id, seq = 0):
+	return bp.HEADER.pack(msg_id, bp.VERSION, 0.0) + bp.BOARD.pack(
+			uuid.UUID(SERVER).bytes, uuid.UUID(CLIENT).bytes, 0, seq)
+
+class RoundTripTest(unittest.TestCase):
+
+	def test_every_kind(self):
+		self.assertEqual(sorted(m["id"] for m in MESSAGES), [
+				bp.M_ANNOUNCE, bp.M_JOINING, bp.M_HEARTBEAT, bp.M_BOARD_SNAPSHOT,
+				bp.M_BOARD_DELTA, bp.M_BOARD_RESYNC, bp.M_ACK, bp.M_NACK])
+		for message in MESSAGES:
+			msg = bp.Message.decode(bp.Message.encode(dict(message)))
+			for key, value in message.items():
+				decoded = getattr(msg, key)
+				if key == "cells":
+					decoded = list(decoded)
+				elif isinstance(value, tuple):
+					decoded = tuple(decoded)
+				self.assertEqual(decoded, value, "{} of message {}".format(key, message["id"]))
+			self.assertTrue(msg.timestamp > 0)
+
+	def test_empty_delta(self):
+		msg = bp.Message.decode(bp.Message.encode({"id": bp.M_BOARD_DELTA,
+				"server_uuid": SERVER, "client_uuid": CLIENT,
+				"board": 0, "seq": 1, "cells": [], "codes": bytearray()}))
+		self.assertEqual(list(msg.cells), [])
+		self.assertEqual(msg.codes, bytearray())
+
+	def test_out_of_range(self):
+		message = dict(MESSAGES[0], num_players=(1, 256))
+		self.assertRaises(ValueError, bp.Message.encode, message)
+		message = dict(MESSAGES[4], cells=[bp.U32 + 1, 0, 0])
+		self.assertRaises(ValueError, bp.Message.encode, message)
+
+class MalformedTest(unittest.TestCase):
+
+	def assertRejected(self, raw):
+		try:
+			bp.Message.decode(raw)
+		except ValueError:
+			return
+		self.fail("Decoded a malformed message: {!r}".format(raw))
+
+	def test_truncated(self):
+		for message in MESSAGES:
+			raw = bp.Message.encode(dict(message))
+			for length in range(len(raw)):
+				self.assertRejected(raw[:length])
+
+	def test_bad_version(self):
+		for message in MESSAGES:
+			raw = bytearray(bp.Message.encode(dict(message)))
+			raw[1] = bp.VERSION + 1
+			self.assertRejected(bytes(raw))
+
+	def test_unknown_id(self):
+		self.assertRejected(bp.HEADER.pack(0x42, bp.VERSION, 0.0))
+
+	def test_oversized_snapshot(self):
+		# Larger than any board may be.
+		raw = board_header(bp.M_BOARD_SNAPSHOT) + bp.BOARDSIZE.pack(bp.U16, bp.U16)
+		self.assertRejected(raw + bp.encode_blob(zlib.compress(b"~")))
+		# More tiles than the board takes.
+		raw = board_header(bp.M_BOARD_SNAPSHOT) + bp.BOARDSIZE.pack(10, 10)
+		self.assertRejected(raw + bp.encode_blob(zlib.compress(b"~" * (1 << 20))))
+		# Fewer, or no zlib stream at all.
+		self.assertRejected(raw + bp.encode_blob(zlib.compress(b"~" * 99)))
+		self.assertRejected(raw + bp.encode_blob(b"tiles"))
+		# A blob longer than the message.
+		self.assertRejected(raw + bp.COUNT.pack(bp.U32))
+
+	def test_oversized_delta(self):
+		raw = board_header(bp.M_BOARD_DELTA)
+		self.assertRejected(raw + bp.COUNT.pack(bp.MAX_SNAPSHOT + 1))
+		self.assertRejected(raw + bp.COUNT.pack(bp.U32))
+		# A count the cells that follow don't match.
+		cells = struct.pack("!3I", 0, 1, 2) + b"XXX"
+		self.assertRejected(raw + bp.COUNT.pack(4) + cells)
+		self.assertEqual(list(bp.Message.decode(raw + bp.COUNT.pack(3) + cells).cells), [0, 1, 2])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,97 @@
+"""
+Synchronising a board through snapshots and deltas, over the wire format.
+
+Run from the bship directory:
+
+    python -m unittest tests.test_sync
+"""
+import unittest
+import uuid
+
+import protocol as bp
+import sync as bsy
+import board.tile as bt
+
+W = 10
+H = 10
+
+class SyncTest(unittest.TestCase):
+
+	def setUp(self):
+		self.sender = str(uuid.uuid4())
+		self.recipient = str(uuid.uuid4())
+		self.tiles = bytearray(bt.Tile.T_VOID) * (W * H)
+		self.publisher = bsy.BoardPublisher(self.sender, bsy.B_THEIRS, self.tiles, W, H)
+		self.replica = bsy.BoardReplica(self.sender, bsy.B_THEIRS)
+
+	def wire(self, msg_dict):
+		return bp.Message.decode(bp.Message.encode(msg_dict))
+
+	def shoot(self, cell):
+		"""
+		Change a cell, and get the delta message.
+		"""
+		self.tiles[cell] = ord(bt.Tile.T_BOMBED)
+		self.assertTrue(self.publisher.update([cell]))
+		return self.wire(self.publisher.delta(self.recipient))
+
+	def snapshot(self):
+		return self.wire(self.publisher.snapshot(self.recipient))
+
+	def test_snapshot_then_deltas(self):
+		# The first snapshot changes every cell.
+		self.assertEqual(list(self.replica.apply(self.snapshot())), list(range(W * H)))
+		self.assertEqual(self.replica.tiles, self.tiles)
+		for cell in (3, 42, 99):
+			self.assertEqual(list(self.replica.apply(self.shoot(cell))), [cell])
+		self.assertEqual(self.replica.tiles, self.tiles)
+		self.assertEqual(self.replica.seq, 3)
+		self.assertIsNone(self.replica.take_resync(self.recipient))
+
+	def test_no_change_no_delta(self):
+		self.assertFalse(self.publisher.update())
+		self.assertFalse(self.publisher.update([5]))
+
+	def test_dropped_delta_resyncs_once(self):
+		self.replica.apply(self.snapshot())
+		self.replica.apply(self.shoot(1))
+		# Lost on the way.
+		self.shoot(2)
+		requests = []
+		for cell in (3, 4, 5, 6):
+			self.assertEqual(list(self.replica.apply(self.shoot(cell))), [])
+			resync = self.replica.take_resync(self.recipient)
+			if resync is not None:
+				requests.append(self.wire(resync))
+		self.assertEqual(len(requests), 1)
+		self.assertEqual(requests[0].id, bp.M_BOARD_RESYNC)
+		self.assertEqual(requests[0].seq, 1)
+
+		# The snapshot brings the replica up to date, and deltas apply again.
+		self.replica.apply(self.snapshot())
+		self.assertEqual(self.replica.tiles, self.tiles)
+		self.assertEqual(list(self.replica.apply(self.shoot(7))), [7])
+		self.assertEqual(self.replica.tiles, self.tiles)
+
+	def test_old_and_duplicate_seqs_ignored(self):
+		old_snapshot = self.snapshot()
+		self.replica.apply(old_snapshot)
+		first = self.shoot(1)
+		self.replica.apply(first)
+		self.replica.apply(self.shoot(2))
+		tiles = bytearray(self.replica.tiles)
+
+		self.assertEqual(list(self.replica.apply(first)), [])
+		self.assertEqual(list(self.replica.apply(old_snapshot)), [])
+		self.assertEqual(self.replica.tiles, tiles)
+		self.assertEqual(self.replica.seq, 2)
+		self.assertIsNone(self.replica.take_resync(self.recipient))
+
+	def test_delta_before_snapshot(self):
+		self.assertEqual(list(self.replica.apply(self.shoot(1))), [])
+		self.assertIsNotNone(self.replica.take_resync(self.recipient))
+		self.replica.apply(self.snapshot())
+		self.assertEqual(self.replica.tiles, self.tiles)
+
+if __name__ == '__main__':
+	unittest.main()
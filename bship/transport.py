@@ -0,0 +1,113 @@
+import logging
+import threading
+
+import framestats as bfs
+
+class Transport(threading.Thread):
+	"""
+	Runs the message queue connection on a background thread,
+	so that neither waiting for messages nor publishing them
+	is tied to the frame rate of the render loop.
+
+	Consumer callbacks run on this thread as soon as messages arrive.
+	Outgoing messages are posted to an Outbox from any thread,
+	and published here.
+	"""
+
+	# How long to wait for incoming messages (in seconds) before
+	# publishing what's been posted since, if the connection can't
+	# be woken up when a message is posted.
+	POLL = 0.005
+
+	def __init__(self, connect, setup, outbox, stats = None):
+		"""
+		connect() opens the connection, and setup(channel)
+		declares the queues and consumers on it; both are
+		called on the transport thread.
+		Publishing is timed by stats (a framestats.FrameStats), if given.
+		"""
+		threading.Thread.__init__(self, name="Transport")
+		self.daemon = True
+		self.log = logging.getLogger("BShip.Transport")
+
+		self.connect = connect
+		self.setup = setup
+		self.outbox = outbox
+		if stats is None:
+			stats = bfs.FrameStats()
+		self.stats = stats
+		self.running = False
+		# Set once the connection is up (or failed).
+		self.ready = threading.Event()
+		self.error = None
+
+	def start(self):
+		"""
+		Start the thread and wait for the connection.
+		"""
+		self.running = True
+		threading.Thread.start(self)
+		self.ready.wait()
+		if self.error is not None:
+			raise self.error
+
+	def run(self):
+		try:
+			self.connection = self.connect()
+			self.channel = self.connection.channel()
+			self.setup(self.channel)
+		except Exception as e:
+			self.error = e
+			self.running = False
+			self.ready.set()
+			return
+
+		# Block until a message arrives or is posted (or the thread is
+		# stopped), where the connection can be woken up from other
+		# threads (pika 0.12 and later).
+		poll = Transport.POLL
+		if hasattr(self.connection, "add_callback_threadsafe"):
+			poll = None
+			self.outbox.wake = self.wake
+		self.ready.set()
+
+		try:
+			while self.running:
+				with self.stats.span("publish"):
+					self.outbox.flush(self.channel)
+				self.connection.process_data_events(time_limit=poll)
+			# Send whatever is left.
+			self.outbox.flush(self.channel)
+		except Exception as e:
+			self.log.exception(e)
+		finally:
+			self.outbox.wake = None
+			self.connection.close()
+
+	def wake(self):
+		"""
+		Wake the thread up from waiting for messages (from any thread),
+		so that it publishes what's been posted.
+		"""
+		try:
+			self.connection.add_callback_threadsafe(Transport.woken)
+		except Exception:
+			# The connection is closing, nothing's published anymore.
+			pass
+
+	@staticmethod
+	def woken():
+		"""
+		Nothing to do, but to stop waiting.
+		"""
+		pass
+
+	def stop(self):
+		"""
+		Stop the thread and close the connection.
+		"""
+		self.running = False
+		if self.is_alive():
+			if self.outbox.wake is not None:
+				self.wake()
+			self.join()